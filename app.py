@@ -2,6 +2,7 @@ import os
 import logging
 from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
+from flask_migrate import Migrate, stamp, upgrade
 from sqlalchemy.orm import DeclarativeBase
 from werkzeug.middleware.proxy_fix import ProxyFix
 
@@ -36,10 +37,25 @@ app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {
 # Initialize the app with the extension
 db.init_app(app)
 
+# Schema changes are Alembic migrations (migrations/versions); batch mode lets SQLite alter tables
+migrate = Migrate(app, db, directory=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'migrations'),
+                  render_as_batch=True)
+
+# Revisions matching databases created by db.create_all() before the migrations existed
+BASELINE_REVISION = 'c2b0d5b52173'
+OPTIMIZATION_JOB_REVISION = '534dd03f7ecb'
+
 with app.app_context():
     # Import models and routes
     import models
     import routes
     
-    # Create all tables
-    db.create_all()
\ No newline at end of file
+    # Stamp databases that predate the migrations with the revision their tables match,
+    # then bring the schema up to date
+    inspector = db.inspect(db.engine)
+    if inspector.has_table('dataset') and not inspector.has_table('alembic_version'):
+        stamp(revision=OPTIMIZATION_JOB_REVISION if inspector.has_table('optimization_job') else BASELINE_REVISION)
+    upgrade()
+    
+    # Jobs queued or running in a process that has since exited will never finish
+    routes.fail_orphaned_jobs()
\ No newline at end of file
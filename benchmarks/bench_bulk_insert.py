@@ -0,0 +1,70 @@
+"""Assignment row persistence (user-008).
+
+Optimizes the 50k-member upload against the 4k-provider upload, then writes
+its assignment rows into a fresh database twice: one ORM object and
+db.session.add per row (the old /optimize_network loop), and
+MemberProviderAssignment.bulk_insert. Also prints the query plans of the
+two indexed endpoint filters.
+
+    python benchmarks/bench_bulk_insert.py     (DATABASE_URL is replaced by a temporary SQLite file)
+"""
+import time
+
+import common
+
+def main():
+    common.sandbox()
+    common.quiet()
+    from app import app, db
+    from models import MemberProviderAssignment, OptimizationResult
+    from utils.data_processor import DataProcessor
+    from utils.optimizer import NetworkOptimizer
+
+    processor = DataProcessor()
+    optimizer = NetworkOptimizer()
+    members, _ = processor.process_members_data(common.MEMBERS_50K)
+    providers, _ = processor.process_providers_data(common.PROVIDERS_4K)
+    assignments = optimizer.optimize_assignments(optimizer.build_candidate_graph(members, providers),
+                                                 members, providers)
+
+    with app.app_context():
+        results = []
+        for _ in range(2):
+            result = OptimizationResult(dataset_members_id=1, dataset_providers_id=1)
+            db.session.add(result)
+            results.append(result)
+        db.session.commit()
+
+        start = time.perf_counter()
+        for a in assignments:
+            db.session.add(MemberProviderAssignment(
+                optimization_result_id=results[0].id,
+                member_id=a['member_id'],
+                provider_id=a['provider_id'],
+                distance_km=a['distance'],
+                cost=a['cost'],
+                provider_rating=a['rating'],
+                is_served=a['provider_id'] is not None,
+                member_source_type=a['member_source_type'],
+                provider_source_type=a.get('provider_type')
+            ))
+        db.session.commit()
+        orm_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        MemberProviderAssignment.bulk_insert(results[1].id, assignments)
+        db.session.commit()
+        bulk_time = time.perf_counter() - start
+
+        print(f"{len(assignments)} assignment rows into {db.engine.dialect.name}")
+        print(f"  per-row ORM add  {orm_time:6.2f}s  {len(assignments) / orm_time:9,.0f} rows/s")
+        print(f"  bulk_insert      {bulk_time:6.2f}s  {len(assignments) / bulk_time:9,.0f} rows/s")
+
+        for where in ("member_id = '5'", 'is_served = 1'):
+            plan = db.session.execute(db.text(
+                f"EXPLAIN QUERY PLAN SELECT * FROM member_provider_assignment "
+                f"WHERE optimization_result_id = {results[1].id} AND {where}")).fetchall()
+            print(f"  {where:16s} {plan[0][-1]}")
+
+if __name__ == '__main__':
+    main()
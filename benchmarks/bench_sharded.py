@@ -0,0 +1,58 @@
+"""Sharded candidate search scaling (user-006).
+
+Times candidate graph + best-provider selection on the 50k-member upload
+against the 4k-provider upload, unsharded and sharded on 1..N worker
+processes, and checks that every sharded run finds the same edges and
+picks as the unsharded one.
+
+    python benchmarks/bench_sharded.py [workers ...]   (default: 1 2 4 ... cpu_count)
+"""
+import os
+import sys
+import time
+
+import numpy as np
+
+import common
+
+def timed(optimizer, members, providers, repeat=3):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        graph = optimizer.build_candidate_graph(members, providers)
+        choice = optimizer.select_best_providers(graph)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, graph, choice
+
+def main():
+    common.quiet()
+    from utils.data_processor import DataProcessor
+    from utils.optimizer import NetworkOptimizer
+
+    cpus = os.cpu_count() or 1
+    workers = [int(w) for w in sys.argv[1:]] or sorted({2 ** i for i in range(cpus.bit_length())} | {cpus})
+    processor = DataProcessor()
+    members, _ = processor.process_members_data(common.MEMBERS_50K)
+    providers, _ = processor.process_providers_data(common.PROVIDERS_4K)
+    members, providers = processor.prepare(members, 'members'), processor.prepare(providers, 'providers')
+
+    base_time, base_graph, base_choice = timed(NetworkOptimizer(), members, providers)
+    base_edges = set(zip(base_graph.edge_member.tolist(), base_graph.provider_idx.tolist()))
+    base_picks = np.where(base_choice >= 0, base_graph.provider_idx[np.maximum(base_choice, 0)], -1)
+    print(f"{len(members)} members x {len(providers)} providers, {base_graph.n_edges} edges, {cpus} CPUs")
+    print(f"  unsharded            {base_time:6.2f}s")
+
+    for count in workers:
+        optimizer = NetworkOptimizer()
+        optimizer.sharded = True
+        optimizer.shard_workers = count
+        elapsed, graph, choice = timed(optimizer, members, providers)
+        edges = set(zip(graph.edge_member.tolist(), graph.provider_idx.tolist()))
+        picks = np.where(choice >= 0, graph.provider_idx[np.maximum(choice, 0)], -1)
+        same = edges == base_edges and np.array_equal(picks, base_picks)
+        print(f"  sharded, {count:2d} worker{'s' if count > 1 else ' '}  {elapsed:6.2f}s  "
+              f"x{base_time / elapsed:4.2f}  {'identical' if same else 'DIFFERENT'}")
+
+if __name__ == '__main__':
+    main()
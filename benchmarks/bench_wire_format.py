@@ -0,0 +1,59 @@
+"""Payload size and serialization time per wire format (user-023).
+
+Optimizes a member and a provider file in a fresh app sandbox, then fetches
+the map, tile and chart endpoints as plain JSON, columnar JSON and NDJSON.
+Reports bytes, time to last byte (best of 3) and the tracemalloc peak of one
+more fetch, measured separately since tracing slows serialization down. The
+response cache is disabled so every fetch renders.
+
+    python benchmarks/bench_wire_format.py [members.csv providers.csv]
+        (default: 200k members x the 200k-row national provider file)
+"""
+import sys
+import time
+import tracemalloc
+
+import common
+
+URLS = ['/api/map_data', '/api/map_data?format=compact', '/api/map_tiles/3/2/3', '/api/chart_data']
+
+def fetch(client, url, mimetype):
+    response = client.get(url, headers={'Accept': mimetype}, buffered=False)
+    if response.status_code != 200:
+        raise RuntimeError(f"{url}: {response.status_code}")
+    return sum(len(chunk) for chunk in response.response)
+
+def main():
+    members_path, providers_path = sys.argv[1:3] if len(sys.argv) > 2 else (
+        common.members(200_000), common.national_providers())
+    common.sandbox()
+    common.quiet()
+    from app import app
+    import routes
+    from utils import wire_format
+
+    routes.response_cache.max_entry_bytes = 0
+    client = common.admin_client(app)
+    common.upload(client, 'members', members_path)
+    common.upload(client, 'providers', providers_path)
+    job = common.optimize(client)
+    print(f"{job['total_members']} members, result {job['optimization_id']}")
+    fetch(client, URLS[0], wire_format.JSON_MIMETYPE)  # builds the map engine
+
+    formats = [('json', wire_format.JSON_MIMETYPE), ('columnar', wire_format.COLUMNAR_MIMETYPE),
+               ('ndjson', wire_format.NDJSON_MIMETYPE)]
+    for url in URLS:
+        for name, mimetype in formats:
+            times = []
+            for _ in range(3):
+                start = time.perf_counter()
+                size = fetch(client, url, mimetype)
+                times.append(time.perf_counter() - start)
+            tracemalloc.start()
+            fetch(client, url, mimetype)
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            print(f"  {url:30s} {name:9s} {size / 1e6:9.4f} MB  {min(times):6.3f}s  peak {peak / 1e6:6.1f} MB")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+"""Shared setup for the scripts in benchmarks/.
+
+The large inputs are synthetic and derived from the uploads/ files, so every
+number in a commit message can be regenerated:
+
+- members(n): the 50k-member upload repeated with offset MemberIDs, first n rows
+- national_providers(): the 4k-provider upload repeated 50 times (200k rows)
+  with coordinates jittered by N(0, 0.3 deg) and 40% of Types redrawn, seed 0
+
+Files are cached in $BENCH_DATA (default: <tmp>/networkopt-bench).
+"""
+import os
+import sys
+import json
+import time
+import logging
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+UPLOADS = os.path.join(ROOT, 'uploads')
+MEMBERS_50K = os.path.join(UPLOADS, 'members_1756335945_Members_First50k.csv')
+PROVIDERS_4K = os.path.join(UPLOADS, 'providers_1756665127_Provider.csv')
+DATA_DIR = os.environ.get('BENCH_DATA', os.path.join(tempfile.gettempdir(), 'networkopt-bench'))
+
+def data_path(name):
+    os.makedirs(DATA_DIR, exist_ok=True)
+    return os.path.join(DATA_DIR, name)
+
+def members(n):
+    """Path of a CSV with the first n members of the repeated 50k upload."""
+    path = data_path(f'members_{n}.csv')
+    if not os.path.exists(path):
+        df = pd.read_csv(MEMBERS_50K)
+        copies = -(-n // len(df))
+        parts = [df.assign(MemberID=df['MemberID'] + i * len(df)) for i in range(copies)]
+        pd.concat(parts).head(n).to_csv(path, index=False)
+    return path
+
+def national_providers():
+    """Path of the 200k-row national provider CSV."""
+    path = data_path('national_providers.csv')
+    if not os.path.exists(path):
+        df = pd.read_csv(PROVIDERS_4K)
+        rng = np.random.default_rng(0)
+        types = ['Hospital', 'GENERAL ACUTE CARE', 'Nursing Home', 'Scan Center', 'Imaging Center', 'Pharmacy']
+        parts = []
+        for _ in range(50):
+            part = df.copy()
+            part['Latitude'] += rng.normal(0, .3, len(part))
+            part['Longitude'] += rng.normal(0, .3, len(part))
+            part['Type'] = np.where(rng.random(len(part)) < .4, rng.choice(types, len(part)), part['Type'])
+            parts.append(part)
+        national = pd.concat(parts)
+        national['ProviderID'] = np.arange(1, len(national) + 1)
+        national.to_csv(path, index=False)
+    return path
+
+def sandbox(workdir=None):
+    """Run the app against a fresh (or the given) SQLite database and upload folder;
+    call before importing app."""
+    workdir = workdir or tempfile.mkdtemp(prefix='networkopt-bench-')
+    os.chdir(workdir)
+    # Child interpreters (the shard forkserver) must still find the app's modules
+    os.environ['PYTHONPATH'] = os.pathsep.join(filter(None, [ROOT, os.environ.get('PYTHONPATH')]))
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    return workdir
+
+def quiet():
+    logging.disable(logging.CRITICAL)
+
+def admin_client(app):
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['logged_in'] = True
+        session['user_type'] = 'admin'
+    return client
+
+def upload(client, kind, path):
+    with open(path, 'rb') as f:
+        response = client.post('/upload_dataset', data={'file': (f, os.path.basename(path)), 'dataset_type': kind})
+    if response.status_code != 200:
+        raise RuntimeError(f"Upload of {path} failed: {response.get_data(as_text=True)[:200]}")
+
+def optimize(client, options=None):
+    """Run /optimize_network and wait for its job; returns the job status payload."""
+    job_id = client.post('/optimize_network', json=options or {}).get_json()['job_id']
+    while True:
+        job = client.get(f'/api/jobs/{job_id}').get_json()
+        if job.get('status') in ('completed', 'failed'):
+            if job['status'] == 'failed':
+                raise RuntimeError(json.dumps(job))
+            return job
+        time.sleep(0.2)
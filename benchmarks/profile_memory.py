@@ -0,0 +1,88 @@
+"""Peak RSS per /optimize_network stage (user-016).
+
+Uploads a member and a provider file into a fresh app sandbox, then, in a new
+process with the datasets cached and the provider BallTree built, runs
+routes._optimize_datasets and reports each stage's time and its peak RSS
+above the resident datasets (Linux: VmHWM, reset through /proc/self/clear_refs
+at every stage boundary).
+
+    python benchmarks/profile_memory.py [members.csv providers.csv]
+        (default: 200k members x the 200k-row national provider file)
+
+For a before/after comparison, run the same script in a checkout of the older
+commit, e.g. git worktree add /tmp/before <commit> and copy benchmarks/ into it.
+"""
+import gc
+import os
+import subprocess
+import sys
+import time
+
+import common
+
+WORKDIR_ENV = 'NETWORKOPT_PROFILE_WORKDIR'
+
+def status_mb(key):
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith(key):
+                return int(line.split()[1]) / 1024
+
+def reset_peak():
+    with open('/proc/self/clear_refs', 'w') as f:
+        f.write('5')
+
+def upload(members_path, providers_path):
+    workdir = common.sandbox()
+    from app import app
+    client = common.admin_client(app)
+    common.upload(client, 'members', members_path)
+    common.upload(client, 'providers', providers_path)
+    return workdir
+
+def measure(workdir):
+    common.sandbox(workdir)
+    from app import app
+    import routes
+    from models import Dataset
+    from utils.jobs import JobProgress
+
+    with app.app_context():
+        members = Dataset.query.filter_by(file_type='members').first()
+        providers = Dataset.query.filter_by(file_type='providers').first()
+        routes.dataset_cache.get(members)
+        routes.dataset_cache.get_index(providers, routes.dataset_cache.get(providers))
+        gc.collect()
+        resident = status_mb('VmRSS')
+
+        peaks = {}
+
+        def on_update(progress):
+            if progress.current in progress.timings:
+                peaks[progress.current] = status_mb('VmHWM') - resident
+            reset_peak()
+
+        reset_peak()
+        progress = JobProgress(routes.OPTIMIZATION_STAGES, on_update=on_update)
+        start = time.perf_counter()
+        routes._optimize_datasets(members, providers, {}, progress)
+        total = time.perf_counter() - start
+
+    print(f"resident datasets {resident:.0f} MB, optimization {total:.1f}s")
+    for name in routes.OPTIMIZATION_STAGES:
+        print(f"  {name:11s} {progress.timings.get(name, 0):7.3f}s  peak +{peaks.get(name, 0):.0f} MB")
+
+def main():
+    common.quiet()
+    if os.environ.get(WORKDIR_ENV):
+        measure(os.environ[WORKDIR_ENV])
+        return
+    members_path, providers_path = sys.argv[1:3] if len(sys.argv) > 2 else (
+        common.members(200_000), common.national_providers())
+    workdir = upload(members_path, providers_path)
+    # Measure in a fresh process so upload parsing does not shape the heap
+    subprocess.run([sys.executable, os.path.abspath(__file__)], env=dict(os.environ, **{WORKDIR_ENV: workdir}),
+                   check=True)
+
+if __name__ == '__main__':
+    main()
@@ -1,12 +1,26 @@
 import pandas as pd
+import numpy as np
 import math
 import os
+from utils.spatial_index import ProviderSpatialIndex
+from utils.provider_categories import CATEGORY_COLUMN, HOSPITAL, NURSING, SCAN, SUPPLIER, classify_providers
 
 class DataProcess:
+    # Searchable provider types and the category bit each one requires
+    PROVIDER_TYPE_FILTERS = {
+        'hospital': HOSPITAL,
+        'supplier': SUPPLIER,
+        'scan': SCAN,
+        'nursing': NURSING,
+    }
+
     def __init__(self):
         """Initialize the data processor and load the CSV data"""
         self.csv_path = 'attached_assets/Last provider data.csv'
         self.df = self.load_data()
+        self.type_rows = self.classify_types()
+        self.indexes = self.load_indexes()
+        self.records = self.build_records()
         
     def load_data(self):
         """Load and clean the CSV data"""
@@ -22,12 +36,77 @@ class DataProcess:
             # Clean location data
             df['Location'] = df['Location'].str.strip()
             df['Type'] = df['Type'].str.strip()
+            df[CATEGORY_COLUMN] = classify_providers(df)
+            
+            # Store rows in search priority order (rating desc, cost asc; stable on ties)
+            # so radius query results come out already sorted
+            rating = df['CMS Rating'].fillna(0).to_numpy()
+            cost = df['Cost'].fillna(0).to_numpy()
+            df = df.iloc[np.lexsort((cost, -rating))].reset_index(drop=True)
             
             return df
         except Exception as e:
             print(f"Error loading data: {e}")
             return pd.DataFrame()
     
+    def classify_types(self):
+        """Row positions of each searchable provider type ('all' included)"""
+        if self.df.empty:
+            return {}
+        
+        categories = self.df[CATEGORY_COLUMN].to_numpy()
+        type_rows = {'all': np.arange(len(self.df))}
+        for key, bit in self.PROVIDER_TYPE_FILTERS.items():
+            type_rows[key] = np.flatnonzero(categories & bit)
+        return type_rows
+    
+    def load_indexes(self):
+        """Load the persisted spatial index of every provider type (built on first run)"""
+        indexes = {}
+        for key, rows in self.type_rows.items():
+            try:
+                indexes[key] = ProviderSpatialIndex.load_or_build(self.csv_path, self.df.iloc[rows], name=key)
+            except Exception as e:
+                print(f"Error loading spatial index for {key}: {e}")
+                indexes[key] = None
+        return indexes
+    
+    def build_records(self):
+        """Response fields of every provider, formatted once at load"""
+        if self.df.empty:
+            return []
+        
+        records = []
+        columns = ['Location', 'Contact Number', 'Type', 'Latitude', 'Longitude', 'CMS Rating', 'Cost', 'Availability']
+        for location, contact, provider_type, lat, lon, rating, cost, availability in zip(*(self.df[c].tolist() for c in columns)):
+            try:
+                records.append({
+                    'name': location.split(',')[0] if ',' in str(location) else str(location),
+                    'full_address': str(location),
+                    'contact': str(contact) if pd.notna(contact) else 'N/A',
+                    'type': str(provider_type),
+                    'latitude': float(lat),
+                    'longitude': float(lon),
+                    'cms_rating': float(rating) if pd.notna(rating) else 0,
+                    'cost': float(cost) if pd.notna(cost) else 0,
+                    'availability': int(availability) if pd.notna(availability) else 0
+                })
+            except (ValueError, TypeError) as e:
+                # Rows with invalid coordinates are never returned by the index
+                records.append(None)
+        return records
+    
+    def provider_type_key(self, provider_type):
+        """Map a requested provider type to a type_rows key"""
+        provider_type = provider_type.lower()
+        if provider_type == 'all':
+            return 'all'
+        for key in self.PROVIDER_TYPE_FILTERS:
+            if key in provider_type:
+                return key
+        # Default to hospital if type not recognized
+        return 'hospital'
+    
     def haversine_distance(self, lat1, lon1, lat2, lon2):
         """Calculate the distance between two points on Earth using Haversine formula"""
         # Convert latitude and longitude from degrees to radians
@@ -44,61 +123,52 @@ class DataProcess:
         
         return c * r
     
+    def nearby_rows(self, user_lat, user_lon, provider_type, radius_km=15):
+        """Rows (= priority ranks) and distances of providers in range, unordered"""
+        key = self.provider_type_key(provider_type)
+        index = self.indexes.get(key)
+        if self.df.empty or index is None:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+        
+        positions, distances = index.query_radius(user_lat, user_lon, radius_km, return_distance=True)
+        within = distances[0] <= radius_km
+        return self.type_rows[key][positions[0][within]], distances[0][within]
+    
+    def format_providers(self, rows, distances):
+        """Response dicts for the given rows, in the given order"""
+        return [dict(self.records[row], distance=round(distance, 2))
+                for row, distance in zip(rows.tolist(), distances.tolist())]
+    
     def find_nearby_providers(self, user_lat, user_lon, provider_type, radius_km=15):
-        """Find providers within specified radius and of specified type"""
-        if self.df.empty:
-            return []
+        """Find providers within specified radius and of specified type, sorted by priority"""
+        rows, distances = self.nearby_rows(user_lat, user_lon, provider_type, radius_km)
         
-        # Filter by provider type
-        if provider_type.lower() != 'all':
-            # Handle different type variations
-            type_filters = []
-            if 'hospital' in provider_type.lower():
-                type_filters = self.df['Type'].str.contains('Hospital|GENERAL ACUTE CARE|CRITICAL ACCESS', case=False, na=False)
-            elif 'supplier' in provider_type.lower():
-                type_filters = self.df['Source'].str.contains('Supplier', case=False, na=False)
-            elif 'Scan Center' in provider_type.lower():
-                type_filters = self.df['Type'].str.contains('Scan|Imaging|Radiology', case=False, na=False)
-            elif 'nursing' in provider_type.lower():
-                type_filters = self.df['Type'].str.contains('Nursing|LONG TERM CARE|REHABILITATION', case=False, na=False)
-            else:
-                # Default to hospital if type not recognized
-                type_filters = self.df['Type'].str.contains('Hospital|GENERAL ACUTE CARE|CRITICAL ACCESS', case=False, na=False)
-            
-            filtered_df = self.df[type_filters]
-        else:
-            filtered_df = self.df
+        # Rows are stored in priority order, so ascending rows are the sorted result
+        order = np.argsort(rows)
+        return self.format_providers(rows[order], distances[order])
+    
+    def find_nearby_providers_page(self, user_lat, user_lon, provider_type, radius_km=15, limit=20, cursor=None):
+        """One page of find_nearby_providers: (providers, total, next_cursor)
         
-        # Calculate distances and filter by radius
-        nearby_providers = []
+        Only the top ``limit`` rows after ``cursor`` are selected (partial sort)
+        and formatted. The cursor is the priority rank of the last provider on
+        the previous page; next_cursor is None on the last page.
+        """
+        if limit < 1:
+            raise ValueError("limit must be at least 1")
         
-        for _, row in filtered_df.iterrows():
-            try:
-                provider_lat = float(row['Latitude'])
-                provider_lon = float(row['Longitude'])
-                
-                distance = self.haversine_distance(user_lat, user_lon, provider_lat, provider_lon)
-                
-                if distance <= radius_km:
-                    provider_data = {
-                        'name': row['Location'].split(',')[0] if ',' in str(row['Location']) else str(row['Location']),
-                        'full_address': str(row['Location']),
-                        'contact': str(row['Contact Number']) if pd.notna(row['Contact Number']) else 'N/A',
-                        'type': str(row['Type']),
-                        'latitude': provider_lat,
-                        'longitude': provider_lon,
-                        'cms_rating': float(row['CMS Rating']) if pd.notna(row['CMS Rating']) else 0,
-                        'cost': float(row['Cost']) if pd.notna(row['Cost']) else 0,
-                        'availability': int(row['Availability']) if pd.notna(row['Availability']) else 0,
-                        'distance': round(distance, 2)
-                    }
-                    nearby_providers.append(provider_data)
-                    
-            except (ValueError, TypeError) as e:
-                # Skip rows with invalid coordinates
-                continue
+        rows, distances = self.nearby_rows(user_lat, user_lon, provider_type, radius_km)
+        total = len(rows)
+        if cursor is not None:
+            after = rows > int(cursor)
+            rows, distances = rows[after], distances[after]
+        
+        has_more = len(rows) > limit
+        top = np.argpartition(rows, limit - 1)[:limit] if has_more else np.arange(len(rows))
+        top = top[np.argsort(rows[top])]
         
-        return nearby_providers
+        next_cursor = str(rows[top[-1]]) if has_more else None
+        return self.format_providers(rows[top], distances[top]), total, next_cursor
     
     def sort_providers_by_priority(self, providers):
         """Sort providers by CMS rating (desc) then by cost (asc)"""
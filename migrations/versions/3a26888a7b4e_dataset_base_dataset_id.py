@@ -0,0 +1,31 @@
+"""add dataset.base_dataset_id
+
+Revision ID: 3a26888a7b4e
+Revises: 42ec59778df4
+Create Date: 2026-10-17 01:30:37.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3a26888a7b4e'
+down_revision = '42ec59778df4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('dataset', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('base_dataset_id', sa.Integer(), nullable=True))
+        batch_op.create_index(batch_op.f('ix_dataset_base_dataset_id'), ['base_dataset_id'], unique=False)
+        batch_op.create_foreign_key('fk_dataset_base_dataset_id_dataset', 'dataset', ['base_dataset_id'], ['id'])
+
+
+def downgrade():
+    with op.batch_alter_table('dataset', schema=None) as batch_op:
+        batch_op.drop_constraint('fk_dataset_base_dataset_id_dataset', type_='foreignkey')
+        batch_op.drop_index(batch_op.f('ix_dataset_base_dataset_id'))
+        batch_op.drop_column('base_dataset_id')
+
@@ -0,0 +1,27 @@
+"""add optimization_result.updated_date
+
+Revision ID: 42ec59778df4
+Revises: 7db1817a33fa
+Create Date: 2026-10-17 01:24:11.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '42ec59778df4'
+down_revision = '7db1817a33fa'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('optimization_result', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('updated_date', sa.DateTime(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('optimization_result', schema=None) as batch_op:
+        batch_op.drop_column('updated_date')
+
@@ -0,0 +1,42 @@
+"""add optimization_job
+
+Revision ID: 534dd03f7ecb
+Revises: c2b0d5b52173
+Create Date: 2026-10-17 00:27:45.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '534dd03f7ecb'
+down_revision = 'c2b0d5b52173'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('optimization_job',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('dataset_members_id', sa.Integer(), nullable=False),
+    sa.Column('dataset_providers_id', sa.Integer(), nullable=False),
+    sa.Column('optimization_result_id', sa.Integer(), nullable=True),
+    sa.Column('status', sa.String(length=20), nullable=True),
+    sa.Column('stage', sa.String(length=20), nullable=True),
+    sa.Column('options', sa.Text(), nullable=True),
+    sa.Column('stage_timings', sa.Text(), nullable=True),
+    sa.Column('error', sa.Text(), nullable=True),
+    sa.Column('runner_id', sa.String(length=100), nullable=True),
+    sa.Column('created_date', sa.DateTime(), nullable=True),
+    sa.Column('started_date', sa.DateTime(), nullable=True),
+    sa.Column('finished_date', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['dataset_members_id'], ['dataset.id'], ),
+    sa.ForeignKeyConstraint(['dataset_providers_id'], ['dataset.id'], ),
+    sa.ForeignKeyConstraint(['optimization_result_id'], ['optimization_result.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+
+
+def downgrade():
+    op.drop_table('optimization_job')
@@ -0,0 +1,27 @@
+"""add optimization_result.assignments_file
+
+Revision ID: 6212b9b68a7c
+Revises: 3a26888a7b4e
+Create Date: 2026-10-17 01:37:01.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '6212b9b68a7c'
+down_revision = '3a26888a7b4e'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('optimization_result', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('assignments_file', sa.String(length=255), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('optimization_result', schema=None) as batch_op:
+        batch_op.drop_column('assignments_file')
+
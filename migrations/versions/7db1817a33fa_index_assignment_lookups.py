@@ -0,0 +1,28 @@
+"""index assignment lookups
+
+Revision ID: 7db1817a33fa
+Revises: 534dd03f7ecb
+Create Date: 2026-10-17 00:32:10.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7db1817a33fa'
+down_revision = '534dd03f7ecb'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('member_provider_assignment', schema=None) as batch_op:
+        batch_op.create_index('ix_assignment_result_member', ['optimization_result_id', 'member_id'], unique=False)
+        batch_op.create_index('ix_assignment_result_served', ['optimization_result_id', 'is_served'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('member_provider_assignment', schema=None) as batch_op:
+        batch_op.drop_index('ix_assignment_result_served')
+        batch_op.drop_index('ix_assignment_result_member')
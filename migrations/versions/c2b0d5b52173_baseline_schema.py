@@ -0,0 +1,70 @@
+"""baseline schema
+
+Revision ID: c2b0d5b52173
+Revises: 
+Create Date: 2026-10-17 00:13:27.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c2b0d5b52173'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('dataset',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(length=100), nullable=False),
+    sa.Column('file_type', sa.String(length=20), nullable=False),
+    sa.Column('filename', sa.String(length=255), nullable=False),
+    sa.Column('upload_date', sa.DateTime(), nullable=True),
+    sa.Column('record_count', sa.Integer(), nullable=True),
+    sa.Column('is_processed', sa.Boolean(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('optimization_result',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('dataset_members_id', sa.Integer(), nullable=False),
+    sa.Column('dataset_providers_id', sa.Integer(), nullable=False),
+    sa.Column('access_percentage', sa.Float(), nullable=True),
+    sa.Column('original_cost', sa.Float(), nullable=True),
+    sa.Column('optimized_cost', sa.Float(), nullable=True),
+    sa.Column('profit_loss_percentage', sa.Float(), nullable=True),
+    sa.Column('total_members', sa.Integer(), nullable=True),
+    sa.Column('served_members', sa.Integer(), nullable=True),
+    sa.Column('unserved_members', sa.Integer(), nullable=True),
+    sa.Column('total_providers', sa.Integer(), nullable=True),
+    sa.Column('used_providers', sa.Integer(), nullable=True),
+    sa.Column('unused_providers', sa.Integer(), nullable=True),
+    sa.Column('network_status', sa.String(length=100), nullable=True),
+    sa.Column('created_date', sa.DateTime(), nullable=True),
+    sa.Column('optimization_data', sa.Text(), nullable=True),
+    sa.ForeignKeyConstraint(['dataset_members_id'], ['dataset.id'], ),
+    sa.ForeignKeyConstraint(['dataset_providers_id'], ['dataset.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('member_provider_assignment',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('optimization_result_id', sa.Integer(), nullable=False),
+    sa.Column('member_id', sa.String(length=50), nullable=False),
+    sa.Column('provider_id', sa.String(length=50), nullable=True),
+    sa.Column('distance_km', sa.Float(), nullable=True),
+    sa.Column('cost', sa.Float(), nullable=True),
+    sa.Column('provider_rating', sa.Integer(), nullable=True),
+    sa.Column('is_served', sa.Boolean(), nullable=True),
+    sa.Column('member_source_type', sa.String(length=50), nullable=True),
+    sa.Column('provider_source_type', sa.String(length=50), nullable=True),
+    sa.ForeignKeyConstraint(['optimization_result_id'], ['optimization_result.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+
+
+def downgrade():
+    op.drop_table('member_provider_assignment')
+    op.drop_table('optimization_result')
+    op.drop_table('dataset')
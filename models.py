@@ -1,5 +1,7 @@
 from app import db
 from datetime import datetime
+import csv
+import io
 import json
 
 class Dataset(db.Model):
@@ -10,6 +12,9 @@ class Dataset(db.Model):
     upload_date = db.Column(db.DateTime, default=datetime.utcnow)
     record_count = db.Column(db.Integer)
     is_processed = db.Column(db.Boolean, default=False)
+    # Member delta uploads: the members dataset the delta was applied to
+    base_dataset_id = db.Column(db.Integer, db.ForeignKey('dataset.id', name='fk_dataset_base_dataset_id_dataset'), index=True)
+    base_dataset = db.relationship('Dataset', remote_side=[id])
     
 class OptimizationResult(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -27,7 +32,9 @@ class OptimizationResult(db.Model):
     unused_providers = db.Column(db.Integer)
     network_status = db.Column(db.String(100))
     created_date = db.Column(db.DateTime, default=datetime.utcnow)
-    optimization_data = db.Column(db.Text)  # JSON string for detailed results
+    updated_date = db.Column(db.DateTime, default=datetime.utcnow)  # bumped by each incremental patch
+    optimization_data = db.Column(db.Text)  # JSON string of the run details (assignments excluded)
+    assignments_file = db.Column(db.String(255))  # columnar assignments artifact, see utils.result_store
     
     def get_optimization_data(self):
         if self.optimization_data:
@@ -36,8 +43,19 @@ class OptimizationResult(db.Model):
     
     def set_optimization_data(self, data):
         self.optimization_data = json.dumps(data)
+    
+    @property
+    def last_updated(self):
+        """When the result was last written: its run or its latest incremental patch."""
+        # Results from before updated_date existed have it NULL
+        return self.updated_date or self.created_date
 
 class MemberProviderAssignment(db.Model):
+    __table_args__ = (
+        db.Index('ix_assignment_result_member', 'optimization_result_id', 'member_id'),
+        db.Index('ix_assignment_result_served', 'optimization_result_id', 'is_served'),
+    )
+    
     id = db.Column(db.Integer, primary_key=True)
     optimization_result_id = db.Column(db.Integer, db.ForeignKey('optimization_result.id'), nullable=False)
     member_id = db.Column(db.String(50), nullable=False)
@@ -47,4 +65,89 @@ class MemberProviderAssignment(db.Model):
     provider_rating = db.Column(db.Integer)
     is_served = db.Column(db.Boolean, default=False)
     member_source_type = db.Column(db.String(50))
-    provider_source_type = db.Column(db.String(50))
\ No newline at end of file
+    provider_source_type = db.Column(db.String(50))
+    
+    COPY_COLUMNS = ['optimization_result_id', 'member_id', 'provider_id', 'distance_km', 'cost',
+                    'provider_rating', 'is_served', 'member_source_type', 'provider_source_type']
+    
+    @classmethod
+    def bulk_insert(cls, optimization_result_id, assignments, batch_size=5000):
+        """Insert assignment rows in executemany batches, or with COPY on PostgreSQL."""
+        rows = [
+            {
+                'optimization_result_id': optimization_result_id,
+                'member_id': str(a['member_id']),
+                'provider_id': None if a['provider_id'] is None else str(a['provider_id']),
+                'distance_km': a['distance'],
+                'cost': a['cost'],
+                'provider_rating': a['rating'],
+                'is_served': a['provider_id'] is not None,
+                'member_source_type': a['member_source_type'],
+                'provider_source_type': a.get('provider_type')
+            }
+            for a in assignments
+        ]
+        
+        if db.session.get_bind().dialect.name == 'postgresql':
+            cls._copy_rows(rows)
+            return len(rows)
+        
+        for start in range(0, len(rows), batch_size):
+            db.session.execute(cls.__table__.insert(), rows[start:start + batch_size])
+        return len(rows)
+    
+    @classmethod
+    def delete_members(cls, optimization_result_id, member_ids, batch_size=500):
+        """Delete the rows of the given members from one result, in batches."""
+        member_ids = [str(member_id) for member_id in member_ids]
+        for start in range(0, len(member_ids), batch_size):
+            db.session.execute(cls.__table__.delete().where(
+                (cls.optimization_result_id == optimization_result_id) &
+                cls.member_id.in_(member_ids[start:start + batch_size])
+            ))
+    
+    @classmethod
+    def _copy_rows(cls, rows):
+        """Stream rows through PostgreSQL COPY on the session's own transaction."""
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for row in rows:
+            writer.writerow(['\\N' if row[c] is None else row[c] for c in cls.COPY_COLUMNS])
+        buffer.seek(0)
+        
+        cursor = db.session.connection().connection.cursor()
+        try:
+            cursor.copy_expert(
+                f"COPY {cls.__tablename__} ({', '.join(cls.COPY_COLUMNS)}) FROM STDIN WITH (FORMAT csv, NULL '\\N')",
+                buffer
+            )
+        finally:
+            cursor.close()
+
+class OptimizationJob(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    dataset_members_id = db.Column(db.Integer, db.ForeignKey('dataset.id'), nullable=False)
+    dataset_providers_id = db.Column(db.Integer, db.ForeignKey('dataset.id'), nullable=False)
+    optimization_result_id = db.Column(db.Integer, db.ForeignKey('optimization_result.id'))
+    status = db.Column(db.String(20), default='queued')  # 'queued', 'running', 'completed' or 'failed'
+    stage = db.Column(db.String(20))
+    options = db.Column(db.Text)  # JSON string of optimizer options
+    stage_timings = db.Column(db.Text)  # JSON string {stage: seconds}
+    error = db.Column(db.Text)
+    runner_id = db.Column(db.String(100))  # JobRunner.runner_id of the process that queued it
+    created_date = db.Column(db.DateTime, default=datetime.utcnow)
+    started_date = db.Column(db.DateTime)
+    finished_date = db.Column(db.DateTime)
+
+    def get_options(self):
+        if self.options:
+            return json.loads(self.options)
+        return {}
+
+    def get_stage_timings(self):
+        if self.stage_timings:
+            return json.loads(self.stage_timings)
+        return {}
+
+    def set_stage_timings(self, timings):
+        self.stage_timings = json.dumps(timings)
\ No newline at end of file
@@ -1,14 +1,25 @@
 import os
 import pandas as pd
+import numpy as np
 import json
-from flask import render_template, request, jsonify, redirect, url_for, flash, session, send_file
+from flask import render_template, request, jsonify, redirect, url_for, flash, session, send_file, Response
 from werkzeug.utils import secure_filename
+from werkzeug.http import is_resource_modified
 from app import app, db
-from models import Dataset, OptimizationResult, MemberProviderAssignment
+from models import Dataset, OptimizationResult, MemberProviderAssignment, OptimizationJob
 from utils.data_processor import DataProcessor
 from utils.optimizer import NetworkOptimizer
 from utils.geospatial import GeospatialAnalyzer
+from utils.jobs import JobProgress, JobRunner
+from utils.dataset_cache import DatasetCache
+from utils.result_store import ResultStore, PendingFiles
+from utils.map_tiles import MapTileCache, MapTileEngine
+from utils import wire_format
+from utils.wire_format import Records
+from utils.response_cache import ResponseCache
 import logging
+import hashlib
+from datetime import datetime, timezone
 from functools import wraps
 
 import smtplib
@@ -36,6 +47,26 @@ DEMO_MEMBER_CREDENTIALS = {
 MEMBER_PORTAL_URL = "/member"
 
 data_process = DataProcess()
+SEARCH_MAX_LIMIT = 100  # largest page /search_providers returns in paged mode
+
+# Background optimization jobs
+OPTIMIZATION_STAGES = ['parsing', 'indexing', 'candidates', 'assignment', 'persisting']
+job_runner = JobRunner(app, max_workers=app.config.get('OPTIMIZATION_WORKERS', 2))
+
+# Cleaned dataset frames shared by the optimizer, map and download endpoints
+dataset_cache = DatasetCache(app.config['UPLOAD_FOLDER'],
+                             memory_budget=app.config.get('DATASET_CACHE_BYTES', 512 * 1024 * 1024))
+
+# Columnar assignment artifacts of optimization results
+result_store = ResultStore(app.config['UPLOAD_FOLDER'])
+
+# Map tile engines of recently viewed results
+map_tiles = MapTileCache(max_entries=app.config.get('MAP_TILE_ENGINES', 4))
+MAP_ASSIGNMENT_FIELDS = ['member_id', 'provider_id', 'distance', 'rating']
+
+# Rendered dashboard/chart/map/export responses, addressed by result version
+response_cache = ResponseCache(max_bytes=app.config.get('RESPONSE_CACHE_BYTES', 64 * 1024 * 1024))
+RESULT_CACHED_HEADERS = ('Content-Type', 'Content-Disposition', 'Vary')
 
 # -----------------------------
 # SMTP / Email Config
@@ -71,15 +102,29 @@ def search_providers():
         user_lon = float(request.form.get('longitude'))
         provider_type = (request.form.get('provider_type') or 'Hospital').lower()
 
+        # Paged (top-K) mode: only the first `limit` providers after `cursor`
+        limit = request.form.get('limit', type=int)
+        if limit is not None:
+            providers, total, next_cursor = data_process.find_nearby_providers_page(
+                user_lat, user_lon, provider_type, radius_km=15,
+                limit=min(limit, SEARCH_MAX_LIMIT), cursor=request.form.get('cursor') or None
+            )
+            return negotiated_response({
+                'success': True,
+                'providers': Records.from_rows(providers),
+                'count': total,
+                'next_cursor': next_cursor
+            })
+
         providers = data_process.find_nearby_providers(
             user_lat, user_lon, provider_type, radius_km=15
         )
 
         sorted_providers = data_process.sort_providers_by_priority(providers)
 
-        return jsonify({
+        return negotiated_response({
             'success': True,
-            'providers': sorted_providers,
+            'providers': Records.from_rows(sorted_providers),
             'count': len(sorted_providers)
         })
     except Exception as e:
@@ -153,6 +198,16 @@ def login_required(f):
         return f(*args, **kwargs)
     return decorated_function
 
+def negotiated_response(payload):
+    """jsonify payload, or stream it in the columnar/NDJSON format the Accept header asks for."""
+    mimetype = wire_format.negotiate(request.accept_mimetypes)
+    if mimetype == wire_format.JSON_MIMETYPE:
+        response = jsonify(wire_format.plain(payload))
+    else:
+        response = Response(wire_format.stream(payload, mimetype), mimetype=mimetype)
+    response.vary.add('Accept')
+    return response
+
 def admin_required(f):
     @wraps(f)
     def decorated_function(*args, **kwargs):
@@ -162,6 +217,54 @@ def admin_required(f):
         return f(*args, **kwargs)
     return decorated_function
 
+def result_cached(f):
+    """Cache a view's 200 responses for the session's OptimizationResult.
+    
+    A result only changes when an incremental run patches it, which bumps
+    its updated_date, so (id, last_updated) plus the request variant
+    addresses the response. It is served with that ETag and Last-Modified,
+    conditional requests get a 304 without running the view, and other
+    hits come from response_cache.
+    """
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        optimization_id = session.get('optimization_result_id')
+        result = db.session.get(OptimizationResult, optimization_id) if optimization_id else None
+        # Pending flash messages are rendered into pages, so those responses are not reusable
+        if result is None or '_flashes' in session:
+            return f(*args, **kwargs)
+        
+        key = (request.endpoint, result.id, result.last_updated, session.get('username'),
+               tuple(sorted(kwargs.items())), request.query_string,
+               wire_format.negotiate(request.accept_mimetypes))
+        etag = hashlib.sha1(repr(key).encode()).hexdigest()
+        last_modified = result.last_updated.replace(microsecond=0, tzinfo=timezone.utc)
+        
+        if not is_resource_modified(request.environ, etag=etag, last_modified=last_modified):
+            response = Response(status=304)
+        else:
+            cached = response_cache.get(key)
+            if cached is not None:
+                response = Response(cached[0], status=200, headers=cached[1])
+            else:
+                response = app.make_response(f(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+                # Streamed responses have no length and are left alone; send_file ones are read in
+                if response.content_length is not None and response.content_length <= response_cache.max_entry_bytes:
+                    response.direct_passthrough = False
+                    headers = [(name, value) for name, value in response.headers if name in RESULT_CACHED_HEADERS]
+                    response_cache.put(key, response.get_data(), headers)
+        
+        response.set_etag(etag)
+        response.last_modified = last_modified
+        response.cache_control.private = True
+        response.cache_control.no_cache = True  # revalidate (cheaply, via 304) on every use
+        response.vary.add('Accept')
+        response.vary.add('Cookie')
+        return response
+    return decorated_function
+
 # Authentication routes
 @app.route('/login', methods=['GET', 'POST'])
 def login():
@@ -265,9 +368,17 @@ def upload_dataset():
         if not allowed_file(file.filename):
             return jsonify({'error': 'Invalid file type. Please upload a CSV file.'}), 400
         
-        if dataset_type not in ['members', 'providers']:
+        if dataset_type not in ['members', 'providers', 'member_delta']:
             return jsonify({'error': 'Invalid dataset type'}), 400
         
+        # A member delta is applied to the latest members roster
+        base_dataset = None
+        if dataset_type == 'member_delta':
+            base_dataset = (Dataset.query.filter_by(file_type='members', is_processed=True)
+                            .order_by(Dataset.upload_date.desc(), Dataset.id.desc()).first())
+            if base_dataset is None:
+                return jsonify({'error': 'Upload a members dataset before uploading member changes'}), 400
+        
         # Secure filename and save
         filename = secure_filename(file.filename)
         timestamp = str(int(pd.Timestamp.now().timestamp()))
@@ -275,13 +386,24 @@ def upload_dataset():
         filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
         file.save(filepath)
         
-        # Process and validate the dataset
+        # Process and validate the dataset. Members are ingested chunk by chunk
+        # straight into the dataset artifact, so large rosters never sit in memory.
         processor = DataProcessor()
         
         if dataset_type == 'members':
-            df, errors = processor.process_members_data(filepath)
+            record_count, errors = dataset_cache.ingest_members(filepath)
+        elif dataset_type == 'member_delta':
+            delta_df, errors = processor.process_member_delta(filepath)
+            if not errors:
+                base_df = dataset_cache.get(base_dataset)
+                if base_df is None:
+                    errors = [f'Could not load the base members dataset {base_dataset.name}']
+                else:
+                    df, errors = processor.apply_member_delta(base_df, delta_df)
+            record_count = len(df) if not errors else 0
         else:
             df, errors = processor.process_providers_data(filepath)
+            record_count = len(df) if df is not None else 0
         
         if errors:
             # Remove the uploaded file if there were errors
@@ -291,157 +413,344 @@ def upload_dataset():
         # Save dataset info to database
         dataset = Dataset(
             name=file.filename,
-            file_type=dataset_type,
+            file_type='providers' if dataset_type == 'providers' else 'members',
             filename=filename,
-            record_count=len(df),
-            is_processed=True
+            record_count=record_count,
+            is_processed=True,
+            base_dataset_id=base_dataset.id if base_dataset is not None else None
         )
         db.session.add(dataset)
         db.session.commit()
         
-        logger.info(f"Successfully uploaded {dataset_type} dataset with {len(df)} records")
+        # Write the cleaned-frame artifact (and the provider spatial index) once
+        # so later requests skip CSV parsing and index construction
+        if dataset_type == 'providers':
+            dataset_cache.store(dataset, df)
+            dataset_cache.get_index(dataset, df)
+        elif dataset_type == 'member_delta':
+            dataset_cache.store(dataset, df)
+        
+        message = f'Successfully uploaded {dataset_type} dataset with {record_count} records'
+        if dataset_type == 'member_delta':
+            counts = delta_df['Action'].value_counts()
+            message = (f"Applied member changes to {base_dataset.name}: {counts.get('add', 0)} added, "
+                       f"{counts.get('update', 0)} updated, {counts.get('remove', 0)} removed; "
+                       f"{record_count} members")
+        logger.info(message)
         
         return jsonify({
             'success': True,
-            'message': f'Successfully uploaded {dataset_type} dataset with {len(df)} records',
+            'message': message,
             'dataset_id': dataset.id,
-            'record_count': len(df)
+            'record_count': record_count
         })
         
     except Exception as e:
         logger.error(f"Error uploading dataset: {str(e)}")
         return jsonify({'error': f'Upload failed: {str(e)}'}), 500
 
-@app.route('/optimize_network', methods=['POST'])
-@admin_required
-def optimize_network():
-    try:
-        # Get the latest datasets
-        members_dataset = Dataset.query.filter_by(file_type='members', is_processed=True).order_by(Dataset.upload_date.desc()).first()
-        providers_dataset = Dataset.query.filter_by(file_type='providers', is_processed=True).order_by(Dataset.upload_date.desc()).first()
-        
-        if not members_dataset or not providers_dataset:
-            return jsonify({'error': 'Both member and provider datasets are required'}), 400
-        
-        # Load data
-        processor = DataProcessor()
-        members_path = os.path.join(app.config['UPLOAD_FOLDER'], members_dataset.filename)
-        providers_path = os.path.join(app.config['UPLOAD_FOLDER'], providers_dataset.filename)
-        
-        members_df, _ = processor.process_members_data(members_path)
-        providers_df, _ = processor.process_providers_data(providers_path)
-        
-        # Initialize optimizer
-        optimizer = NetworkOptimizer()
-        geospatial = GeospatialAnalyzer()
-        
-        # Use optimized algorithm for large datasets
+def _optimize_datasets(members_dataset, providers_dataset, options, progress):
+    """Run the optimization pipeline for two datasets and persist the result.
+    
+    With the 'incremental' option the latest result for the same members is
+    patched instead, when there is one to patch and the patch keeps it
+    inside the cost band.
+    """
+    if options.get('incremental'):
+        base = _incremental_base(members_dataset, providers_dataset, options)
+        optimization_result = None
+        if base is not None:
+            optimization_result = _optimize_incremental(*base, members_dataset, providers_dataset, options, progress)
+        if optimization_result is not None:
+            return optimization_result
+        logger.info("Incremental update not possible, running a full optimization")
+    
+    with progress.stage('parsing'):
+        members = dataset_cache.get_prepared(members_dataset)
+        providers = dataset_cache.get_prepared(providers_dataset)
+        if members is None or providers is None:
+            raise ValueError('Could not load the member or provider dataset')
+        members_df, providers_df = members.frame, providers.frame
+    
+    # Initialize optimizer
+    optimizer = NetworkOptimizer()
+    optimizer.capacity_aware = bool(options.get('capacity_aware'))
+    optimizer.sharded = bool(options.get('sharded', app.config.get('OPTIMIZER_SHARDED', False)))
+    
+    with progress.stage('indexing'):
+        # Sharded runs index each tile inside its worker
+        provider_index = None if optimizer.sharded else dataset_cache.get_index(providers_dataset, providers_df)
+    
+    with progress.stage('candidates'):
         logger.info("Finding candidate provider connections using optimized algorithm...")
-        
-        # Sample data for demonstration with large datasets
-        members_sample = members_df
-        providers_sample = providers_df
-        
-        candidate_connections = optimizer.find_candidate_connections(
-            members_sample, providers_sample, geospatial, max_distance=15.0
+        candidate_graph = optimizer.build_candidate_graph(
+            members, providers, max_distance=15.0, provider_index=provider_index
         )
-        
-        logger.info(f"Found {len(candidate_connections)} candidate connections")
-        
+        logger.info(f"Found {candidate_graph.n_edges} candidate connections")
+    
+    with progress.stage('assignment'):
         # Optimize assignments
-        assignments = optimizer.optimize_assignments(candidate_connections, members_sample, providers_sample)
-        
-        # Calculate metrics
-        total_members = len(members_sample)
-        served_members = len([a for a in assignments if a['provider_id'] is not None])
-        unserved_members = total_members - served_members
-        access_percentage = (served_members / total_members) * 100
-        
-        # Calculate costs
-        original_cost = members_sample['cost'].sum()
-        optimized_cost = sum(a['cost'] for a in assignments if a['cost'] is not None)
-        profit_loss_percentage = ((original_cost - optimized_cost) / original_cost) * 100
-
-        # Determine network status
-        if access_percentage == 100:
-            network_status = "No need to change organization"
-        elif access_percentage >= 95:
-            network_status = "Good in provider and member access"
-        else:
-            network_status = "Organization must increase providers"
-        
-        # Count used/unused providers
-        used_provider_ids = set(a['provider_id'] for a in assignments if a['provider_id'] is not None)
-        total_providers = len(providers_sample)
-        used_providers = len(used_provider_ids)
-        unused_providers = total_providers - used_providers
-        
+        assignments = optimizer.optimize_assignments(candidate_graph, members, providers)
+        metrics = optimizer.assignment_metrics(assignments, members_df, providers_df)
+        summary = metrics.summary()
+    
+    # Artifacts are published once the rows are committed, and dropped if that fails
+    with progress.stage('persisting'), PendingFiles() as pending:
         # Create optimization result
         optimization_result = OptimizationResult(
             dataset_members_id=members_dataset.id,
             dataset_providers_id=providers_dataset.id,
-            access_percentage=access_percentage,
-            original_cost=original_cost,
-            optimized_cost=optimized_cost,
-            profit_loss_percentage=profit_loss_percentage,
-            total_members=total_members,
-            served_members=served_members,
-            unserved_members=unserved_members,
-            total_providers=total_providers,
-            used_providers=used_providers,
-            unused_providers=unused_providers,
-            network_status=network_status
+            **summary
         )
         
-        # Store detailed optimization data
+        # Store detailed optimization data (the assignments go to the result artifact)
         optimization_data = {
-            'assignments': assignments,
-            'candidate_connections': len(candidate_connections),
-            'source_type_analysis': optimizer.analyze_by_source_type(assignments, members_sample)
+            'candidate_connections': candidate_graph.n_edges,
+            'source_type_analysis': metrics.by_source_type(),
+            'cost_adjustment': optimizer.last_adjustment,
+            'options': {'capacity_aware': optimizer.capacity_aware}
         }
         optimization_result.set_optimization_data(optimization_data)
         
         db.session.add(optimization_result)
-        db.session.commit()
+        db.session.flush()
         
         # Store individual assignments
-        for assignment in assignments:
-            member_assignment = MemberProviderAssignment(
-                optimization_result_id=optimization_result.id,
-                member_id=assignment['member_id'],
-                provider_id=assignment['provider_id'],
-                distance_km=assignment['distance'],
-                cost=assignment['cost'],
-                provider_rating=assignment['rating'],
-                is_served=assignment['provider_id'] is not None,
-                member_source_type=assignment['member_source_type'],
-                provider_source_type=assignment.get('provider_type')
-            )
-            db.session.add(member_assignment)
+        MemberProviderAssignment.bulk_insert(optimization_result.id, assignments)
+        result_store.save(optimization_result, assignments, optimizer.last_used_providers, pending)
+        result_store.save_unused_providers(optimization_result, providers_df, optimizer.last_used_providers, pending)
+        map_engine = _save_map(optimization_result, members_df, providers_df, assignments, pending)
         
         db.session.commit()
+    # After publishing, replacing any engine built from the old arrays in between
+    map_tiles.put(_map_key(optimization_result), map_engine)
+    
+    logger.info(f"Optimization completed. Access: {summary['access_percentage']:.2f}%, "
+                f"Served: {summary['served_members']}/{summary['total_members']}")
+    return optimization_result
+
+def _incremental_base(members_dataset, providers_dataset, options):
+    """(previous result, its data, its members and providers Datasets) for an incremental run, or None.
+    
+    The previous result must be the latest one for these members or for a
+    members dataset they were merged from by delta uploads, optimized in the
+    same capacity mode, with its source CSVs still on disk.
+    """
+    lineage = []
+    dataset = members_dataset
+    while dataset is not None and dataset.id not in lineage:
+        lineage.append(dataset.id)
+        dataset = dataset.base_dataset
+    previous = (OptimizationResult.query.filter(OptimizationResult.dataset_members_id.in_(lineage))
+                .order_by(db.func.coalesce(OptimizationResult.updated_date,
+                                           OptimizationResult.created_date).desc()).first())
+    if previous is None:
+        return None
+    
+    previous_data = previous.get_optimization_data()
+    if bool(previous_data.get('options', {}).get('capacity_aware')) != bool(options.get('capacity_aware')):
+        logger.info(f"Result {previous.id} used another capacity mode, not patching it")
+        return None
+    old_members_dataset = db.session.get(Dataset, previous.dataset_members_id)
+    old_providers_dataset = db.session.get(Dataset, previous.dataset_providers_id)
+    for dataset in (old_members_dataset, old_providers_dataset):
+        if dataset is None or not os.path.exists(dataset_cache.csv_path(dataset)):
+            return None
+    return previous, previous_data, old_members_dataset, old_providers_dataset
+
+def _optimize_incremental(previous, previous_data, old_members_dataset, old_providers_dataset,
+                          members_dataset, providers_dataset, options, progress):
+    """Re-optimize only changed members and members near changed providers, patching
+    the previous result in place.
+    
+    Returns None without persisting anything if the previous result was
+    inside the cost band and the patched one is not (only re-optimized
+    members can move, which may not be enough).
+    """
+    with progress.stage('parsing'):
+        members = dataset_cache.get_prepared(members_dataset)
+        providers = dataset_cache.get_prepared(providers_dataset)
+        old_providers = dataset_cache.get_prepared(old_providers_dataset)
+        old_members = members
+        if old_members_dataset.id != members_dataset.id:
+            old_members = dataset_cache.get_prepared(old_members_dataset)
+        if members is None or providers is None or old_providers is None or old_members is None:
+            raise ValueError('Could not load the member or provider dataset')
+        members_df, providers_df = members.frame, providers.frame
+    
+    optimizer = NetworkOptimizer()
+    optimizer.capacity_aware = bool(options.get('capacity_aware'))
+    
+    with progress.stage('indexing'):
+        provider_index = dataset_cache.get_index(providers_dataset, providers_df)
+    
+    with progress.stage('candidates'):
+        previous_assignments = result_store.load(previous, fields=['provider_id', 'distance'])
+        candidate_graph, affected = optimizer.build_incremental_graph(
+            previous_assignments, members, old_providers, providers,
+            max_distance=15.0, provider_index=provider_index, previous_members=old_members
+        )
+    
+    with progress.stage('assignment'):
+        assignments = optimizer.optimize_incremental(candidate_graph, affected, members, providers)
+        if (previous_data.get('cost_adjustment', {}).get('within_band')
+                and not optimizer.last_adjustment.get('within_band')):
+            return None
+        metrics = optimizer.assignment_metrics(assignments, members_df, providers_df)
+        summary = metrics.summary()
+    
+    # The previous artifacts stay in place until the patched rows are committed
+    with progress.stage('persisting'), PendingFiles() as pending:
+        for key, value in summary.items():
+            setattr(previous, key, value)
+        previous.dataset_members_id = members_dataset.id
+        previous.dataset_providers_id = providers_dataset.id
+        previous.updated_date = datetime.utcnow()
         
-        # Store result ID in session for dashboard
-        session['optimization_result_id'] = optimization_result.id
+        previous_data.update({
+            'source_type_analysis': metrics.by_source_type(),
+            'cost_adjustment': optimizer.last_adjustment,
+            'incremental': dict(optimizer.last_incremental, previous_members_id=old_members_dataset.id,
+                                previous_providers_id=old_providers_dataset.id)
+        })
+        previous_data.pop('candidate_connections', None)  # only known for full runs
+        previous_data.pop('assignments', None)  # results from before the artifact
+        previous.set_optimization_data(previous_data)
         
-        logger.info(f"Optimization completed. Access: {access_percentage:.2f}%, Served: {served_members}/{total_members}")
+        # Replace only the affected members' assignment rows, and drop removed members'
+        affected_assignments = [assignments[i] for i in affected.tolist()]
+        stale_ids = [a['member_id'] for a in affected_assignments]
+        if old_members is not members:
+            stale_ids += pd.Index(old_members.frame['MemberID']).difference(members_df['MemberID']).tolist()
+        MemberProviderAssignment.delete_members(previous.id, stale_ids)
+        MemberProviderAssignment.bulk_insert(previous.id, affected_assignments)
+        result_store.save(previous, assignments, optimizer.last_used_providers, pending)
+        result_store.save_unused_providers(previous, providers_df, optimizer.last_used_providers, pending)
+        map_engine = _save_map(previous, members_df, providers_df, assignments, pending)
+        
+        db.session.commit()
+    # After publishing, replacing any engine built from the old arrays in between
+    map_tiles.put(_map_key(previous), map_engine)
+    
+    logger.info(f"Incremental optimization patched result {previous.id}: {len(affected)} members re-optimized. "
+                f"Access: {summary['access_percentage']:.2f}%")
+    return previous
+
+def _save_job_progress(job, progress):
+    job.stage = progress.current
+    job.set_stage_timings(progress.timings)
+    db.session.commit()
+
+def run_optimization_job(job_id):
+    """Background entry point: run one queued OptimizationJob."""
+    job = db.session.get(OptimizationJob, job_id)
+    job.status = 'running'
+    job.started_date = datetime.utcnow()
+    db.session.commit()
+    
+    progress = JobProgress(OPTIMIZATION_STAGES, on_update=lambda p: _save_job_progress(job, p))
+    try:
+        members_dataset = db.session.get(Dataset, job.dataset_members_id)
+        providers_dataset = db.session.get(Dataset, job.dataset_providers_id)
+        optimization_result = _optimize_datasets(members_dataset, providers_dataset, job.get_options(), progress)
+        job.optimization_result_id = optimization_result.id
+        job.status = 'completed'
+    except Exception as e:
+        logger.error(f"Error in network optimization job {job_id}: {str(e)}")
+        db.session.rollback()
+        job.status = 'failed'
+        job.error = str(e)
+    finally:
+        job.finished_date = datetime.utcnow()
+        job.set_stage_timings(progress.timings)
+        db.session.commit()
+
+def fail_orphaned_jobs():
+    """Mark queued or running jobs whose process is gone as failed; they would never finish."""
+    jobs = OptimizationJob.query.filter(OptimizationJob.status.in_(['queued', 'running'])).all()
+    orphaned = [job for job in jobs if job_runner.is_orphaned(job.runner_id)]
+    for job in orphaned:
+        job.status = 'failed'
+        job.error = 'Interrupted: the server restarted before the job finished'
+        job.finished_date = datetime.utcnow()
+    if orphaned:
+        db.session.commit()
+        logger.warning(f"Marked {len(orphaned)} interrupted optimization jobs as failed")
+
+@app.route('/optimize_network', methods=['POST'])
+@admin_required
+def optimize_network():
+    try:
+        # Get the latest datasets
+        members_dataset = Dataset.query.filter_by(file_type='members', is_processed=True).order_by(Dataset.upload_date.desc()).first()
+        providers_dataset = Dataset.query.filter_by(file_type='providers', is_processed=True).order_by(Dataset.upload_date.desc()).first()
+        
+        if not members_dataset or not providers_dataset:
+            return jsonify({'error': 'Both member and provider datasets are required'}), 400
+        
+        options = request.get_json(silent=True) or {}
+        job = OptimizationJob(
+            dataset_members_id=members_dataset.id,
+            dataset_providers_id=providers_dataset.id,
+            options=json.dumps({key: options[key] for key in ('capacity_aware', 'sharded', 'incremental') if key in options}),
+            runner_id=job_runner.runner_id
+        )
+        db.session.add(job)
+        db.session.commit()
+        
+        job_runner.submit(run_optimization_job, job.id)
         
         return jsonify({
             'success': True,
-            'optimization_id': optimization_result.id,
-            'access_percentage': access_percentage,
-            'served_members': served_members,
-            'total_members': total_members,
-            'network_status': network_status,
-            'redirect': url_for('dashboard')
-        })
+            'job_id': job.id,
+            'status': job.status,
+            'status_url': url_for('get_job_status', job_id=job.id)
+        }), 202
         
     except Exception as e:
         logger.error(f"Error in network optimization: {str(e)}")
         return jsonify({'error': f'Optimization failed: {str(e)}'}), 500
 
+@app.route('/api/jobs/<int:job_id>')
+@admin_required
+def get_job_status(job_id):
+    job = OptimizationJob.query.get_or_404(job_id)
+    timings = job.get_stage_timings()
+    
+    response = {
+        'job_id': job.id,
+        'status': job.status,
+        'stage': job.stage,
+        'stages': [
+            {'name': stage, 'seconds': timings.get(stage), 'done': stage in timings}
+            for stage in OPTIMIZATION_STAGES
+        ],
+        'progress': len(timings) / len(OPTIMIZATION_STAGES) * 100,
+        'created_date': job.created_date.isoformat() if job.created_date else None,
+        'started_date': job.started_date.isoformat() if job.started_date else None,
+        'finished_date': job.finished_date.isoformat() if job.finished_date else None
+    }
+    
+    if job.status == 'completed':
+        result = db.session.get(OptimizationResult, job.optimization_result_id)
+        # Store result ID in session for dashboard
+        session['optimization_result_id'] = result.id
+        response.update({
+            'optimization_id': result.id,
+            'access_percentage': result.access_percentage,
+            'served_members': result.served_members,
+            'total_members': result.total_members,
+            'network_status': result.network_status,
+            'redirect': url_for('dashboard')
+        })
+    elif job.status == 'failed':
+        response['error'] = f'Optimization failed: {job.error}'
+    
+    return jsonify(response)
+
 @app.route('/dashboard')
 @admin_required
+@result_cached
 def dashboard():
     optimization_id = session.get('optimization_result_id')
     if not optimization_id:
@@ -464,95 +773,127 @@ def visualization():
     result = OptimizationResult.query.get_or_404(optimization_id)
     return render_template('visualization.html', result=result)
 
+def _map_key(result):
+    """Cache key of a result's map engine; an incremental run changes it."""
+    return (result.id, result.last_updated, result.dataset_members_id, result.dataset_providers_id)
+
+def _save_map(result, members_df, providers_df, assignments, pending=None):
+    """Build a flushed result's MapTileEngine and save its arrays next to the assignments."""
+    columns = {field: [a[field] for a in assignments] for field in MAP_ASSIGNMENT_FIELDS}
+    engine = MapTileEngine(members_df, providers_df, columns)
+    result_store.save_map(result, engine.to_arrays(), pending)
+    return engine
+
+def _map_engine(result):
+    """MapTileEngine of a result, from its precomputed map arrays when it has them."""
+    def build():
+        members_df = dataset_cache.get(db.session.get(Dataset, result.dataset_members_id))
+        providers_df = dataset_cache.get(db.session.get(Dataset, result.dataset_providers_id))
+        if members_df is None or providers_df is None:
+            raise ValueError('Could not load the member or provider dataset')
+        arrays = result_store.load_map(result)
+        if arrays is not None:
+            try:
+                return MapTileEngine.from_arrays(arrays, members_df, providers_df)
+            except (KeyError, ValueError) as e:
+                logger.warning(f"Rebuilding map arrays of result {result.id}: {str(e)}")
+        columns = result_store.load_columns(result, MAP_ASSIGNMENT_FIELDS)
+        return MapTileEngine(members_df, providers_df, columns)
+    
+    return map_tiles.get(_map_key(result), build)
+
 @app.route('/api/map_data')
 @admin_required
+@result_cached
 def get_map_data():
+    """Every member and provider of the current result.
+    
+    ?format=compact returns MapTileEngine.compact() parallel arrays (delta
+    encoded coordinates) instead of one object per point. Either payload
+    can be streamed as columnar JSON or NDJSON (see negotiated_response).
+    """
     optimization_id = session.get('optimization_result_id')
     if not optimization_id:
         return jsonify({'error': 'No optimization results found'}), 404
     
     try:
         result = OptimizationResult.query.get_or_404(optimization_id)
-        assignments = MemberProviderAssignment.query.filter_by(optimization_result_id=optimization_id).all()
-        
-        # Load datasets with same sampling logic for consistency
-        members_dataset = Dataset.query.get(result.dataset_members_id)
-        providers_dataset = Dataset.query.get(result.dataset_providers_id)
-        
-        processor = DataProcessor()
-        members_path = os.path.join(app.config['UPLOAD_FOLDER'], members_dataset.filename)
-        providers_path = os.path.join(app.config['UPLOAD_FOLDER'], providers_dataset.filename)
-        
-        members_df, _ = processor.process_members_data(members_path)
-        providers_df, _ = processor.process_providers_data(providers_path)
         
-        # Use same sampling logic for consistency
-        if len(members_df) > 1000 or len(providers_df) > 500:
-            members_df = members_df.sample(n=min(1000, len(members_df)), random_state=42)
-            providers_df = providers_df.sample(n=min(500, len(providers_df)), random_state=42)
+        # Assignments are joined to the members once, inside the engine
+        engine = _map_engine(result)
+        members_df, providers_df = engine.members_df, engine.providers_df
+        stats = {
+            'total_members': result.total_members,
+            'served_members': result.served_members,
+            'unserved_members': result.unserved_members,
+            'access_percentage': result.access_percentage
+        }
         
-        # Prepare map data
-        served_members = []
-        unserved_members = []
-        used_providers = set()
+        if request.args.get('format') == 'compact':
+            return negotiated_response(dict(engine.compact(), format='compact', stats=stats))
         
-        for assignment in assignments:
-            member_match = members_df[members_df['MemberID'] == int(assignment.member_id)]
-            if member_match.empty:
-                logger.warning(f"Skipping member {assignment.member_id} - not in sampled dataset")
-                continue  # Skip this member safely
-            member_row = member_match.iloc[0]
-            member_data = {
-                'id': assignment.member_id,
-                'lat': float(member_row['Latitude']),
-                'lng': float(member_row['Longitude']),
-                'source_type': assignment.member_source_type,
-                'cost': float(member_row['cost']),
-                'is_served': assignment.is_served
-            }
-            
-            if assignment.is_served:
-                member_data['provider_id'] = assignment.provider_id
-                member_data['distance'] = assignment.distance_km
-                member_data['provider_rating'] = assignment.provider_rating
-                served_members.append(member_data)
-                used_providers.add(assignment.provider_id)
-            else:
-                unserved_members.append(member_data)
-        
-        # Get provider data
-        providers_data = []
-        for _, provider in providers_df.iterrows():
-            provider_data = {
-                'id': str(provider['ProviderID']),
-                'lat': float(provider['Latitude']),
-                'lng': float(provider['Longitude']),
-                'name': provider['Location'].split(',')[0] if ',' in provider['Location'] else provider['Location'],
-                'type': provider['Type'],
-                'rating': provider['CMS Rating'],
-                'cost': provider['Cost'],
-                'is_used': str(provider['ProviderID']) in used_providers
+        def member_records(rows, served):
+            # Coordinates are float32; 6 decimals (~0.1 m) keeps the payload compact
+            columns = {
+                'id': [str(member_id) for member_id in members_df['MemberID'].to_numpy()[rows].tolist()],
+                'lat': [round(lat, 6) for lat in members_df['Latitude'].to_numpy()[rows].tolist()],
+                'lng': [round(lng, 6) for lng in members_df['Longitude'].to_numpy()[rows].tolist()],
+                'source_type': members_df['SourceType'].to_numpy()[rows].tolist(),
+                'cost': members_df['cost'].to_numpy(dtype=np.float64)[rows].tolist(),
+                'is_served': [served] * len(rows)
             }
-            providers_data.append(provider_data)
+            if served:
+                columns['provider_id'] = [str(provider_id) for provider_id in engine.member_provider[rows].tolist()]
+                columns['distance'] = engine.member_distance[rows].tolist()
+                columns['provider_rating'] = engine.member_rating[rows].tolist()
+            return Records(columns)
         
-        return jsonify({
-            'served_members': served_members,
-            'unserved_members': unserved_members,
-            'providers': providers_data,
-            'stats': {
-                'total_members': result.total_members,
-                'served_members': result.served_members,
-                'unserved_members': result.unserved_members,
-                'access_percentage': result.access_percentage
-            }
+        providers = Records({
+            'id': [str(provider_id) for provider_id in providers_df['ProviderID'].tolist()],
+            'lat': [round(lat, 6) for lat in providers_df['Latitude'].tolist()],
+            'lng': [round(lng, 6) for lng in providers_df['Longitude'].tolist()],
+            'name': [location.split(',', 1)[0] for location in providers_df['Location'].tolist()],
+            'type': providers_df['Type'].tolist(),
+            'rating': providers_df['CMS Rating'].tolist(),
+            'cost': providers_df['Cost'].tolist(),
+            'is_used': engine.provider_used.tolist()
+        })
+        
+        return negotiated_response({
+            'served_members': member_records(np.flatnonzero(engine.member_served), True),
+            'unserved_members': member_records(np.flatnonzero(~engine.member_served), False),
+            'providers': providers,
+            'stats': stats
         })
         
     except Exception as e:
         logger.error(f"Error getting map data: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/map_tiles/<int:z>/<int:x>/<int:y>')
+@admin_required
+def get_map_tile(z, x, y):
+    """Member and provider clusters of one web-map tile (served/used counts per cluster)."""
+    optimization_id = session.get('optimization_result_id')
+    if not optimization_id:
+        return jsonify({'error': 'No optimization results found'}), 404
+    
+    try:
+        result = OptimizationResult.query.get_or_404(optimization_id)
+        tile = _map_engine(result).tile(z, x, y)
+        tile['members'] = Records.from_rows(tile['members'])
+        tile['providers'] = Records.from_rows(tile['providers'])
+        return negotiated_response(tile)
+        
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        logger.error(f"Error getting map tile {z}/{x}/{y}: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/download_unused_providers')
 @admin_required
+@result_cached
 def download_unused_providers():
     optimization_id = session.get('optimization_result_id')
     if not optimization_id:
@@ -565,34 +906,24 @@ def download_unused_providers():
             flash('All providers are being used. Organization is working in good condition.', 'success')
             return redirect(url_for('dashboard'))
         
-        # Get used provider IDs
-        assignments = MemberProviderAssignment.query.filter_by(
-            optimization_result_id=optimization_id,
-            is_served=True
-        ).all()
-        used_provider_ids = set(a.provider_id for a in assignments if a.provider_id)
-        
-        # Load providers data
-        providers_dataset = Dataset.query.get(result.dataset_providers_id)
-        processor = DataProcessor()
-        providers_path = os.path.join(app.config['UPLOAD_FOLDER'], providers_dataset.filename)
-        providers_df, _ = processor.process_providers_data(providers_path)
-        
-        # Filter unused providers
-        unused_providers_df = providers_df[~providers_df['ProviderID'].astype(str).isin(used_provider_ids)]
-        
-        # Select relevant columns for download
-        download_columns = ['ProviderID', 'Location', 'Type', 'CMS Rating', 'Cost', 'Contact Number']
-        unused_providers_export = unused_providers_df[download_columns].copy()
-        
-        # Rename columns for better readability
-        unused_providers_export.columns = ['Provider ID', 'Provider Name & Address', 'Type', 'Rating', 'Cost', 'Contact Number']
-        
-        # Save to CSV
-        export_filename = f'unused_providers_{optimization_id}.csv'
-        export_path = os.path.join(app.config['UPLOAD_FOLDER'], export_filename)
-        unused_providers_export.to_csv(export_path, index=False)
+        # Written at optimization time; results from before that get it on first download
+        export_path = result_store.unused_providers_file(result)
+        if export_path is None:
+            providers_df = dataset_cache.get(db.session.get(Dataset, result.dataset_providers_id))
+            used_providers = result_store.load_used_providers(result)
+            if used_providers is None or len(used_providers) != len(providers_df):
+                assignments = MemberProviderAssignment.query.filter_by(
+                    optimization_result_id=optimization_id,
+                    is_served=True
+                ).all()
+                used_provider_ids = set(a.provider_id for a in assignments if a.provider_id)
+                used_providers = providers_df['ProviderID'].astype(str).isin(used_provider_ids).to_numpy()
+            export_path = result_store.save_unused_providers(result, providers_df, used_providers)
         
+        export_filename = os.path.basename(export_path)
+        if request.args.get('compression') == 'gzip':
+            return Response(wire_format.iter_gzip_file(export_path), mimetype='application/gzip',
+                            headers={'Content-Disposition': f'attachment; filename={export_filename}.gz'})
         return send_file(export_path, as_attachment=True, download_name=export_filename)
         
     except Exception as e:
@@ -602,6 +933,7 @@ def download_unused_providers():
 
 @app.route('/api/chart_data')
 @admin_required
+@result_cached
 def get_chart_data():
     optimization_id = session.get('optimization_result_id')
     if not optimization_id:
@@ -614,7 +946,7 @@ def get_chart_data():
         # Source type analysis
         source_type_analysis = optimization_data.get('source_type_analysis', {})
         
-        return jsonify({
+        return negotiated_response({
             'access_chart': {
                 'served': result.served_members,
                 'unserved': result.unserved_members,
@@ -677,7 +1009,7 @@ def get_member_providers():
             return jsonify({'error': 'Invalid member'}), 401
         
         # Get latest optimization result
-        result = OptimizationResult.query.order_by(OptimizationResult.created_at.desc()).first()
+        result = OptimizationResult.query.order_by(OptimizationResult.created_date.desc()).first()
         if not result:
             return jsonify({'providers': [], 'message': 'No optimization results available'})
         
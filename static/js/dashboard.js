@@ -43,13 +43,7 @@ document.addEventListener('DOMContentLoaded', function() {
         loadChartData: function() {
             NetworkOptApp.utils.showLoading(document.querySelector('.chart-container'), 'Loading chart data...');
             
-            fetch('/api/chart_data')
-                .then(response => {
-                    if (!response.ok) {
-                        throw new Error(`HTTP ${response.status}: ${response.statusText}`);
-                    }
-                    return response.json();
-                })
+            NetworkOptApp.api.fetchData(NetworkOptApp.config.apiEndpoints.chartData)
                 .then(data => {
                     this.createCharts(data);
                 })
@@ -267,6 +267,51 @@ window.NetworkOptApp = {
             const i = parseInt(Math.floor(Math.log(bytes) / Math.log(1024)));
             return Math.round(bytes / Math.pow(1024, i) * 100) / 100 + ' ' + sizes[i];
         }
+    },
+
+    // API responses in the columnar wire format (see utils/wire_format.py)
+    api: {
+        columnarType: 'application/vnd.networkopt.columnar+json',
+
+        // Fetch JSON, asking for the columnar format; the server may still answer plain JSON
+        fetchData: function(url, options = {}) {
+            const headers = Object.assign({ 'Accept': `${this.columnarType}, application/json;q=0.9` }, options.headers);
+            return fetch(url, Object.assign({}, options, { headers }))
+                .then(response => {
+                    if (!response.ok) {
+                        throw new Error(`HTTP ${response.status}: ${response.statusText}`);
+                    }
+                    const isColumnar = (response.headers.get('Content-Type') || '').startsWith(this.columnarType);
+                    return response.json().then(data => isColumnar ? this.decodeColumnar(data) : data);
+                });
+        },
+
+        // Turn {$length, $columns} sections back into arrays of objects, as the JSON format sends them
+        decodeColumnar: function(value) {
+            if (Array.isArray(value)) {
+                return value.map(item => this.decodeColumnar(item));
+            }
+            if (!value || typeof value !== 'object') {
+                return value;
+            }
+            if (value.$columns) {
+                const names = Object.keys(value.$columns);
+                const rows = new Array(value.$length);
+                for (let i = 0; i < value.$length; i++) {
+                    const row = {};
+                    names.forEach(name => {
+                        row[name] = value.$columns[name][i];
+                    });
+                    rows[i] = row;
+                }
+                return rows;
+            }
+            const decoded = {};
+            Object.keys(value).forEach(key => {
+                decoded[key] = this.decodeColumnar(value[key]);
+            });
+            return decoded;
+        }
     }
 };
 
@@ -12,18 +12,17 @@ document.addEventListener('DOMContentLoaded', function() {
             usedProviders: null,
             unusedProviders: null
         },
-        markers: {
-            servedMembers: [],
-            unservedMembers: [],
-            usedProviders: [],
-            unusedProviders: []
-        },
-        mapData: null,
+        // Markers are drawn per map tile from /api/map_tiles clusters and
+        // removed again when Leaflet unloads the tile
+        clusterLayer: null,
+        tileMarkers: {},
+        tileGeneration: {},
+        summary: null,  // tile 0/0/0: totals and bounds of the whole result
         
         init: function() {
             this.showLoadingModal();
             this.initMap();
-            this.loadMapData();
+            this.loadSummary();
             this.initEventListeners();
             console.log('Visualization initialized');
         },
@@ -125,19 +124,17 @@ document.addEventListener('DOMContentLoaded', function() {
             });
         },
 
-        loadMapData: function() {
-            fetch('/api/map_data')
-                .then(response => {
-                    if (!response.ok) {
-                        throw new Error(`HTTP ${response.status}: ${response.statusText}`);
-                    }
-                    return response.json();
-                })
+        fetchTile: function(z, x, y) {
+            return NetworkOptApp.api.fetchData(`/api/map_tiles/${z}/${x}/${y}`);
+        },
+
+        loadSummary: function() {
+            this.fetchTile(0, 0, 0)
                 .then(data => {
-                    this.mapData = data;
-                    this.createMapMarkers();
+                    this.summary = data;
                     this.updateStats();
                     this.fitAllBounds();
+                    this.clusterLayer = this.createClusterLayer().addTo(this.map);
                     this.hideLoadingModal();
                 })
                 .catch(error => {
@@ -147,46 +144,128 @@ document.addEventListener('DOMContentLoaded', function() {
                 });
         },
 
-        createMapMarkers: function() {
-            if (!this.mapData) return;
+        createClusterLayer: function() {
+            const app = this;
+            const ClusterLayer = L.GridLayer.extend({
+                createTile: function(coords, done) {
+                    const tile = document.createElement('div');
+                    app.loadTile(coords).then(() => done(null, tile), error => done(error, tile));
+                    return tile;
+                }
+            });
+
+            const layer = new ClusterLayer({ noWrap: true, updateWhenZooming: false });
+            layer.on('tileunload', (e) => this.unloadTile(e.coords));
+            return layer;
+        },
 
-            // Clear existing markers
-            this.clearAllMarkers();
+        loadTile: function(coords) {
+            const key = `${coords.z}/${coords.x}/${coords.y}`;
+            const generation = (this.tileGeneration[key] || 0) + 1;
+            this.tileGeneration[key] = generation;
+            if (coords.x < 0 || coords.x >= (1 << coords.z)) {
+                return Promise.resolve();
+            }
 
-            // Create served member markers
-            this.mapData.served_members.forEach(member => {
-                const marker = this.createMemberMarker(member, true);
-                this.markers.servedMembers.push(marker);
-                this.layers.servedMembers.addLayer(marker);
-            });
+            return this.fetchTile(coords.z, coords.x, coords.y).then(tile => {
+                // The tile may have been unloaded (or reloaded) while in flight
+                if (this.tileGeneration[key] !== generation) return;
+
+                const markers = [];
+                const add = (layerName, marker) => {
+                    this.layers[layerName].addLayer(marker);
+                    markers.push([layerName, marker]);
+                };
+
+                // Clusters go to the layer of their majority, so the filters still apply
+                tile.members.forEach(cluster => {
+                    const isServed = cluster.served * 2 >= cluster.count;
+                    const marker = cluster.count === 1
+                        ? this.createMemberMarker(cluster, isServed)
+                        : this.createMemberClusterMarker(cluster);
+                    add(isServed ? 'servedMembers' : 'unservedMembers', marker);
+                });
+
+                tile.providers.forEach(cluster => {
+                    const isUsed = cluster.used * 2 >= cluster.count;
+                    const marker = cluster.count === 1
+                        ? this.createProviderMarker(Object.assign({ is_used: isUsed }, cluster))
+                        : this.createProviderClusterMarker(cluster);
+                    add(isUsed ? 'usedProviders' : 'unusedProviders', marker);
+                });
 
-            // Create unserved member markers
-            this.mapData.unserved_members.forEach(member => {
-                const marker = this.createMemberMarker(member, false);
-                this.markers.unservedMembers.push(marker);
-                this.layers.unservedMembers.addLayer(marker);
+                this.tileMarkers[key] = markers;
             });
+        },
 
-            // Create provider markers
-            this.mapData.providers.forEach(provider => {
-                const marker = this.createProviderMarker(provider);
-                if (provider.is_used) {
-                    this.markers.usedProviders.push(marker);
-                    this.layers.usedProviders.addLayer(marker);
-                } else {
-                    this.markers.unusedProviders.push(marker);
-                    this.layers.unusedProviders.addLayer(marker);
-                }
+        unloadTile: function(coords) {
+            const key = `${coords.z}/${coords.x}/${coords.y}`;
+            this.tileGeneration[key] = (this.tileGeneration[key] || 0) + 1;
+            (this.tileMarkers[key] || []).forEach(([layerName, marker]) => {
+                this.layers[layerName].removeLayer(marker);
             });
+            delete this.tileMarkers[key];
+        },
 
-            console.log('Map markers created:', {
-                servedMembers: this.markers.servedMembers.length,
-                unservedMembers: this.markers.unservedMembers.length,
-                usedProviders: this.markers.usedProviders.length,
-                unusedProviders: this.markers.unusedProviders.length
+        clusterIcon: function(label, color, size, radius) {
+            return L.divIcon({
+                className: 'custom-div-icon',
+                html: `<div style="
+                    background-color: ${color};
+                    width: ${size}px;
+                    height: ${size}px;
+                    line-height: ${size - 4}px;
+                    border-radius: ${radius};
+                    border: 2px solid white;
+                    box-shadow: 0 1px 3px rgba(0,0,0,0.3);
+                    color: white;
+                    font-size: 11px;
+                    font-weight: bold;
+                    text-align: center;
+                ">${label}</div>`,
+                iconSize: [size, size],
+                iconAnchor: [size / 2, size / 2]
             });
         },
 
+        clusterSize: function(count) {
+            return Math.round(Math.min(48, 18 + 6 * Math.log10(count)));
+        },
+
+        createMemberClusterMarker: function(cluster) {
+            // Hue runs from red (nobody served) to green (everybody served)
+            const color = `hsl(${Math.round(cluster.served_ratio * 120)}, 70%, 40%)`;
+            const icon = this.clusterIcon(NetworkOptApp.utils.formatNumber(cluster.count), color,
+                this.clusterSize(cluster.count), '50%');
+            const marker = L.marker([cluster.lat, cluster.lng], { icon });
+
+            marker.bindPopup(`
+                <div class="info-panel">
+                    <h6><i data-feather="users" class="me-2"></i>${NetworkOptApp.utils.formatNumber(cluster.count)} Members</h6>
+                    <p class="mb-1"><strong>Served:</strong> ${NetworkOptApp.utils.formatNumber(cluster.served)}</p>
+                    <p class="mb-1"><strong>Unserved:</strong> ${NetworkOptApp.utils.formatNumber(cluster.count - cluster.served)}</p>
+                    <p class="mb-0"><strong>Access:</strong> ${(cluster.served_ratio * 100).toFixed(1)}%</p>
+                </div>
+            `);
+            return marker;
+        },
+
+        createProviderClusterMarker: function(cluster) {
+            const color = cluster.used * 2 >= cluster.count ? '#0d6efd' : '#ffc107';
+            const icon = this.clusterIcon(NetworkOptApp.utils.formatNumber(cluster.count), color,
+                this.clusterSize(cluster.count), '4px');
+            const marker = L.marker([cluster.lat, cluster.lng], { icon });
+
+            marker.bindPopup(`
+                <div class="info-panel">
+                    <h6><i data-feather="map-pin" class="me-2"></i>${NetworkOptApp.utils.formatNumber(cluster.count)} Providers</h6>
+                    <p class="mb-1"><strong>In Use:</strong> ${NetworkOptApp.utils.formatNumber(cluster.used)}</p>
+                    <p class="mb-0"><strong>Not Used:</strong> ${NetworkOptApp.utils.formatNumber(cluster.count - cluster.used)}</p>
+                </div>
+            `);
+            return marker;
+        },
+
         createMemberMarker: function(member, isServed) {
             const color = isServed ? '#28a745' : '#dc3545';
             const icon = L.divIcon({
@@ -288,26 +367,18 @@ document.addEventListener('DOMContentLoaded', function() {
             Object.values(this.layers).forEach(layer => {
                 if (layer) layer.clearLayers();
             });
-            
-            Object.keys(this.markers).forEach(key => {
-                this.markers[key] = [];
-            });
+            this.tileMarkers = {};
         },
 
         updateStats: function() {
-            if (!this.mapData || !this.mapData.stats) return;
+            if (!this.summary || !this.summary.totals) return;
 
-            const stats = this.mapData.stats;
-            
-            document.getElementById('servedCount').textContent = NetworkOptApp.utils.formatNumber(stats.served_members);
-            document.getElementById('unservedCount').textContent = NetworkOptApp.utils.formatNumber(stats.unserved_members);
+            const totals = this.summary.totals;
             
-            document.getElementById('usedProvidersCount').textContent = NetworkOptApp.utils.formatNumber(
-                this.mapData.providers.filter(p => p.is_used).length
-            );
-            document.getElementById('unusedProvidersCount').textContent = NetworkOptApp.utils.formatNumber(
-                this.mapData.providers.filter(p => !p.is_used).length
-            );
+            document.getElementById('servedCount').textContent = NetworkOptApp.utils.formatNumber(totals.served_members);
+            document.getElementById('unservedCount').textContent = NetworkOptApp.utils.formatNumber(totals.unserved_members);
+            document.getElementById('usedProvidersCount').textContent = NetworkOptApp.utils.formatNumber(totals.used_providers);
+            document.getElementById('unusedProvidersCount').textContent = NetworkOptApp.utils.formatNumber(totals.unused_providers);
         },
 
         resetMapView: function() {
@@ -315,18 +386,9 @@ document.addEventListener('DOMContentLoaded', function() {
         },
 
         fitAllBounds: function() {
-            if (!this.mapData) return;
+            if (!this.summary || !this.summary.bounds) return;
 
-            const allPoints = [
-                ...this.mapData.served_members.map(m => [m.lat, m.lng]),
-                ...this.mapData.unserved_members.map(m => [m.lat, m.lng]),
-                ...this.mapData.providers.map(p => [p.lat, p.lng])
-            ];
-
-            if (allPoints.length > 0) {
-                const bounds = L.latLngBounds(allPoints);
-                this.map.fitBounds(bounds, { padding: [20, 20] });
-            }
+            this.map.fitBounds(L.latLngBounds(this.summary.bounds), { padding: [20, 20] });
         },
 
         // Export map as image (requires additional plugin)
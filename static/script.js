@@ -7,6 +7,11 @@ let userLon = null;
 let providerMarkers = [];
 let selectedProvider = null; // store provider info for feedback
 
+const SEARCH_PAGE_SIZE = 20;
+let searchQuery = null;   // location and type of the current search, reused for later pages
+let searchCursor = null;  // continuation token for the next page, null on the last page
+let shownProviders = 0;
+
 // Initialize the application
 document.addEventListener('DOMContentLoaded', function () {
     initializeMap();
@@ -111,23 +116,15 @@ function searchProviders() {
 
     clearProviderMarkers();
 
-    const formData = new FormData();
-    formData.append('latitude', userLat);
-    formData.append('longitude', userLon);
-    formData.append('provider_type', providerType);
-
-    fetch('/search_providers', {
-        method: 'POST',
-        body: formData
-    })
-        .then(response => response.json())
+    searchQuery = { latitude: userLat, longitude: userLon, providerType: providerType };
+    fetchProviderPage(searchQuery, null)
         .then(data => {
             loadingSpinner.style.display = 'none';
             resetSearchBtn(searchBtn);
 
             if (data.success) {
-                displaySearchResults(data.providers, data.count);
-                addProviderMarkersToMap(data.providers);
+                displaySearchResults(data.providers, data.count, data.next_cursor, false);
+                addProviderMarkersToMap(data.providers, 0);
             } else {
                 showError('Search failed: ' + (data.error || 'Unknown error'));
             }
@@ -139,19 +136,69 @@ function searchProviders() {
         });
 }
 
+function loadMoreProviders() {
+    const btn = document.getElementById('loadMoreBtn');
+    btn.disabled = true;
+    btn.innerHTML = '<i class="fas fa-spinner fa-spin me-2"></i>Loading...';
+
+    fetchProviderPage(searchQuery, searchCursor)
+        .then(data => {
+            if (data.success) {
+                const offset = shownProviders;
+                displaySearchResults(data.providers, data.count, data.next_cursor, true);
+                addProviderMarkersToMap(data.providers, offset);
+            } else {
+                btn.disabled = false;
+                btn.innerHTML = 'Show more providers';
+                showError('Search failed: ' + (data.error || 'Unknown error'));
+            }
+        })
+        .catch(error => {
+            btn.disabled = false;
+            btn.innerHTML = 'Show more providers';
+            showError('Network error: ' + error.message);
+        });
+}
+
+function fetchProviderPage(query, cursor) {
+    const formData = new FormData();
+    formData.append('latitude', query.latitude);
+    formData.append('longitude', query.longitude);
+    formData.append('provider_type', query.providerType);
+    formData.append('limit', SEARCH_PAGE_SIZE);
+    if (cursor !== null) {
+        formData.append('cursor', cursor);
+    }
+
+    return fetch('/search_providers', {
+        method: 'POST',
+        body: formData
+    }).then(response => response.json());
+}
+
 function resetSearchBtn(btn) {
     btn.disabled = false;
     btn.innerHTML = '<i class="fas fa-search me-2"></i>Search Providers';
 }
 
-function displaySearchResults(providers, count) {
+function displaySearchResults(providers, count, nextCursor, append) {
     const searchResults = document.getElementById('searchResults');
     const providersList = document.getElementById('providersList');
     const resultsCount = document.getElementById('resultsCount');
 
     resultsCount.textContent = `${count} provider${count !== 1 ? 's' : ''} found`;
 
-    if (providers.length === 0) {
+    const loadMore = document.getElementById('loadMoreContainer');
+    if (loadMore) {
+        loadMore.remove();
+    }
+    if (!append) {
+        shownProviders = 0;
+    }
+    shownProviders += providers.length;
+    searchCursor = nextCursor || null;
+
+    if (providers.length === 0 && !append) {
         providersList.innerHTML = `
             <div class="text-center py-4">
                 <i class="fas fa-exclamation-circle fa-3x text-muted mb-3"></i>
@@ -160,7 +207,7 @@ function displaySearchResults(providers, count) {
             </div>
         `;
     } else {
-        providersList.innerHTML = providers.map((provider, index) => {
+        const cards = providers.map((provider, index) => {
             const rating = provider.cms_rating || 0;
             return `
                 <div class="provider-card card mb-3 fade-in" style="animation-delay: ${index * 0.1}s;">
@@ -214,10 +261,28 @@ function displaySearchResults(providers, count) {
                 </div>
             `;
         }).join('');
+
+        if (append) {
+            providersList.insertAdjacentHTML('beforeend', cards);
+        } else {
+            providersList.innerHTML = cards;
+        }
+    }
+
+    if (searchCursor !== null) {
+        providersList.insertAdjacentHTML('beforeend', `
+            <div id="loadMoreContainer" class="d-grid">
+                <button id="loadMoreBtn" class="btn btn-outline-primary" onclick="loadMoreProviders()">
+                    Show more providers (${shownProviders} of ${count} shown)
+                </button>
+            </div>
+        `);
     }
 
     searchResults.style.display = 'block';
-    searchResults.scrollIntoView({ behavior: 'smooth' });
+    if (!append) {
+        searchResults.scrollIntoView({ behavior: 'smooth' });
+    }
 }
 
 function openFeedbackModal(providerName) {
@@ -258,8 +323,9 @@ function sendFeedback() {
         });
 }
 
-function addProviderMarkersToMap(providers) {
-    providers.forEach((provider, index) => {
+function addProviderMarkersToMap(providers, offset) {
+    providers.forEach((provider, i) => {
+        const index = offset + i;
         const marker = L.marker([provider.latitude, provider.longitude], {
             icon: L.divIcon({
                 className: 'provider-marker',
@@ -285,7 +351,7 @@ function addProviderMarkersToMap(providers) {
         providerMarkers.push(marker);
     });
 
-    if (providers.length > 0) {
+    if (providers.length > 0 && offset === 0) {
         const group = new L.featureGroup([userMarker, ...providerMarkers]);
         map.fitBounds(group.getBounds().pad(0.1));
     }
@@ -0,0 +1,84 @@
+"""Flask test client over a scratch database and upload folder.
+
+app.py sets up the database when it is imported, so DATABASE_URL points at
+a temporary file before any test module imports it.
+"""
+import os
+import sys
+import time
+import shutil
+import tempfile
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+WORKDIR = tempfile.mkdtemp(prefix='networkopt-tests-')
+os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(WORKDIR, 'test.db')
+
+SAMPLE_MEMBERS = os.path.join(ROOT, 'uploads', 'members_1756478200_21_members_750.csv')
+SAMPLE_PROVIDERS = os.path.join(ROOT, 'uploads', 'providers_1756664923_20_reduced_450.csv')
+
+@pytest.fixture(scope='session')
+def app():
+    from app import app
+    import routes
+    upload_folder = os.path.join(WORKDIR, 'uploads')
+    os.makedirs(upload_folder)
+    app.config.update(TESTING=True, UPLOAD_FOLDER=upload_folder)
+    routes.dataset_cache.upload_folder = upload_folder
+    routes.result_store.folder = upload_folder
+    yield app
+    routes.job_runner.executor.shutdown(wait=True)
+    shutil.rmtree(WORKDIR, ignore_errors=True)
+
+def admin_client(app):
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session.update(logged_in=True, username='admin', user_type='admin')
+    return client
+
+@pytest.fixture
+def client(app):
+    """Test client logged in as the admin."""
+    return admin_client(app)
+
+def upload(client, path, dataset_type, name=None):
+    with open(path, 'rb') as f:
+        response = client.post('/upload_dataset', data={
+            'dataset_type': dataset_type,
+            'file': (f, name or os.path.basename(path)),
+        })
+    assert response.status_code == 200, response.get_json()
+    return response.get_json()['dataset_id']
+
+def wait_for_job(client, job_id, timeout=120):
+    deadline = time.monotonic() + timeout
+    while True:
+        status = client.get(f'/api/jobs/{job_id}').get_json()
+        if status['status'] in ('completed', 'failed') or time.monotonic() > deadline:
+            return status
+        time.sleep(0.1)
+
+@pytest.fixture(scope='session')
+def datasets(app):
+    """(members, providers) Dataset ids of the sample files, uploaded once."""
+    client = admin_client(app)
+    return upload(client, SAMPLE_MEMBERS, 'members'), upload(client, SAMPLE_PROVIDERS, 'providers')
+
+@pytest.fixture(scope='session')
+def optimized(app, datasets):
+    """OptimizationResult id of one run over the sample datasets."""
+    client = admin_client(app)
+    status = wait_for_job(client, client.post('/optimize_network', json={}).get_json()['job_id'])
+    assert status['status'] == 'completed', status.get('error')
+    return status['optimization_id']
+
+@pytest.fixture
+def result_client(app, optimized):
+    """Admin client whose session shows the optimized result."""
+    client = admin_client(app)
+    with client.session_transaction() as session:
+        session['optimization_result_id'] = optimized
+    return client
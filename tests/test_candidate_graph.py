@@ -0,0 +1,92 @@
+"""CandidateGraph selection and filtering against plain per-member loops."""
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.candidate_graph import CandidateGraph  # noqa: E402
+
+def random_graph(seed=0, n_members=200, n_providers=40):
+    rng = np.random.default_rng(seed)
+    n_edges = 1500
+    member_idx = rng.integers(0, n_members, n_edges)
+    provider_idx = rng.integers(0, n_providers, n_edges)
+    # Coarse values so ties are common; a few NaN ratings
+    cost = rng.integers(1, 5, n_providers).astype(float)
+    rating = rng.integers(1, 4, n_providers).astype(float)
+    rating[::7] = np.nan
+    return CandidateGraph.from_edges(member_idx, provider_idx, rng.integers(0, 3, n_edges).astype(float),
+                                     n_members, cost, rating)
+
+def loop_pick(graph, values, mask, better):
+    """First edge of each member whose value beats every earlier one (NaN never wins)."""
+    result = np.full(graph.n_members, -1)
+    for member_pos in range(graph.n_members):
+        for edge in range(graph.member_slice(member_pos).start, graph.member_slice(member_pos).stop):
+            if not mask[edge]:
+                continue
+            current = result[member_pos]
+            if current < 0 or (not np.isnan(values[edge]) and
+                               (np.isnan(values[current]) or better(values[edge], values[current]))):
+                result[member_pos] = edge
+    return result
+
+def test_from_edges_groups_edges_by_member():
+    graph = CandidateGraph.from_edges([2, 0, 2, 1], [5, 6, 7, 8], [0.5, 1.0, 1.5, 2.0], 4,
+                                      np.arange(10.0), np.arange(10.0) / 2)
+    assert graph.n_members == 4 and len(graph) == 4
+    np.testing.assert_array_equal(graph.degree, [1, 1, 2, 0])
+    # Stable within a member: edges keep their input order
+    np.testing.assert_array_equal(graph.provider_idx[graph.member_slice(2)], [5, 7])
+    np.testing.assert_array_equal(graph.cost, [6.0, 8.0, 5.0, 7.0])
+    np.testing.assert_array_equal(graph.edge_member, [0, 1, 2, 2])
+
+def test_segment_argmin_and_argmax_match_loops():
+    graph = random_graph()
+    mask = np.random.default_rng(1).random(graph.n_edges) < 0.7
+    for values in (graph.cost, graph.rating):
+        np.testing.assert_array_equal(graph.segment_argmin(values, mask=mask),
+                                      loop_pick(graph, values, mask, lambda a, b: a < b))
+        np.testing.assert_array_equal(graph.segment_argmax(values, mask=mask),
+                                      loop_pick(graph, values, mask, lambda a, b: a > b))
+    everything = np.ones(graph.n_edges, dtype=bool)
+    np.testing.assert_array_equal(graph.segment_argmin(graph.cost),
+                                  loop_pick(graph, graph.cost, everything, lambda a, b: a < b))
+
+def test_segment_lexmin_breaks_ties_with_later_keys():
+    graph = random_graph(seed=2)
+    expected = np.full(graph.n_members, -1)
+    for member_pos in range(graph.n_members):
+        edges = range(graph.member_slice(member_pos).start, graph.member_slice(member_pos).stop)
+        if len(edges):
+            expected[member_pos] = min(edges, key=lambda e: (graph.cost[e], -graph.distance[e], e))
+    np.testing.assert_array_equal(graph.segment_lexmin((graph.cost, -graph.distance)), expected)
+
+def test_filter_keeps_masked_edges_per_member():
+    graph = random_graph(seed=3)
+    mask = graph.cost <= 2
+    filtered = graph.filter(mask)
+    assert filtered.n_members == graph.n_members
+    assert filtered.n_edges == int(mask.sum())
+    for member_pos in range(graph.n_members):
+        kept = np.flatnonzero(mask[graph.member_slice(member_pos)]) + graph.member_slice(member_pos).start
+        edges = filtered.member_slice(member_pos)
+        np.testing.assert_array_equal(filtered.provider_idx[edges], graph.provider_idx[kept])
+        np.testing.assert_array_equal(filtered.distance[edges], graph.distance[kept])
+        np.testing.assert_array_equal(filtered.rating[edges], graph.rating[kept])
+
+def test_from_connections_drops_unknown_ids():
+    members = pd.DataFrame({'MemberID': [10, 11, 12]})
+    providers = pd.DataFrame({'ProviderID': ['a', 'b']})
+    connections = [
+        {'member_id': 12, 'provider_id': 'b', 'distance': 1.0, 'cost': 3.0, 'rating': 4.0},
+        {'member_id': 10, 'provider_id': 'a', 'distance': 2.0, 'cost': 5.0, 'rating': 2.0},
+        {'member_id': 99, 'provider_id': 'a', 'distance': 3.0, 'cost': 1.0, 'rating': 1.0},
+    ]
+    graph = CandidateGraph.from_connections(connections, members, providers)
+    np.testing.assert_array_equal(graph.degree, [1, 0, 1])
+    np.testing.assert_array_equal(graph.provider_idx, [0, 1])
+    np.testing.assert_array_equal(graph.cost, [5.0, 3.0])
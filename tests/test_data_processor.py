@@ -0,0 +1,71 @@
+"""Chunked members ingest against a single whole-file read."""
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from utils.data_processor import DataProcessor  # noqa: E402
+
+UPLOADS = os.path.join(ROOT, 'uploads')
+
+def members_csv(tmp_path, member_ids, **extra):
+    n = len(member_ids)
+    df = pd.DataFrame({
+        'MemberID': member_ids,
+        'SourceType': ['Hospital', 'Nursing Home', 'Scan Center', 'Supply Directory'] * (n // 4) +
+                      ['Hospital'] * (n % 4),
+        'Latitude': [40.0 + i / 100 for i in range(n)],
+        'Longitude': [-75.0 - i / 100 for i in range(n)],
+        'Age': [30 + i for i in range(n)],
+        'cost': [f'${100 + i}' for i in range(n)],
+        **extra,
+    })
+    path = tmp_path / 'members.csv'
+    df.to_csv(path, index=False)
+    return str(path)
+
+def processor(chunk_rows):
+    processor = DataProcessor()
+    processor.MEMBER_CHUNK_ROWS = chunk_rows
+    return processor
+
+@pytest.mark.parametrize('filename', ['members_1756478200_21_members_750.csv', 'members_1756665121_Member.csv'])
+def test_chunked_ingest_matches_one_chunk(filename):
+    path = os.path.join(UPLOADS, filename)
+    whole, whole_errors = processor(10 ** 9).process_members_data(path)
+    chunked, chunked_errors = processor(1000).process_members_data(path)
+    assert chunked_errors == whole_errors
+    pd.testing.assert_frame_equal(chunked, whole)
+    # Columns the optimizer does not use are kept too
+    assert list(chunked.columns) == list(pd.read_csv(path, nrows=0).columns)
+
+def test_duplicate_across_chunk_boundary(tmp_path):
+    path = members_csv(tmp_path, [1, 2, 3, 4, 5, 6, 7, 8, 2, 10])
+    df, errors = processor(4).process_members_data(path)
+    assert errors == ['Rows 10-11: 1 duplicate Member IDs found (row 10)']
+    assert df['MemberID'].tolist() == [1, 2, 3, 4, 5, 6, 7, 8, 10]
+
+def test_member_id_type_is_decided_over_the_whole_file(tmp_path):
+    # Only the last chunk has a non-numeric ID: every chunk still reads the IDs as strings,
+    # like a single read_csv, so the repeated '3' is caught
+    path = members_csv(tmp_path, ['1', '2', '3', '4', '5', '6', '7', '8', '3', 'A10'],
+                       Contact_Number=['555-0100'] * 9 + [None])
+    df, errors = processor(4).process_members_data(path)
+    assert errors == ['Rows 10-11: 1 duplicate Member IDs found (row 10)']
+    assert df['MemberID'].tolist() == ['1', '2', '3', '4', '5', '6', '7', '8', 'A10']
+    whole = pd.read_csv(path)
+    assert df['Age'].dtype == whole['Age'].dtype
+    assert df['Contact_Number'].tolist()[:8] == whole['Contact_Number'].tolist()[:8]
+
+def test_errors_name_csv_rows(tmp_path):
+    path = members_csv(tmp_path, list(range(1, 11)))
+    df = pd.read_csv(path, dtype={'Latitude': str})
+    df.loc[5, 'Latitude'] = 'north'
+    df.to_csv(path, index=False)
+    cleaned, errors = processor(4).process_members_data(path)
+    assert errors == ['Rows 6-9: 1 invalid latitude values found (row 7)']
+    assert len(cleaned) == 9 and 6 not in cleaned['MemberID'].tolist()
@@ -0,0 +1,78 @@
+"""DatasetCache tiers (memory, .npz artifact, spatial index) and their invalidation when the CSV changes."""
+import os
+import shutil
+import sys
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from utils.data_processor import DataProcessor  # noqa: E402
+from utils.dataset_cache import DatasetCache  # noqa: E402
+
+SAMPLE_PROVIDERS = os.path.join(ROOT, 'uploads', 'providers_1756664923_20_reduced_450.csv')
+
+class NoParsing(DataProcessor):
+    """Processor for caches that must be served from the artifact."""
+
+    def process_providers_data(self, filepath):
+        raise AssertionError(f'{filepath} was parsed again')
+
+@pytest.fixture
+def dataset(tmp_path):
+    shutil.copy(SAMPLE_PROVIDERS, tmp_path / 'providers.csv')
+    return SimpleNamespace(id=1, filename='providers.csv', file_type='providers')
+
+def rewrite(path, df):
+    """Write df over path with a clearly later mtime."""
+    mtime = os.path.getmtime(path)
+    df.to_csv(path, index=False)
+    os.utime(path, (mtime + 10, mtime + 10))
+
+def test_frame_comes_from_memory_then_from_the_artifact(tmp_path, dataset):
+    cache = DatasetCache(str(tmp_path))
+    df = cache.get(dataset)
+    assert cache.get(dataset) is df
+    assert os.path.exists(cache.artifact_path(dataset))
+
+    reloaded = DatasetCache(str(tmp_path), processor=NoParsing()).get(dataset)
+    pd.testing.assert_frame_equal(reloaded, df)
+
+def test_changed_csv_invalidates_memory_and_artifact(tmp_path, dataset):
+    cache = DatasetCache(str(tmp_path))
+    df = cache.get(dataset)
+    csv_path = cache.csv_path(dataset)
+    rewrite(csv_path, pd.read_csv(csv_path).iloc[:100])
+
+    changed = cache.get(dataset)
+    assert changed is not df
+    assert len(changed) == 100
+    # A cold cache sees the artifact is stale and parses the new CSV too
+    assert len(DatasetCache(str(tmp_path)).get(dataset)) == 100
+    # ... after which the rewritten artifact is current again
+    assert len(DatasetCache(str(tmp_path), processor=NoParsing()).get(dataset)) == 100
+
+def test_spatial_index_is_persisted_and_rebuilt_for_a_changed_csv(tmp_path, dataset):
+    cache = DatasetCache(str(tmp_path))
+    index = cache.get_index(dataset)
+    assert cache.get_index(dataset) is index
+    reloaded = DatasetCache(str(tmp_path), processor=NoParsing()).get_index(dataset)
+    assert reloaded is not index and reloaded.matches(cache.get(dataset))
+
+    csv_path = cache.csv_path(dataset)
+    df = pd.read_csv(csv_path)
+    df['Latitude'] += 1.0
+    rewrite(csv_path, df)
+
+    for rebuilt in (cache.get_index(dataset), DatasetCache(str(tmp_path)).get_index(dataset)):
+        assert rebuilt.matches(cache.get(dataset))
+        # The query point is next to the moved first provider, not its old place
+        row = rebuilt.provider_pos[0]
+        near = rebuilt.query_radius(df['Latitude'].iloc[row], df['Longitude'].iloc[row], 0.1)[0]
+        assert row in near.tolist()
+        np.testing.assert_allclose(np.degrees(np.asarray(rebuilt.tree.data)[:, 0]),
+                                   df['Latitude'].to_numpy()[rebuilt.provider_pos], rtol=1e-6)
@@ -0,0 +1,139 @@
+"""Incremental re-optimization against a full run on the changed rosters."""
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.optimizer import NetworkOptimizer  # noqa: E402
+
+@pytest.fixture(scope='module')
+def network():
+    rng = np.random.default_rng(17)
+    n_members, n_providers = 1500, 200
+    members = pd.DataFrame({
+        'MemberID': [f'M{i}' for i in range(n_members)],
+        'Latitude': rng.uniform(41.0, 42.5, n_members),
+        'Longitude': rng.uniform(-88.5, -87.0, n_members),
+        'SourceType': rng.choice(['Hospital', 'Nursing Home'], n_members),
+        'cost': rng.uniform(100, 900, n_members),
+    })
+    providers = pd.DataFrame({
+        'ProviderID': [f'P{i}' for i in range(n_providers)],
+        'Latitude': rng.uniform(41.0, 42.5, n_providers),
+        'Longitude': rng.uniform(-88.5, -87.0, n_providers),
+        'Source': 'Hospital',
+        'Type': 'Clinic',
+        'Cost': rng.uniform(100, 900, n_providers).round(),
+        'CMS Rating': rng.integers(1, 6, n_providers).astype(float),
+    })
+    return members, providers
+
+def changed_providers(providers):
+    """Some providers dropped, repriced, re-rated, moved and added."""
+    rng = np.random.default_rng(3)
+    changed = providers.copy()
+    changed.loc[rng.choice(len(changed), 10, replace=False), 'Cost'] *= 0.5
+    changed.loc[rng.choice(len(changed), 10, replace=False), 'CMS Rating'] = 5.0
+    changed.loc[rng.choice(len(changed), 5, replace=False), 'Latitude'] += 0.05
+    changed = changed.drop(rng.choice(len(changed), 10, replace=False))
+    added = providers.sample(10, random_state=3).assign(ProviderID=[f'N{i}' for i in range(10)])
+    added['Longitude'] += 0.03
+    return pd.concat([changed, added], ignore_index=True)
+
+def optimizer():
+    optimizer = NetworkOptimizer()
+    # No cost-band moves: every member keeps its own best pick, which a full run recomputes too
+    optimizer.cost_reduction_bounds = (-1e9, 1e9)
+    return optimizer
+
+def full_run(members, providers):
+    full = optimizer()
+    return full.optimize_assignments(full.build_candidate_graph(members, providers), members, providers)
+
+def test_provider_change_matches_full_run(network):
+    members, providers = network
+    new_providers = changed_providers(providers)
+    previous = full_run(members, providers)
+
+    incremental = optimizer()
+    graph, affected = incremental.build_incremental_graph(previous, members, providers, new_providers)
+    assignments = incremental.optimize_incremental(graph, affected, members, new_providers)
+
+    assert 0 < len(affected) < len(members)
+    assert incremental.last_incremental['providers_added'] == 10
+    assert incremental.last_incremental['providers_removed'] == 10
+    assert assignments == full_run(members, new_providers)
+
+def changed_members(members):
+    """Some members removed, moved, re-typed and added, as a member delta upload would leave them."""
+    rng = np.random.default_rng(18)
+    changed = members.copy()
+    changed.loc[rng.choice(len(changed), 20, replace=False), 'Latitude'] += 0.05
+    changed.loc[rng.choice(len(changed), 20, replace=False), 'SourceType'] = 'Hospital'
+    changed = changed.drop(rng.choice(len(changed), 30, replace=False))
+    added = members.sample(30, random_state=18).assign(MemberID=[f'N{i}' for i in range(30)])
+    added['Longitude'] += 0.02
+    return pd.concat([changed, added], ignore_index=True)
+
+@pytest.mark.parametrize('providers_changed', [False, True], ids=['members only', 'members and providers'])
+def test_member_change_matches_full_run(network, providers_changed):
+    members, providers = network
+    new_members = changed_members(members)
+    new_providers = changed_providers(providers) if providers_changed else providers
+    previous = full_run(members, providers)
+
+    incremental = optimizer()
+    graph, affected = incremental.build_incremental_graph(previous, new_members, providers, new_providers,
+                                                          previous_members=members)
+    assignments = incremental.optimize_incremental(graph, affected, new_members, new_providers)
+
+    assert incremental.last_incremental['members_removed'] == 30
+    assert incremental.last_incremental['members_changed'] >= 30
+    assert assignments == full_run(new_members, new_providers)
+
+def test_no_change_keeps_every_assignment(network):
+    members, providers = network
+    previous = NetworkOptimizer()
+    assignments = previous.optimize_assignments(previous.build_candidate_graph(members, providers),
+                                                members, providers)
+
+    incremental = NetworkOptimizer()
+    graph, affected = incremental.build_incremental_graph(assignments, members, providers, providers)
+    assert len(affected) == 0
+    assert incremental.optimize_incremental(graph, affected, members, providers) == assignments
+
+def wrap_longitude(lon):
+    return (lon + 180.0) % 360.0 - 180.0
+
+def test_affected_members_across_antimeridian():
+    """Providers just west of 180 degrees affect members just east of it."""
+    rng = np.random.default_rng(0)
+    members = pd.DataFrame({
+        'MemberID': [f'M{i}' for i in range(300)],
+        'Latitude': rng.uniform(-17.3, -16.7, 300),
+        'Longitude': wrap_longitude(rng.uniform(179.6, 180.2, 300)),
+        'SourceType': 'Hospital',
+        'cost': rng.uniform(100, 900, 300),
+    })
+    providers = pd.DataFrame({
+        'ProviderID': [f'P{i}' for i in range(120)],
+        'Latitude': rng.uniform(-17.3, -16.7, 120),
+        'Longitude': wrap_longitude(rng.uniform(179.6, 180.2, 120)),
+        'Source': 'Hospital',
+        'Type': 'Clinic',
+        'Cost': rng.uniform(100, 900, 120).round(),
+        'CMS Rating': rng.integers(1, 6, 120).astype(float),
+    })
+    optimizer = NetworkOptimizer()
+    changed = providers['Longitude'].to_numpy() > 179.8
+    affected = optimizer.affected_members(members, providers['Latitude'].to_numpy()[changed],
+                                          providers['Longitude'].to_numpy()[changed])
+
+    graph = optimizer.build_candidate_graph(members, providers)
+    expected = np.unique(graph.edge_member[changed[graph.provider_idx]])
+    np.testing.assert_array_equal(affected, expected)
+    assert (members['Longitude'].to_numpy()[affected] < 0).any()
@@ -0,0 +1,80 @@
+"""Background optimization jobs: status lifecycle and jobs orphaned by a restart."""
+import socket
+import subprocess
+import sys
+from datetime import datetime
+
+from conftest import wait_for_job
+
+def test_job_reports_every_stage_until_completed(client, datasets):
+    response = client.post('/optimize_network', json={})
+    assert response.status_code == 202
+    queued = response.get_json()
+    assert queued['status'] == 'queued'
+    assert queued['status_url'] == f"/api/jobs/{queued['job_id']}"
+
+    status = wait_for_job(client, queued['job_id'])
+    assert status['status'] == 'completed', status.get('error')
+    assert [stage['name'] for stage in status['stages']] == ['parsing', 'indexing', 'candidates',
+                                                             'assignment', 'persisting']
+    assert all(stage['done'] and stage['seconds'] is not None for stage in status['stages'])
+    assert status['progress'] == 100
+    assert status['created_date'] <= status['started_date'] <= status['finished_date']
+    assert status['redirect'] == '/dashboard'
+    with client.session_transaction() as session:
+        assert session['optimization_result_id'] == status['optimization_id']
+
+def test_failed_job_reports_its_error(app, client, datasets):
+    import routes
+    from app import db
+    from models import Dataset, OptimizationJob
+
+    with app.app_context():
+        # Never the latest upload, so other tests still optimize the sample datasets
+        missing = Dataset(name='gone.csv', file_type='members', filename='members_gone.csv',
+                          upload_date=datetime(2000, 1, 1), is_processed=True)
+        db.session.add(missing)
+        db.session.flush()
+        job = OptimizationJob(dataset_members_id=missing.id, dataset_providers_id=datasets[1],
+                              runner_id=routes.job_runner.runner_id)
+        db.session.add(job)
+        db.session.commit()
+        job_id = job.id
+        routes.run_optimization_job(job_id)
+
+    status = client.get(f'/api/jobs/{job_id}').get_json()
+    assert status['status'] == 'failed'
+    assert status['error'].startswith('Optimization failed: ')
+    assert status['finished_date'] is not None
+    assert 'optimization_id' not in status
+
+def test_orphaned_jobs_are_failed(app, datasets):
+    import routes
+    from app import db
+    from models import OptimizationJob
+
+    exited = subprocess.Popen([sys.executable, '-c', 'pass'])
+    exited.wait()
+    host = socket.gethostname()
+    runner_ids = {
+        'exited process': f'{host}:{exited.pid}:0123abcd',
+        'no runner recorded': None,
+        'this process': routes.job_runner.runner_id,
+        'other host': f'{host}-elsewhere:{exited.pid}:0123abcd',
+    }
+    with app.app_context():
+        jobs = {}
+        for status, (name, runner_id) in zip(['queued', 'running', 'running', 'queued'], runner_ids.items()):
+            jobs[name] = OptimizationJob(dataset_members_id=datasets[0], dataset_providers_id=datasets[1],
+                                         status=status, runner_id=runner_id)
+            db.session.add(jobs[name])
+        db.session.commit()
+
+        routes.fail_orphaned_jobs()
+
+        for name in ('exited process', 'no runner recorded'):
+            assert jobs[name].status == 'failed'
+            assert jobs[name].error == 'Interrupted: the server restarted before the job finished'
+            assert jobs[name].finished_date is not None
+        assert jobs['this process'].status == 'running'
+        assert jobs['other host'].status == 'queued'
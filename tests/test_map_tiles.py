@@ -0,0 +1,96 @@
+"""MapTileEngine tile aggregation against per-point tile arithmetic."""
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.map_tiles import MapTileEngine, mercator  # noqa: E402
+
+@pytest.fixture(scope='module')
+def engine():
+    """2000 members (a few without coordinates), 150 providers, two thirds of the members served."""
+    rng = np.random.default_rng(21)
+    members = pd.DataFrame({
+        'MemberID': [f'M{i}' for i in range(2000)],
+        'Latitude': rng.uniform(41.0, 43.0, 2000),
+        'Longitude': rng.uniform(-89.0, -86.5, 2000),
+        'SourceType': 'Hospital',
+        'cost': rng.uniform(100, 900, 2000),
+    })
+    members.loc[:9, 'Latitude'] = np.nan
+    providers = pd.DataFrame({
+        'ProviderID': [f'P{i}' for i in range(150)],
+        'Location': [f'Provider {i}, Chicago, IL' for i in range(150)],
+        'Type': 'Clinic',
+        'Latitude': rng.uniform(41.0, 43.0, 150),
+        'Longitude': rng.uniform(-89.0, -86.5, 150),
+        'CMS Rating': rng.integers(1, 6, 150).astype(float),
+        'Cost': rng.uniform(100, 900, 150).round(),
+    })
+    served = rng.random(2000) < 2 / 3
+    provider_ids = rng.choice(providers['ProviderID'].to_numpy()[:100], 2000)
+    columns = {
+        'member_id': members['MemberID'].tolist(),
+        'provider_id': [provider if is_served else None for provider, is_served in zip(provider_ids, served)],
+        'distance': np.where(served, rng.uniform(0, 15, 2000), np.nan).tolist(),
+        'rating': np.where(served, 3.0, np.nan).tolist(),
+    }
+    return MapTileEngine(members, providers, columns)
+
+def tile_of(df, z):
+    """(x, y) tile of every row at zoom z (NaN coordinates give NaN)."""
+    x, y = mercator(df['Latitude'].to_numpy(dtype=np.float64), df['Longitude'].to_numpy(dtype=np.float64))
+    return np.floor(x * (1 << z)), np.floor(y * (1 << z))
+
+def expected_totals(engine, z, x, y):
+    member_x, member_y = tile_of(engine.members_df, z)
+    provider_x, provider_y = tile_of(engine.providers_df, z)
+    in_members = (member_x == x) & (member_y == y)
+    in_providers = (provider_x == x) & (provider_y == y)
+    return {
+        'served_members': int((in_members & engine.member_served).sum()),
+        'unserved_members': int((in_members & ~engine.member_served).sum()),
+        'used_providers': int((in_providers & engine.provider_used).sum()),
+        'unused_providers': int((in_providers & ~engine.provider_used).sum()),
+    }
+
+def test_world_tile_counts_every_located_point(engine):
+    tile = engine.tile(0, 0, 0)
+    assert sum(cluster['count'] for cluster in tile['members']) == 1990
+    assert sum(cluster['served'] for cluster in tile['members']) == int(engine.member_served[10:].sum())
+    assert sum(cluster['count'] for cluster in tile['providers']) == 150
+    assert sum(cluster['used'] for cluster in tile['providers']) == 100
+    assert tile['totals'] == expected_totals(engine, 0, 0, 0)
+
+@pytest.mark.parametrize('z', [6, 9, 11])
+def test_tile_totals_and_clusters_match_point_tiles(engine, z):
+    member_x, member_y = tile_of(engine.members_df, z)
+    tiles = {(int(x), int(y)) for x, y in zip(member_x, member_y) if not np.isnan(x + y)}
+    for x, y in tiles:
+        tile = engine.tile(z, x, y)
+        totals = expected_totals(engine, z, x, y)
+        assert tile['totals'] == totals
+        assert sum(cluster['count'] for cluster in tile['members']) == totals['served_members'] + totals['unserved_members']
+        assert sum(cluster['served'] for cluster in tile['members']) == totals['served_members']
+        assert sum(cluster['used'] for cluster in tile['providers']) == totals['used_providers']
+
+        # One cluster per occupied 8 x 8 cell of the tile
+        in_tile = (member_x == x) & (member_y == y)
+        cell_x, cell_y = tile_of(engine.members_df.loc[in_tile], z + MapTileEngine.CELL_BITS)
+        assert len(tile['members']) == len(set(zip(cell_x.tolist(), cell_y.tolist())))
+
+def test_children_add_up_to_their_parent(engine):
+    parent = engine.tile(7, 32, 47)
+    children = [engine.tile(8, 64 + dx, 94 + dy)['totals'] for dx in (0, 1) for dy in (0, 1)]
+    assert sum(parent['totals'].values()) > 0
+    for key, value in parent['totals'].items():
+        assert sum(child[key] for child in children) == value
+
+def test_invalid_tiles_are_rejected(engine):
+    for z, x, y in [(-1, 0, 0), (3, 8, 0), (3, 0, -1), (MapTileEngine.MAX_ZOOM + 1, 0, 0)]:
+        with pytest.raises(ValueError):
+            engine.tile(z, x, y)
@@ -0,0 +1,90 @@
+"""Capacity-aware assignment: flow LP feasibility and Availability caps."""
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import maximum_flow
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.optimizer import NetworkOptimizer  # noqa: E402
+
+@pytest.fixture(scope='module')
+def network():
+    """Members crowded around a few providers with small, uneven Availability."""
+    rng = np.random.default_rng(5)
+    n_members, n_providers = 400, 30
+    members = pd.DataFrame({
+        'MemberID': [f'M{i}' for i in range(n_members)],
+        'Latitude': rng.uniform(41.7, 42.1, n_members),
+        'Longitude': rng.uniform(-87.9, -87.5, n_members),
+        'SourceType': 'Hospital',
+        'cost': rng.uniform(100, 900, n_members),
+    })
+    availability = rng.integers(0, 12, n_providers).astype(float)
+    availability[:3] = np.nan  # unlimited
+    providers = pd.DataFrame({
+        'ProviderID': [f'P{i}' for i in range(n_providers)],
+        'Latitude': rng.uniform(41.7, 42.1, n_providers),
+        'Longitude': rng.uniform(-87.9, -87.5, n_providers),
+        'Source': 'Hospital',
+        'Type': 'Clinic',
+        'Cost': rng.uniform(100, 900, n_providers).round(),
+        'CMS Rating': rng.integers(1, 6, n_providers).astype(float),
+        'Availability': availability,
+    })
+    return members, providers
+
+def loads(graph, choice, n_providers):
+    return np.bincount(graph.provider_idx[choice[choice >= 0]], minlength=n_providers)
+
+def max_served(graph, capacity):
+    """Most members any assignment within capacity can serve: a source -> member -> provider -> sink max flow."""
+    n_members, n_providers = graph.n_members, len(capacity)
+    source, sink = n_members + n_providers, n_members + n_providers + 1
+    rows = np.concatenate([np.full(n_members, source), graph.edge_member, n_members + np.arange(n_providers)])
+    cols = np.concatenate([np.arange(n_members), n_members + graph.provider_idx, np.full(n_providers, sink)])
+    caps = np.concatenate([np.ones(n_members), np.ones(graph.n_edges), capacity]).astype(np.int32)
+    network = csr_matrix((caps, (rows, cols)), shape=(sink + 1, sink + 1))
+    network.sum_duplicates()
+    return maximum_flow(network, source, sink).flow_value
+
+def test_solve_capacitated_is_feasible_and_serves_the_max_flow(network):
+    members, providers = network
+    optimizer = NetworkOptimizer()
+    graph = optimizer.build_candidate_graph(members, providers)
+    assert graph.degree.max() <= optimizer.capacity_candidates_per_member
+    capacity = optimizer.provider_capacities(providers, graph.n_members)
+    choice = optimizer.solve_capacitated(graph, capacity)
+
+    served = choice >= 0
+    np.testing.assert_array_equal(graph.edge_member[choice[served]], np.flatnonzero(served))
+    assert (loads(graph, choice, len(providers)) <= capacity).all()
+    # Serving a member outweighs any score, so the LP serves as many members as the caps allow
+    assert served.sum() == max_served(graph, capacity)
+    assert served.sum() < (graph.degree > 0).sum()  # the caps do bind
+
+def test_capacity_aware_assignments_respect_availability(network):
+    members, providers = network
+    optimizer = NetworkOptimizer()
+    optimizer.capacity_aware = True
+    graph = optimizer.build_candidate_graph(members, providers)
+    assignments = optimizer.optimize_assignments(graph, members, providers)
+
+    load = pd.Series([a['provider_id'] for a in assignments if a['provider_id'] is not None]).value_counts()
+    availability = providers.set_index('ProviderID')['Availability']
+    capped = availability.reindex(load.index).notna()
+    assert (load[capped] <= availability.reindex(load.index)[capped]).all()
+    assert availability[availability == 0].index.isin(load.index).sum() == 0
+    assert load[~capped].max() > availability.max()  # unlimited providers take more than any cap
+
+def test_without_capacity_availability_is_ignored(network):
+    members, providers = network
+    optimizer = NetworkOptimizer()
+    graph = optimizer.build_candidate_graph(members, providers)
+    capacity = optimizer.provider_capacities(providers, graph.n_members)
+    choice = optimizer.select_best_providers(graph)
+    assert (loads(graph, choice, len(providers)) > capacity).any()
@@ -0,0 +1,170 @@
+"""Vectorized optimizer paths against the original per-member implementations,
+on the datasets under uploads/."""
+import os
+import sys
+import json
+
+import numpy as np
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from utils.data_processor import DataProcessor  # noqa: E402
+from utils.optimizer import NetworkOptimizer  # noqa: E402
+
+UPLOADS = os.path.join(ROOT, 'uploads')
+# Output of the original NetworkOptimizer (find_candidate_connections with the per-member
+# GeospatialAnalyzer scan, then optimize_assignments and its metrics) on one upload pair
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'baseline_optimization_15k.json')
+# (members, providers, shuffle provider costs); in these files cost rises with rating, so
+# shuffling decouples the two and makes the tie-break and ordering choices matter
+DATASETS = [
+    ('members_1756478200_21_members_750.csv', 'providers_1756664923_20_reduced_450.csv', False),
+    ('members_1756665121_Member.csv', 'providers_1756665127_Provider.csv', False),
+    ('members_1756665121_Member.csv', 'providers_1756665127_Provider.csv', True),
+]
+
+@pytest.fixture(scope='module', params=DATASETS,
+                ids=lambda params: params[0] + ('-shuffled-costs' if params[2] else ''))
+def network(request):
+    members_file, providers_file, shuffle_costs = request.param
+    processor = DataProcessor()
+    members_df, _ = processor.process_members_data(os.path.join(UPLOADS, members_file))
+    providers_df, _ = processor.process_providers_data(os.path.join(UPLOADS, providers_file))
+    if shuffle_costs:
+        providers_df['Cost'] = np.random.default_rng(0).permutation(providers_df['Cost'].to_numpy())
+    optimizer = NetworkOptimizer()
+    graph = optimizer.build_candidate_graph(members_df, providers_df)
+    assert graph.n_edges > 0
+    return optimizer, graph, members_df, providers_df
+
+def member_candidates(graph, providers_df):
+    """Per member, its candidate connections as the legacy list of dicts (in edge order)."""
+    provider_ids = providers_df['ProviderID'].to_numpy()
+    candidates = []
+    for member_pos in range(graph.n_members):
+        edges = graph.member_slice(member_pos)
+        candidates.append([{
+            'edge': edge,
+            'provider_id': provider_ids[graph.provider_idx[edge]],
+            'distance': float(graph.distance[edge]),
+            'cost': float(graph.cost[edge]),
+            'rating': float(graph.rating[edge]),
+        } for edge in range(edges.start, edges.stop)])
+    return candidates
+
+def legacy_adjust(optimizer, candidates, chosen, original_cost):
+    """The original 50-pass cost-band loop over assignment dicts; returns the chosen edge per
+    member and the number of swaps."""
+    assignments = [dict(c[edge_pos]) if edge_pos is not None else {'edge': -1, 'cost': None, 'rating': None}
+                   for c, edge_pos in zip(candidates, chosen)]
+    min_bound, max_bound = optimizer.cost_reduction_bounds
+
+    def current_percentage():
+        optimized_cost = sum(a['cost'] for a in assignments if a['cost'] is not None)
+        return ((original_cost - optimized_cost) / original_cost) * 100 if original_cost > 0 else 0
+
+    profit_loss_percentage = current_percentage()
+    iteration = 0
+    swaps = 0
+    while (profit_loss_percentage < min_bound or profit_loss_percentage > max_bound) and iteration < 50:
+        iteration += 1
+        for a, options in zip(assignments, candidates):
+            if not options:
+                continue
+            if profit_loss_percentage < min_bound:
+                cheaper = [c for c in options if c['cost'] < (a['cost'] or float('inf'))]
+                if cheaper:
+                    best_cheaper = min(cheaper, key=lambda c: c['cost'])
+                    swaps += best_cheaper['edge'] != a['edge']
+                    a.update(best_cheaper)
+            else:
+                higher_quality = [c for c in options
+                                  if c['cost'] > (a['cost'] or 0) and c['rating'] > (a['rating'] or 0)]
+                if higher_quality:
+                    best_quality = max(higher_quality, key=lambda c: (c['rating'], -c['cost']))
+                    swaps += best_quality['edge'] != a['edge']
+                    a.update(best_quality)
+        profit_loss_percentage = current_percentage()
+    return np.array([a['edge'] for a in assignments]), swaps
+
+def test_select_best_providers_matches_find_best_provider(network):
+    optimizer, graph, _, providers_df = network
+    choice = optimizer.select_best_providers(graph)
+    candidates = member_candidates(graph, providers_df)
+
+    served = 0
+    for member_pos, options in enumerate(candidates):
+        best = optimizer.find_best_provider(options)
+        if best is None:
+            assert choice[member_pos] == -1
+            continue
+        served += 1
+        assert choice[member_pos] == int(best['edge']), f"member {member_pos}"
+    assert served > 0
+
+# Savings too high: member costs scaled up, starting from the cheapest candidates so there are
+# better-rated ones to move to. Savings too low: scaled down, starting from the best-rated ones.
+@pytest.mark.parametrize('cost_scale,start', [(20.0, 'cheapest'), (0.05, 'best')],
+                         ids=['savings-too-high', 'savings-too-low'])
+def test_adjust_legacy_matches_original_loop(network, cost_scale, start):
+    optimizer, graph, members_df, providers_df = network
+    original_cost = members_df['cost'].sum() * cost_scale
+    if start == 'cheapest':
+        choice = graph.segment_argmin(graph.cost)
+    else:
+        choice = optimizer.select_best_providers(graph)
+    candidates = member_candidates(graph, providers_df)
+    chosen = [int(edge) - graph.member_slice(m).start if edge >= 0 else None for m, edge in enumerate(choice)]
+
+    expected, expected_swaps = legacy_adjust(optimizer, candidates, chosen, original_cost)
+    adjusted, stats = optimizer._adjust_legacy(choice.copy(), graph, original_cost)
+
+    assert stats['swaps'] > 0
+    assert stats['swaps'] == expected_swaps
+    np.testing.assert_array_equal(adjusted, expected)
+
+def test_adjust_greedy_only_pays_more_for_better_ratings(network):
+    optimizer, graph, members_df, _ = network
+    # Savings too high: every move spends more, and must buy a strictly better rating
+    original_cost = members_df['cost'].sum() * 20.0
+    start = graph.segment_argmin(graph.cost)
+    adjusted, stats = optimizer._adjust_greedy(start.copy(), graph, original_cost)
+
+    moved = np.flatnonzero(adjusted != start)
+    assert stats['swaps'] > 0 and len(moved) == stats['members_swapped']
+    assert (graph.cost[adjusted[moved]] > graph.cost[start[moved]]).all()
+    assert (graph.rating[adjusted[moved]] > graph.rating[start[moved]]).all()
+
+def as_json(data):
+    """data as it comes back from JSON, numpy scalars included."""
+    return json.loads(json.dumps(data, default=lambda value: value.item()))
+
+def assert_close(actual, expected, path='result'):
+    """Nested dicts equal, floats within 1e-3 (coordinates are float32 since the dtype schema)."""
+    if isinstance(expected, dict):
+        assert set(actual) == set(expected), path
+        for key in expected:
+            assert_close(actual[key], expected[key], f"{path}.{key}")
+    elif isinstance(expected, float):
+        assert actual == pytest.approx(expected, abs=1e-3), path
+    else:
+        assert actual == expected, path
+
+def test_optimize_assignments_matches_baseline():
+    with open(BASELINE) as f:
+        baseline = json.load(f)
+    processor = DataProcessor()
+    members_df, _ = processor.process_members_data(os.path.join(UPLOADS, baseline['members']))
+    providers_df, _ = processor.process_providers_data(os.path.join(UPLOADS, baseline['providers']))
+    optimizer = NetworkOptimizer()
+    graph = optimizer.build_candidate_graph(members_df, providers_df)
+    assignments = optimizer.optimize_assignments(graph, members_df, providers_df)
+
+    assert graph.n_edges == pytest.approx(baseline['candidate_connections'], abs=5)
+    assert [[a['member_id'], a['provider_id']] for a in assignments] == baseline['assignments']
+    assert_close(as_json(optimizer.calculate_optimization_metrics(assignments, members_df, providers_df)),
+                 baseline['metrics'])
+    assert_close(as_json(optimizer.analyze_by_source_type(assignments, members_df)),
+                 baseline['source_type_analysis'])
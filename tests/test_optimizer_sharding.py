@@ -0,0 +1,89 @@
+"""Sharded candidate search against the unsharded BallTree path."""
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.optimizer import NetworkOptimizer  # noqa: E402
+
+def points(rng, n, lat, lon, spread):
+    return rng.uniform(lat - spread, lat + spread, n), rng.uniform(lon - spread, lon + spread, n)
+
+@pytest.fixture(scope='module')
+def network():
+    """Members and providers around Fiji (both sides of the antimeridian) and around Chicago."""
+    rng = np.random.default_rng(0)
+    member_coords = [points(rng, 300, -17.0, 179.9, 0.3), points(rng, 300, 41.9, -87.6, 0.3)]
+    provider_coords = [points(rng, 120, -17.0, 179.9, 0.3), points(rng, 120, 41.9, -87.6, 0.3)]
+    member_lat, member_lon = (np.concatenate(parts) for parts in zip(*member_coords))
+    provider_lat, provider_lon = (np.concatenate(parts) for parts in zip(*provider_coords))
+    member_lon = (member_lon + 180.0) % 360.0 - 180.0
+    provider_lon = (provider_lon + 180.0) % 360.0 - 180.0
+
+    members = pd.DataFrame({
+        'MemberID': [f'M{i}' for i in range(len(member_lat))],
+        'Latitude': member_lat,
+        'Longitude': member_lon,
+        'SourceType': 'Hospital',
+        'cost': rng.uniform(100, 900, len(member_lat)),
+    })
+    providers = pd.DataFrame({
+        'ProviderID': [f'P{i}' for i in range(len(provider_lat))],
+        'Latitude': provider_lat,
+        'Longitude': provider_lon,
+        'Source': 'Hospital',
+        'Type': 'Clinic',
+        'Cost': rng.uniform(100, 900, len(provider_lat)).round(),
+        'CMS Rating': rng.integers(1, 6, len(provider_lat)).astype(float),
+    })
+    return members, providers
+
+def edges(graph):
+    return set(zip(graph.edge_member.tolist(), graph.provider_idx.tolist()))
+
+def chosen_providers(graph, choice):
+    return np.where(choice >= 0, graph.provider_idx[np.maximum(choice, 0)], -1)
+
+def test_antimeridian_has_edges_across(network):
+    members, providers = network
+    graph = NetworkOptimizer().build_candidate_graph(members, providers)
+    member_lon = members['Longitude'].to_numpy()[graph.edge_member]
+    provider_lon = providers['Longitude'].to_numpy()[graph.provider_idx]
+    assert (np.sign(member_lon) != np.sign(provider_lon)).sum() > 0
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_sharded_graph_matches_balltree(network, workers):
+    members, providers = network
+    expected = NetworkOptimizer().build_candidate_graph(members, providers)
+
+    optimizer = NetworkOptimizer()
+    optimizer.sharded = True
+    optimizer.shard_tile_degrees = 0.25
+    optimizer.shard_workers = workers
+    graph = optimizer.build_candidate_graph(members, providers)
+
+    assert edges(graph) == edges(expected)
+    # Edge order within a member differs between the two paths, so compare the chosen providers
+    np.testing.assert_array_equal(chosen_providers(graph, optimizer.select_best_providers(graph)),
+                                  chosen_providers(expected, NetworkOptimizer().select_best_providers(expected)))
+
+def test_sharded_choice_independent_of_tiling(network):
+    members, providers = network
+    # Every provider twice, so each best pick is an exact tie broken by provider position
+    providers = pd.concat([providers, providers], ignore_index=True)
+    choices = []
+    for tile_degrees, workers in [(0.1, 1), (0.25, 2), (1.0, 2)]:
+        optimizer = NetworkOptimizer()
+        optimizer.sharded = True
+        optimizer.shard_tile_degrees = tile_degrees
+        optimizer.shard_workers = workers
+        graph = optimizer.build_candidate_graph(members, providers)
+        choices.append(chosen_providers(graph, optimizer.select_best_providers(graph)))
+    for choice in choices[1:]:
+        np.testing.assert_array_equal(choice, choices[0])
+    served = choices[0] >= 0
+    assert served.any() and (choices[0][served] < len(providers) // 2).all()
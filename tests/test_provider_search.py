@@ -0,0 +1,103 @@
+"""Member provider search against the original per-request filter and haversine loop, and its paged mode."""
+import os
+import shutil
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from data_processor import DataProcess  # noqa: E402
+
+SAMPLE_PROVIDERS = os.path.join(ROOT, 'uploads', 'providers_1756665127_Provider.csv')
+
+# The filters find_nearby_providers applied on every request before the type index
+BASELINE_FILTERS = {
+    'hospital': ('Type', 'Hospital|GENERAL ACUTE CARE|CRITICAL ACCESS'),
+    'supplier': ('Source', 'Supplier'),
+    'nursing': ('Type', 'Nursing|LONG TERM CARE|REHABILITATION'),
+}
+
+@pytest.fixture(scope='module')
+def search(tmp_path_factory):
+    """DataProcess over the sample providers, loaded from its fixed path under a scratch folder."""
+    folder = tmp_path_factory.mktemp('search')
+    os.makedirs(folder / 'attached_assets')
+    shutil.copy(SAMPLE_PROVIDERS, folder / 'attached_assets' / 'Last provider data.csv')
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.chdir(folder)
+        search = DataProcess()
+    assert not search.df.empty
+    return search
+
+def providers_of_type(provider_type):
+    df = pd.read_csv(SAMPLE_PROVIDERS).dropna(subset=['Latitude', 'Longitude', 'CMS Rating'])
+    if provider_type != 'all':
+        column, pattern = BASELINE_FILTERS[provider_type]
+        df = df[df[column].str.contains(pattern, case=False, na=False)]
+    return df
+
+def points_near(provider_type, n=10):
+    """Query points a few km from providers of a type (the sample has few hospitals and nursing homes)."""
+    rng = np.random.default_rng(11)
+    df = providers_of_type(provider_type)
+    df = df.sample(min(n, len(df)), random_state=11)
+    return list(zip((df['Latitude'] + rng.uniform(-0.05, 0.05, len(df))).tolist(),
+                    (df['Longitude'] + rng.uniform(-0.05, 0.05, len(df))).tolist()))
+
+def baseline_nearby(search, user_lat, user_lon, provider_type, radius_km=15):
+    providers = []
+    for _, row in providers_of_type(provider_type).iterrows():
+        distance = search.haversine_distance(user_lat, user_lon, float(row['Latitude']), float(row['Longitude']))
+        if distance <= radius_km:
+            location = str(row['Location']).strip()
+            providers.append({
+                'name': location.split(',')[0] if ',' in location else location,
+                'full_address': location,
+                'contact': str(row['Contact Number']) if pd.notna(row['Contact Number']) else 'N/A',
+                'type': str(row['Type']).strip(),
+                'latitude': float(row['Latitude']),
+                'longitude': float(row['Longitude']),
+                'cms_rating': float(row['CMS Rating']),
+                'cost': float(row['Cost']) if pd.notna(row['Cost']) else 0,
+                'availability': int(row['Availability']) if pd.notna(row['Availability']) else 0,
+                'distance': round(distance, 2),
+            })
+    return search.sort_providers_by_priority(providers)
+
+@pytest.mark.parametrize('provider_type', ['all', 'hospital', 'supplier', 'nursing'])
+def test_find_nearby_providers_matches_sorted_baseline(search, provider_type):
+    found = 0
+    for lat, lon in points_near(provider_type):
+        providers = search.find_nearby_providers(lat, lon, provider_type)
+        assert providers == baseline_nearby(search, lat, lon, provider_type)
+        # Already in priority order, so the route's sort leaves it as is
+        assert search.sort_providers_by_priority(providers) == providers
+        found += len(providers)
+    assert found > 0
+
+@pytest.mark.parametrize('limit', [1, 3, 7])
+def test_pages_cover_the_full_result_without_gaps_or_repeats(search, limit):
+    for lat, lon in points_near('all', n=5):
+        expected = search.find_nearby_providers(lat, lon, 'all')
+        pages, cursor = [], None
+        while True:
+            page, total, cursor = search.find_nearby_providers_page(lat, lon, 'all', limit=limit, cursor=cursor)
+            assert total == len(expected)
+            assert 0 < len(page) <= limit or total == 0
+            pages.append(page)
+            if cursor is None:
+                break
+        assert [provider for page in pages for provider in page] == expected
+        assert all(len(page) == limit for page in pages[:-1])
+
+def test_last_page_and_invalid_limit(search):
+    lat, lon = points_near('all', n=1)[0]
+    expected = search.find_nearby_providers(lat, lon, 'all')
+    page, total, cursor = search.find_nearby_providers_page(lat, lon, 'all', limit=len(expected))
+    assert page == expected and total == len(expected) and cursor is None
+    with pytest.raises(ValueError):
+        search.find_nearby_providers_page(lat, lon, 'all', limit=0)
@@ -0,0 +1,40 @@
+"""Conditional requests and the response cache of result endpoints."""
+from datetime import datetime
+
+def test_matching_etag_or_date_gets_304(result_client):
+    first = result_client.get('/api/chart_data')
+    assert first.status_code == 200
+    etag, last_modified = first.headers['ETag'], first.headers['Last-Modified']
+    assert first.cache_control.private and first.cache_control.no_cache
+    assert {'Accept', 'Cookie'} <= set(first.vary)
+
+    for headers in ({'If-None-Match': etag}, {'If-Modified-Since': last_modified}):
+        response = result_client.get('/api/chart_data', headers=headers)
+        assert response.status_code == 304
+        assert response.get_data() == b''
+        assert response.headers['ETag'] == etag
+
+    assert result_client.get('/api/chart_data', headers={'If-None-Match': '"other"'}).status_code == 200
+    # The response cache serves the same body
+    assert result_client.get('/api/chart_data').get_data() == first.get_data()
+
+def test_each_format_has_its_own_etag(result_client):
+    json_etag = result_client.get('/api/chart_data').headers['ETag']
+    columnar = result_client.get('/api/chart_data', headers={'Accept': 'application/vnd.networkopt.columnar+json'})
+    assert columnar.headers['ETag'] != json_etag
+    response = result_client.get('/api/chart_data', headers={'If-None-Match': json_etag,
+                                                             'Accept': 'application/vnd.networkopt.columnar+json'})
+    assert response.status_code == 200
+
+def test_patched_result_gets_a_new_etag(app, result_client, optimized):
+    from app import db
+    from models import OptimizationResult
+
+    etag = result_client.get('/api/chart_data').headers['ETag']
+    with app.app_context():
+        db.session.get(OptimizationResult, optimized).updated_date = datetime.utcnow()
+        db.session.commit()
+
+    response = result_client.get('/api/chart_data', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
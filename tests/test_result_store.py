@@ -0,0 +1,88 @@
+"""ResultStore .npz assignment artifacts: round trip, field subsets and staged writes."""
+import json
+import os
+import sys
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.optimizer import NetworkOptimizer  # noqa: E402
+from utils.result_store import ASSIGNMENT_FIELDS, PendingFiles, ResultStore  # noqa: E402
+
+class Result(SimpleNamespace):
+    """Stand-in for an OptimizationResult row."""
+
+    def get_optimization_data(self):
+        return json.loads(self.optimization_data) if self.optimization_data else {}
+
+@pytest.fixture(scope='module')
+def assignments():
+    """Optimizer output with unserved members (None fields) and int member IDs."""
+    rng = np.random.default_rng(20)
+    members = pd.DataFrame({
+        'MemberID': np.arange(1, 501),
+        'Latitude': rng.uniform(41.0, 43.0, 500),
+        'Longitude': rng.uniform(-89.0, -87.0, 500),
+        'SourceType': rng.choice(['Hospital', 'Nursing Home', 'Scan Center'], 500),
+        'cost': rng.uniform(100, 900, 500),
+    })
+    providers = pd.DataFrame({
+        'ProviderID': [f'P{i}' for i in range(60)],
+        'Latitude': rng.uniform(41.0, 43.0, 60),
+        'Longitude': rng.uniform(-89.0, -87.0, 60),
+        'Source': 'Hospital',
+        'Type': rng.choice(['Clinic', 'Hospital'], 60),
+        'Cost': rng.uniform(100, 900, 60).round(),
+        'CMS Rating': rng.integers(1, 6, 60).astype(float),
+    })
+    optimizer = NetworkOptimizer()
+    assignments = optimizer.optimize_assignments(optimizer.build_candidate_graph(members, providers),
+                                                 members, providers)
+    served = [a['provider_id'] is not None for a in assignments]
+    assert any(served) and not all(served)
+    return assignments
+
+def test_round_trip_keeps_values_and_types(tmp_path, assignments):
+    store = ResultStore(str(tmp_path))
+    result = Result(id=7, assignments_file=None, optimization_data=None)
+    store.save(result, assignments)
+    assert result.assignments_file == 'optimization_7.assignments.npz'
+
+    loaded = store.load(result)
+    assert loaded == assignments
+    for a, expected in zip(loaded, assignments):
+        assert [type(a[field]) for field in ASSIGNMENT_FIELDS] == [type(expected[field]) for field in ASSIGNMENT_FIELDS]
+    with np.load(store.artifact_path(result), allow_pickle=False) as artifact:
+        assert 'provider_id.missing' in artifact.files
+
+def test_load_only_some_fields(tmp_path, assignments):
+    store = ResultStore(str(tmp_path))
+    result = Result(id=8, assignments_file=None, optimization_data=None)
+    store.save(result, assignments)
+    assert store.load_columns(result, ['member_id', 'distance']) == {
+        'member_id': [a['member_id'] for a in assignments],
+        'distance': [a['distance'] for a in assignments],
+    }
+
+def test_results_from_before_the_artifact_read_the_json(tmp_path, assignments):
+    result = Result(id=9, assignments_file=None, optimization_data=json.dumps({'assignments': assignments[:5]}))
+    assert ResultStore(str(tmp_path)).load(result, ['member_id', 'provider_id']) == [
+        {'member_id': a['member_id'], 'provider_id': a['provider_id']} for a in assignments[:5]]
+
+def test_staged_artifact_is_published_on_success_only(tmp_path, assignments):
+    store = ResultStore(str(tmp_path))
+    result = Result(id=10, assignments_file=None, optimization_data=None)
+    with pytest.raises(RuntimeError):
+        with PendingFiles() as pending:
+            store.save(result, assignments, pending=pending)
+            raise RuntimeError('commit failed')
+    assert os.listdir(tmp_path) == []
+
+    with PendingFiles() as pending:
+        store.save(result, assignments, pending=pending)
+        assert not os.path.exists(store.artifact_path(result))
+    assert os.listdir(tmp_path) == ['optimization_10.assignments.npz']
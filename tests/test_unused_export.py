@@ -0,0 +1,49 @@
+"""Unused-provider CSV export, plain and gzip-compressed."""
+import gzip
+import io
+import os
+
+import pandas as pd
+
+def served_and_all_provider_ids(app, optimization_id):
+    import routes
+    from app import db
+    from models import Dataset, MemberProviderAssignment, OptimizationResult
+
+    with app.app_context():
+        result = db.session.get(OptimizationResult, optimization_id)
+        providers_df = routes.dataset_cache.get(db.session.get(Dataset, result.dataset_providers_id))
+        served = {a.provider_id for a in MemberProviderAssignment.query.filter_by(
+            optimization_result_id=optimization_id, is_served=True) if a.provider_id}
+        return result.unused_providers, served, set(providers_df['ProviderID'].astype(str))
+
+def test_export_lists_unused_providers(app, result_client, optimized):
+    response = result_client.get('/download_unused_providers')
+    assert response.status_code == 200
+    assert f'unused_providers_{optimized}.csv' in response.headers['Content-Disposition']
+
+    export = pd.read_csv(io.BytesIO(response.get_data()), dtype={'Provider ID': str})
+    assert list(export.columns) == ['Provider ID', 'Provider Name & Address', 'Type', 'Rating', 'Cost', 'Contact Number']
+    unused_count, served, all_ids = served_and_all_provider_ids(app, optimized)
+    assert len(export) == unused_count > 0
+    assert set(export['Provider ID']) == all_ids - served
+
+def test_gzip_export_matches_plain(result_client, optimized):
+    plain = result_client.get('/download_unused_providers').get_data()
+    response = result_client.get('/download_unused_providers?compression=gzip')
+    assert response.status_code == 200
+    assert response.mimetype == 'application/gzip'
+    assert response.headers['Content-Disposition'] == f'attachment; filename=unused_providers_{optimized}.csv.gz'
+    assert gzip.decompress(response.get_data()) == plain
+
+def test_missing_export_is_rebuilt(app, result_client, optimized, monkeypatch):
+    import routes
+    from app import db
+    from models import OptimizationResult
+    from utils.response_cache import ResponseCache
+
+    plain = result_client.get('/download_unused_providers').get_data()
+    with app.app_context():
+        os.remove(routes.result_store.unused_providers_path(db.session.get(OptimizationResult, optimized)))
+    monkeypatch.setattr(routes, 'response_cache', ResponseCache())
+    assert result_client.get('/download_unused_providers').get_data() == plain
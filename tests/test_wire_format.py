@@ -0,0 +1,79 @@
+"""Columnar and NDJSON payloads decode to the plain JSON payload."""
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils import wire_format  # noqa: E402
+from utils.wire_format import Records  # noqa: E402
+
+def decode_columnar(value):
+    """Python twin of NetworkOptApp.api.decodeColumnar in static/js/main.js."""
+    if isinstance(value, list):
+        return [decode_columnar(item) for item in value]
+    if not isinstance(value, dict):
+        return value
+    if '$columns' in value:
+        names = list(value['$columns'])
+        return [{name: value['$columns'][name][i] for name in names} for i in range(value['$length'])]
+    return {key: decode_columnar(item) for key, item in value.items()}
+
+def decode_ndjson(text):
+    lines = [json.loads(line) for line in text.splitlines()]
+    payload = lines[0]
+    sections = payload.pop('$sections')
+    for name in sections:
+        payload[name] = []
+    for name, row in lines[1:]:
+        payload[name].append(row)
+    assert {name: len(payload[name]) for name in sections} == sections
+    return payload
+
+PAYLOAD = {
+    'success': True,
+    'providers': Records.from_rows([
+        {'id': 'P1', 'rating': 4.0, 'contact': None},
+        {'id': 'P2', 'rating': None, 'contact': '555-0100'},
+        {'id': 'P3', 'rating': 5.0},
+    ]),
+    'empty': Records({'id': []}),
+    'count': 3,
+}
+
+def test_streamed_formats_decode_to_the_json_payload():
+    plain = json.loads(json.dumps(wire_format.plain(PAYLOAD)))
+    ndjson = ''.join(wire_format.stream(PAYLOAD, wire_format.NDJSON_MIMETYPE))
+    assert decode_ndjson(ndjson) == plain
+
+    # Columns hold every field, so nulls survive and a field missing from a row comes back as null
+    plain['providers'][2]['contact'] = None
+    columnar = ''.join(wire_format.stream(PAYLOAD, wire_format.COLUMNAR_MIMETYPE))
+    assert decode_columnar(json.loads(columnar)) == plain
+
+@pytest.mark.parametrize('accept,mimetype', [
+    (None, wire_format.JSON_MIMETYPE),
+    ('*/*', wire_format.JSON_MIMETYPE),
+    ('application/json', wire_format.JSON_MIMETYPE),
+    (wire_format.COLUMNAR_MIMETYPE, wire_format.COLUMNAR_MIMETYPE),
+    (f'{wire_format.NDJSON_MIMETYPE}, application/json;q=0.5', wire_format.NDJSON_MIMETYPE),
+    ('text/html', wire_format.JSON_MIMETYPE),
+])
+def test_map_data_negotiates_the_format(result_client, accept, mimetype):
+    headers = {'Accept': accept} if accept else {}
+    response = result_client.get('/api/map_data', headers=headers)
+    assert response.status_code == 200
+    assert response.mimetype == mimetype
+    assert 'Accept' in response.vary
+
+    expected = result_client.get('/api/map_data').get_json()
+    body = response.get_data(as_text=True)
+    if mimetype == wire_format.COLUMNAR_MIMETYPE:
+        assert decode_columnar(json.loads(body)) == expected
+    elif mimetype == wire_format.NDJSON_MIMETYPE:
+        assert decode_ndjson(body) == expected
+    else:
+        assert json.loads(body) == expected
+    assert expected['served_members'] and expected['providers']
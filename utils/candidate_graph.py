@@ -0,0 +1,139 @@
+import numpy as np
+import pandas as pd
+import logging
+
+logger = logging.getLogger(__name__)
+
+class CandidateGraph:
+    """Columnar member -> provider candidate edges stored CSR-style.
+
+    Edges of member ``i`` live in ``offsets[i]:offsets[i + 1]`` of the edge
+    columns. Members and providers are referenced by position (iloc) in the
+    frames the graph was built from.
+    """
+
+    def __init__(self, offsets, provider_idx, distance, cost, rating):
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        self.provider_idx = np.asarray(provider_idx, dtype=np.int32)
+        self.distance = np.asarray(distance, dtype=np.float64)
+        self.cost = np.asarray(cost, dtype=np.float64)
+        self.rating = np.asarray(rating, dtype=np.float64)
+        self._edge_member = None
+
+    @classmethod
+    def from_edges(cls, member_idx, provider_idx, distance, n_members, provider_cost, provider_rating):
+        """Build a graph from flat edge arrays and per-provider cost/rating columns."""
+        member_idx = np.asarray(member_idx, dtype=np.int64)
+        provider_idx = np.asarray(provider_idx, dtype=np.int64)
+        distance = np.asarray(distance, dtype=np.float64)
+
+        # Stable sort keeps the original candidate order inside each member
+        if len(member_idx) > 1 and np.any(member_idx[1:] < member_idx[:-1]):
+            order = np.argsort(member_idx, kind='stable')
+            member_idx, provider_idx, distance = member_idx[order], provider_idx[order], distance[order]
+
+        offsets = np.zeros(n_members + 1, dtype=np.int64)
+        np.cumsum(np.bincount(member_idx, minlength=n_members), out=offsets[1:])
+
+        provider_cost = np.asarray(provider_cost, dtype=np.float64)
+        provider_rating = np.asarray(provider_rating, dtype=np.float64)
+        return cls(offsets, provider_idx, distance, provider_cost[provider_idx], provider_rating[provider_idx])
+
+    @classmethod
+    def from_connections(cls, candidate_connections, members_df, providers_df):
+        """Build a graph from legacy list-of-dicts candidate connections."""
+        if not candidate_connections:
+            return cls.empty(len(members_df))
+
+        connections = pd.DataFrame(candidate_connections, columns=['member_id', 'provider_id', 'distance', 'cost', 'rating'])
+        member_pos = pd.Index(members_df['MemberID']).get_indexer(connections['member_id'])
+        provider_pos = pd.Index(providers_df['ProviderID']).get_indexer(connections['provider_id'])
+        known = (member_pos >= 0) & (provider_pos >= 0)
+        if not known.all():
+            logger.warning(f"Dropping {int((~known).sum())} candidate connections with unknown member/provider IDs")
+
+        member_pos, provider_pos = member_pos[known], provider_pos[known]
+        order = np.argsort(member_pos, kind='stable')
+        member_pos, provider_pos = member_pos[order], provider_pos[order]
+
+        offsets = np.zeros(len(members_df) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(member_pos, minlength=len(members_df)), out=offsets[1:])
+
+        def column(name):
+            return pd.to_numeric(connections[name], errors='coerce').to_numpy(dtype=np.float64)[known][order]
+
+        return cls(offsets, provider_pos, column('distance'), column('cost'), column('rating'))
+
+    @classmethod
+    def empty(cls, n_members):
+        return cls(np.zeros(n_members + 1, dtype=np.int64), [], [], [], [])
+
+    def __len__(self):
+        return self.n_edges
+
+    @property
+    def n_members(self):
+        return len(self.offsets) - 1
+
+    @property
+    def n_edges(self):
+        return int(self.offsets[-1])
+
+    @property
+    def degree(self):
+        """Number of candidate edges per member."""
+        return np.diff(self.offsets)
+
+    @property
+    def edge_member(self):
+        """Member position of every edge (expanded from offsets, cached)."""
+        if self._edge_member is None:
+            self._edge_member = np.repeat(np.arange(self.n_members, dtype=np.int64), self.degree)
+        return self._edge_member
+
+    @property
+    def nbytes(self):
+        return sum(a.nbytes for a in (self.offsets, self.provider_idx, self.distance, self.cost, self.rating))
+
+    def member_slice(self, member_pos):
+        """Slice of the edge columns holding one member's candidates."""
+        return slice(int(self.offsets[member_pos]), int(self.offsets[member_pos + 1]))
+
+    def broadcast(self, member_values):
+        """Repeat a per-member array onto that member's edges."""
+        return np.repeat(np.asarray(member_values), self.degree)
+
+    def segment_lexmin(self, keys, mask=None):
+        """Per-member edge index minimizing ``keys`` lexicographically (primary key first).
+
+        Ties keep the first edge in candidate order; NaN keys sort last. Members
+        with no (unmasked) edge get -1.
+        """
+        result = np.full(self.n_members, -1, dtype=np.int64)
+        edges = np.arange(self.n_edges, dtype=np.int64) if mask is None else np.flatnonzero(mask)
+        if len(edges) == 0:
+            return result
+
+        members = self.edge_member[edges]
+        order = np.lexsort(tuple(np.asarray(k)[edges] for k in reversed(keys)) + (members,))
+        edges, members = edges[order], members[order]
+        first = np.empty(len(edges), dtype=bool)
+        first[0] = True
+        first[1:] = members[1:] != members[:-1]
+        result[members[first]] = edges[first]
+        return result
+
+    def segment_argmin(self, values, mask=None):
+        """Per-member edge index of the smallest value (first on ties, -1 if none)."""
+        return self.segment_lexmin((values,), mask)
+
+    def segment_argmax(self, values, mask=None):
+        """Per-member edge index of the largest value (first on ties, -1 if none)."""
+        return self.segment_lexmin((-np.asarray(values, dtype=np.float64),), mask)
+
+    def filter(self, mask):
+        """New graph keeping only the edges where ``mask`` is True."""
+        mask = np.asarray(mask, dtype=bool)
+        offsets = np.zeros(self.n_members + 1, dtype=np.int64)
+        np.cumsum(np.bincount(self.edge_member[mask], minlength=self.n_members), out=offsets[1:])
+        return CandidateGraph(offsets, self.provider_idx[mask], self.distance[mask], self.cost[mask], self.rating[mask])
@@ -2,25 +2,88 @@ import pandas as pd
 import numpy as np
 import re
 import logging
+from utils.prepared_dataset import PreparedDataset
+from utils.provider_categories import CATEGORY_COLUMN, classify_providers
+from utils.schema import MEMBER_SCHEMA, PROVIDER_SCHEMA, apply_schema, concat_frames, memory_report
 
 logger = logging.getLogger(__name__)
 
+class SeenIds:
+    """IDs seen in earlier chunks of a file.
+    
+    Canonical integer IDs (the common case) live in a sorted int64 array;
+    anything else (e.g. 'M-001', '007') goes in a set. IDs come as int, float
+    (when some are missing) or str columns, so 5, 5.0 and '5' are all the
+    integer 5.
+    """
+    
+    def __init__(self):
+        self.ints = np.empty(0, dtype=np.int64)
+        self.others = set()
+    
+    def __len__(self):
+        return len(self.ints) + len(self.others)
+    
+    @staticmethod
+    def _split(ids):
+        """(is_int mask, int64 values, other keys) for a chunk of IDs"""
+        if pd.api.types.is_integer_dtype(ids):
+            return np.ones(len(ids), dtype=bool), ids.to_numpy(dtype=np.int64), ids.iloc[:0]
+        numeric = pd.to_numeric(ids, errors='coerce')
+        whole = (numeric.notna() & (numeric == numeric.round()) & (numeric.abs() < 2 ** 62)).to_numpy()
+        if not pd.api.types.is_numeric_dtype(ids):
+            # Only canonical integer strings ('5', not '05' or '5.0') compare as integers
+            text = ids.astype(str)
+            whole &= (text == numeric.fillna(0).astype(np.int64).astype(str)).to_numpy()
+        values = numeric.to_numpy()[whole].astype(np.int64)
+        return whole, values, ids[~whole & ids.notna().to_numpy()].astype(str)
+    
+    def find_duplicates(self, ids):
+        """Mask of IDs repeated within the chunk or seen before; remembers the rest"""
+        is_int, values, others = self._split(ids)
+        duplicate = np.zeros(len(ids), dtype=bool)
+        
+        int_dup = pd.Series(values).duplicated().to_numpy()
+        if len(self.ints):
+            pos = np.minimum(np.searchsorted(self.ints, values), len(self.ints) - 1)
+            int_dup |= self.ints[pos] == values
+        duplicate[is_int] = int_dup
+        
+        other_pos = np.flatnonzero(~is_int & ids.notna().to_numpy())
+        other_dup = (others.duplicated() | others.isin(self.others)).to_numpy()
+        duplicate[other_pos] = other_dup
+        
+        new_values = np.sort(values[~int_dup])
+        self.ints = np.insert(self.ints, np.searchsorted(self.ints, new_values), new_values)
+        self.others.update(others[~other_dup])
+        return duplicate
+
 class DataProcessor:
     """Handles data cleaning and preprocessing for member and provider datasets"""
     
+    MEMBER_CHUNK_ROWS = 100000
+    MAX_REPORTED_ERRORS = 20
+    MEMBER_DELTA_ACTIONS = ['add', 'update', 'remove']
+    
     def __init__(self):
         self.required_member_columns = ['MemberID', 'SourceType', 'Latitude', 'Longitude', 'cost']
         self.required_provider_columns = ['ProviderID', 'Source', 'Location', 'Type', 'Latitude', 'Longitude', 'CMS Rating', 'Cost']
+        self.valid_source_types = ['Hospital', 'Nursing Home', 'Scan Center', 'Supply Directory']
     
     def clean_cost_column(self, cost_series):
         """Clean cost column by removing $ signs and converting to numeric"""
         try:
             # Handle string costs with $ signs
             if cost_series.dtype == 'object':
+                # Costs repeat heavily, so clean each distinct value once
+                codes, uniques = pd.factorize(cost_series)
                 # Remove $ signs and any other non-numeric characters except decimal points
-                cleaned = cost_series.astype(str).str.replace(r'[$,]', '', regex=True)
+                cleaned = pd.Series(uniques, dtype=object).astype(str).str.replace(r'[$,]', '', regex=True)
                 # Convert to numeric, invalid values become NaN
-                return pd.to_numeric(cleaned, errors='coerce')
+                values = pd.to_numeric(cleaned, errors='coerce').to_numpy()
+                if (codes < 0).any():
+                    values = np.append(values.astype(np.float64), np.nan)
+                return pd.Series(values[codes], index=cost_series.index, name=cost_series.name)
             else:
                 return pd.to_numeric(cost_series, errors='coerce')
         except Exception as e:
@@ -35,80 +98,255 @@ class DataProcessor:
         lat_numeric = pd.to_numeric(lat_series, errors='coerce')
         lon_numeric = pd.to_numeric(lon_series, errors='coerce')
         
-        # Check for NaN values
-        lat_nan_count = lat_numeric.isna().sum()
-        lon_nan_count = lon_numeric.isna().sum()
-        
-        if lat_nan_count > 0:
-            errors.append(f"{lat_nan_count} invalid latitude values found")
-        if lon_nan_count > 0:
-            errors.append(f"{lon_nan_count} invalid longitude values found")
-        
-        # Check coordinate ranges
-        invalid_lat = ((lat_numeric < -90) | (lat_numeric > 90)).sum()
-        invalid_lon = ((lon_numeric < -180) | (lon_numeric > 180)).sum()
-        
-        if invalid_lat > 0:
-            errors.append(f"{invalid_lat} latitude values outside valid range (-90 to 90)")
-        if invalid_lon > 0:
-            errors.append(f"{invalid_lon} longitude values outside valid range (-180 to 180)")
+        for description, invalid in self.coordinate_issues(lat_numeric, lon_numeric):
+            invalid_count = invalid.sum()
+            if invalid_count > 0:
+                errors.append(f"{invalid_count} {description}")
         
         return lat_numeric, lon_numeric, errors
     
+    def coordinate_issues(self, lat_numeric, lon_numeric):
+        """(description, row mask) for each kind of invalid coordinate"""
+        return [
+            ('invalid latitude values found', lat_numeric.isna()),
+            ('invalid longitude values found', lon_numeric.isna()),
+            ('latitude values outside valid range (-90 to 90)', (lat_numeric < -90) | (lat_numeric > 90)),
+            ('longitude values outside valid range (-180 to 180)', (lon_numeric < -180) | (lon_numeric > 180)),
+        ]
+    
     def process_members_data(self, filepath):
         """Process and validate members dataset"""
+        chunks = []
+        record_count, errors = self.ingest_members_data(filepath, chunks.append)
+        if not chunks:
+            return (None if errors else pd.DataFrame(columns=self.required_member_columns)), errors
+        
+        df = concat_frames(chunks)
+        logger.info(f"Members frame uses {memory_report(df)['total'] / 1e6:.1f} MB")
+        return df, errors
+    
+    def ingest_members_data(self, filepath, write_chunk, chunksize=None):
+        """Validate and clean a members CSV chunk by chunk with bounded memory
+        
+        Every cleaned chunk (all columns) is passed to write_chunk as soon as
+        it is ready; callers decide what to keep when errors are reported.
+        Errors name CSV rows (header = row 1). MemberIDs are tracked across
+        chunks so duplicates anywhere in the file are found.
+        Returns (record_count, errors).
+        """
         errors = []
+        record_count = 0
+        seen_ids = SeenIds()
+        invalid_source_types = set()
         
         try:
-            # Read CSV file
-            df = pd.read_csv(filepath)
-            logger.info(f"Loaded members dataset with {len(df)} records")
-            
             # Check required columns
-            missing_columns = [col for col in self.required_member_columns if col not in df.columns]
+            columns = pd.read_csv(filepath, nrows=0).columns
+            missing_columns = [col for col in self.required_member_columns if col not in columns]
             if missing_columns:
                 errors.append(f"Missing required columns: {', '.join(missing_columns)}")
-                return None, errors
+                return 0, errors
             
-            # Clean cost column
-            df['cost'] = self.clean_cost_column(df['cost'])
+            chunksize = chunksize or self.MEMBER_CHUNK_ROWS
+            # Cleaning coerces the other required columns; MemberID and the extra
+            # columns keep the type a whole-file read would give them
+            passthrough = [col for col in columns if col == 'MemberID' or col not in self.required_member_columns]
+            dtypes = self.infer_csv_dtypes(filepath, passthrough, chunksize)
+            with pd.read_csv(filepath, dtype=dtypes, chunksize=chunksize) as reader:
+                for chunk in reader:
+                    chunk, chunk_errors = self.clean_members_chunk(chunk, seen_ids, invalid_source_types)
+                    errors.extend(chunk_errors)
+                    record_count += len(chunk)
+                    write_chunk(chunk)
             
-            # Validate coordinates
-            df['Latitude'], df['Longitude'], coord_errors = self.validate_coordinates(df['Latitude'], df['Longitude'])
-            errors.extend(coord_errors)
-            
-            # Check for missing values in critical columns
-            for col in self.required_member_columns:
-                missing_count = df[col].isna().sum()
-                if missing_count > 0:
-                    if col in ['Latitude', 'Longitude', 'cost']:
-                        # These are critical - remove rows with missing values
-                        df = df.dropna(subset=[col])
-                        logger.warning(f"Removed {missing_count} rows with missing {col}")
-                    else:
-                        errors.append(f"{missing_count} missing values in {col}")
-            
-            # Validate SourceType values
-            valid_source_types = ['Hospital', 'Nursing Home', 'Scan Center', 'Supply Directory']
-            invalid_source_types = df[~df['SourceType'].isin(valid_source_types)]['SourceType'].unique()
-            if len(invalid_source_types) > 0:
-                logger.warning(f"Found invalid source types: {invalid_source_types}")
+            if invalid_source_types:
                 # Keep them but log as warning
+                logger.warning(f"Found invalid source types: {sorted(map(str, invalid_source_types))}")
             
-            # Ensure MemberID is unique
-            duplicate_ids = df['MemberID'].duplicated().sum()
-            if duplicate_ids > 0:
-                errors.append(f"{duplicate_ids} duplicate Member IDs found")
-                df = df.drop_duplicates(subset=['MemberID'], keep='first')
+            logger.info(f"Processed members dataset: {record_count} valid records")
+            if len(errors) > self.MAX_REPORTED_ERRORS:
+                errors = errors[:self.MAX_REPORTED_ERRORS] + [f"... and {len(errors) - self.MAX_REPORTED_ERRORS} more errors"]
+            return record_count, errors
             
-            logger.info(f"Processed members dataset: {len(df)} valid records")
+        except Exception as e:
+            error_msg = f"Error processing members dataset: {str(e)}"
+            logger.error(error_msg)
+            return 0, [error_msg]
+    
+    def infer_csv_dtypes(self, filepath, columns, chunksize):
+        """Dtypes a single read_csv of the whole file would infer for columns, chunk by chunk
+        
+        A chunked read infers each chunk on its own, so an ID column can be int
+        in one chunk and str in the next. Columns whose chunks disagree become
+        float64 if every chunk was numeric, str otherwise.
+        """
+        seen = {}
+        with pd.read_csv(filepath, usecols=columns, chunksize=chunksize) as reader:
+            for chunk in reader:
+                for column, dtype in chunk.dtypes.items():
+                    seen.setdefault(column, set()).add(dtype)
+        
+        dtypes = {}
+        for column, kinds in seen.items():
+            if len(kinds) == 1 and next(iter(kinds)) != object:
+                dtypes[column] = next(iter(kinds))
+            elif all(pd.api.types.is_numeric_dtype(kind) and not pd.api.types.is_bool_dtype(kind) for kind in kinds):
+                dtypes[column] = np.float64
+            else:
+                dtypes[column] = str
+        return dtypes
+    
+    def clean_members_chunk(self, df, seen_ids, invalid_source_types):
+        """Clean one members chunk; returns the kept rows and row-numbered errors"""
+        errors = []
+        if df.empty:
             return df, errors
+        rows = f"Rows {df.index[0] + 2}-{df.index[-1] + 2}"
+        
+        # Clean cost column
+        df['cost'] = self.clean_cost_column(df['cost'])
+        
+        # Validate coordinates
+        df['Latitude'] = pd.to_numeric(df['Latitude'], errors='coerce')
+        df['Longitude'] = pd.to_numeric(df['Longitude'], errors='coerce')
+        for description, invalid in self.coordinate_issues(df['Latitude'], df['Longitude']):
+            if invalid.any():
+                errors.append(f"{rows}: {int(invalid.sum())} {description} ({self._row_numbers(invalid)})")
+        
+        # Compact dtypes (categorical SourceType, float32 coordinates, int32 IDs)
+        apply_schema(df, MEMBER_SCHEMA)
+        
+        # Check for missing values in critical columns
+        for col in self.required_member_columns:
+            missing = df[col].isna()
+            if missing.any():
+                if col in ['Latitude', 'Longitude', 'cost']:
+                    # These are critical - remove rows with missing values
+                    df = df[~missing]
+                    logger.warning(f"{rows}: removed {int(missing.sum())} rows with missing {col}")
+                else:
+                    errors.append(f"{rows}: {int(missing.sum())} missing values in {col} ({self._row_numbers(missing)})")
+        
+        # Validate SourceType values
+        invalid_source_types.update(df.loc[~df['SourceType'].isin(self.valid_source_types), 'SourceType'].dropna().unique())
+        
+        # Ensure MemberID is unique, including against earlier chunks
+        duplicate = pd.Series(seen_ids.find_duplicates(df['MemberID']), index=df.index)
+        if duplicate.any():
+            errors.append(f"{rows}: {int(duplicate.sum())} duplicate Member IDs found ({self._row_numbers(duplicate)})")
+            df = df[~duplicate]
+        
+        return df, errors
+    
+    def process_member_delta(self, filepath):
+        """Validate a members delta CSV: MemberID, Action (add/update/remove)
+        
+        add and update rows carry the member columns and are cleaned like a
+        full upload; remove rows only need MemberID. Returns (delta_df, errors)
+        where delta_df keeps the CSV row index and has an Action column.
+        """
+        errors = []
+        
+        try:
+            df = pd.read_csv(filepath)
+            logger.info(f"Loaded members delta with {len(df)} records")
+            
+            missing_columns = [col for col in ['MemberID', 'Action'] if col not in df.columns]
+            if missing_columns:
+                errors.append(f"Missing required columns: {', '.join(missing_columns)}")
+                return None, errors
+            
+            df['Action'] = df['Action'].astype(str).str.strip().str.lower()
+            invalid_action = ~df['Action'].isin(self.MEMBER_DELTA_ACTIONS)
+            if invalid_action.any():
+                errors.append(f"{int(invalid_action.sum())} rows with an Action other than "
+                              f"{', '.join(self.MEMBER_DELTA_ACTIONS)} ({self._row_numbers(invalid_action)})")
+            
+            upserts = df[df['Action'].isin(['add', 'update'])]
+            removals = df.loc[df['Action'] == 'remove', ['MemberID', 'Action']]
+            seen_ids = SeenIds()
+            if len(upserts):
+                missing_columns = [col for col in self.required_member_columns if col not in df.columns]
+                if missing_columns:
+                    errors.append(f"Missing required columns for add/update rows: {', '.join(missing_columns)}")
+                    return None, errors
+                
+                invalid_source_types = set()
+                cleaned, chunk_errors = self.clean_members_chunk(
+                    upserts[self.required_member_columns].copy(), seen_ids, invalid_source_types)
+                errors.extend(chunk_errors)
+                dropped = pd.Series(~upserts.index.isin(cleaned.index), index=upserts.index)
+                if dropped.any():
+                    errors.append(f"{int(dropped.sum())} add/update rows missing Latitude, Longitude or cost, "
+                                  f"or with a duplicate MemberID ({self._row_numbers(dropped)})")
+                if invalid_source_types:
+                    logger.warning(f"Found invalid source types: {sorted(map(str, invalid_source_types))}")
+                upserts = cleaned.assign(Action=upserts.loc[cleaned.index, 'Action'])
+            
+            # A member may appear only once per delta
+            duplicate = pd.Series(seen_ids.find_duplicates(removals['MemberID']), index=removals.index)
+            if duplicate.any():
+                errors.append(f"{int(duplicate.sum())} Member IDs listed more than once ({self._row_numbers(duplicate)})")
+            
+            delta_df = apply_schema(pd.concat([upserts, removals]).sort_index(), MEMBER_SCHEMA)
+            if len(errors) > self.MAX_REPORTED_ERRORS:
+                errors = errors[:self.MAX_REPORTED_ERRORS] + [f"... and {len(errors) - self.MAX_REPORTED_ERRORS} more errors"]
+            return delta_df, errors
             
         except Exception as e:
-            error_msg = f"Error processing members dataset: {str(e)}"
+            error_msg = f"Error processing members delta: {str(e)}"
             logger.error(error_msg)
             return None, [error_msg]
     
+    def apply_member_delta(self, members_df, delta_df):
+        """Merge a cleaned members delta into a members frame; returns (merged_df, errors)
+        
+        Updated members keep their position, removed ones are dropped and
+        added ones are appended, so unchanged members keep their order.
+        """
+        errors = []
+        action = delta_df['Action'].to_numpy()
+        positions = pd.Index(members_df['MemberID']).get_indexer(delta_df['MemberID'])
+        known = positions >= 0
+        for description, invalid in [
+            ('add rows for existing Member IDs', (action == 'add') & known),
+            ('update rows for unknown Member IDs', (action == 'update') & ~known),
+            ('remove rows for unknown Member IDs', (action == 'remove') & ~known),
+        ]:
+            if invalid.any():
+                errors.append(f"{int(invalid.sum())} {description} ({self._row_numbers(pd.Series(invalid, index=delta_df.index))})")
+        if errors:
+            return None, errors
+        
+        columns = list(members_df.columns)
+        # reindex: a remove-only delta has no member columns
+        updates = delta_df.loc[action == 'update'].reindex(columns=columns)
+        adds = delta_df.loc[action == 'add'].reindex(columns=columns)
+        combined = concat_frames([members_df] + [f for f in (updates, adds) if len(f)]).reset_index(drop=True)
+        
+        # Row order: the base rows (updated ones swapped for their new version, removed
+        # ones left out), then the added rows
+        n = len(members_df)
+        take = np.arange(n)
+        take[positions[action == 'update']] = n + np.arange(len(updates))
+        keep = np.ones(n, dtype=bool)
+        keep[positions[action == 'remove']] = False
+        take = np.concatenate([take[keep], n + len(updates) + np.arange(len(adds))])
+        
+        merged_df = combined.iloc[take].reset_index(drop=True)
+        logger.info(f"Applied members delta: {len(adds)} added, {len(updates)} updated, "
+                    f"{int((action == 'remove').sum())} removed; {len(merged_df)} members")
+        return merged_df, errors
+    
+    @staticmethod
+    def _row_numbers(mask, limit=10):
+        """CSV row numbers (header = row 1) of the rows in mask, for error messages"""
+        row_numbers = (mask.index[mask.to_numpy()] + 2).tolist()
+        listed = ', '.join(map(str, row_numbers[:limit]))
+        if len(row_numbers) > limit:
+            listed += f" and {len(row_numbers) - limit} more"
+        return f"row{'s' if len(row_numbers) > 1 else ''} {listed}"
+    
     def process_providers_data(self, filepath):
         """Process and validate providers dataset"""
         errors = []
@@ -139,6 +377,14 @@ class DataProcessor:
                 # Clip ratings to valid range
                 df['CMS Rating'] = df['CMS Rating'].clip(1, 5)
             
+            # Availability is optional; it caps members per provider in capacitated mode
+            if 'Availability' in df.columns:
+                df['Availability'] = pd.to_numeric(df['Availability'], errors='coerce')
+                invalid_availability = (df['Availability'] < 0).sum()
+                if invalid_availability > 0:
+                    logger.warning(f"{invalid_availability} negative Availability values found, treated as 0")
+                    df['Availability'] = df['Availability'].clip(lower=0)
+            
             # Check for missing values in critical columns
             critical_columns = ['ProviderID', 'Latitude', 'Longitude', 'Cost', 'CMS Rating']
             for col in critical_columns:
@@ -156,7 +402,13 @@ class DataProcessor:
             # Clean and validate provider types
             df['Type'] = df['Type'].fillna('Unknown')
             
-            logger.info(f"Processed providers dataset: {len(df)} valid records")
+            # Classify provider categories once so consumers compare bits, not strings
+            df[CATEGORY_COLUMN] = classify_providers(df)
+            
+            # Compact dtypes (categoricals, float32 coordinates, int32 IDs, uint8 ratings)
+            apply_schema(df, PROVIDER_SCHEMA)
+            
+            logger.info(f"Processed providers dataset: {len(df)} valid records, {memory_report(df)['total'] / 1e6:.1f} MB")
             return df, errors
             
         except Exception as e:
@@ -164,6 +416,15 @@ class DataProcessor:
             logger.error(error_msg)
             return None, [error_msg]
     
+    def prepare(self, df, dataset_type):
+        """Validated PreparedDataset over a cleaned members/providers frame
+        
+        Raises ValueError if any row lacks numeric coordinates.
+        """
+        prepared = PreparedDataset.from_frame(df, dataset_type)
+        logger.info(f"Prepared {dataset_type} dataset: {len(prepared)} rows, {prepared.nbytes / 1e6:.1f} MB of derived arrays")
+        return prepared
+    
     def get_dataset_summary(self, df, dataset_type):
         """Generate summary statistics for a dataset"""
         summary = {
@@ -0,0 +1,300 @@
+import os
+import json
+import logging
+import zipfile
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from utils.data_processor import DataProcessor
+from utils.schema import concat_frames
+from utils.spatial_index import ProviderSpatialIndex
+
+logger = logging.getLogger(__name__)
+
+class DatasetCache:
+    """Cleaned member/provider frames keyed by Dataset id and CSV mtime.
+
+    Two tiers: an in-process LRU bounded by ``memory_budget`` bytes, and an
+    .npz artifact of plain arrays next to the uploaded CSV that is written
+    once at upload time (see FrameArchive); member uploads are written into
+    it chunk by chunk. Provider datasets also get a persisted
+    ProviderSpatialIndex, and the optimizer reads PreparedDatasets built over
+    the cached frames. A member delta dataset's frame is its base roster with
+    the delta applied.
+    Cached objects are shared between requests and must be treated as
+    read-only.
+    """
+
+    ARTIFACT_SUFFIX = '.clean.npz'
+    ARTIFACT_VERSION = 4
+
+    def __init__(self, upload_folder, memory_budget=512 * 1024 * 1024, processor=None):
+        self.upload_folder = upload_folder
+        self.memory_budget = memory_budget
+        self.processor = processor or DataProcessor()
+        self._entries = OrderedDict()  # (dataset_id, mtime, kind) -> (object, nbytes)
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def csv_path(self, dataset):
+        return os.path.join(self.upload_folder, dataset.filename)
+
+    def artifact_path(self, dataset):
+        return self.csv_path(dataset) + self.ARTIFACT_SUFFIX
+
+    def get(self, dataset):
+        """Cleaned frame for a Dataset, from memory, the artifact, or by parsing the CSV."""
+        csv_path = self.csv_path(dataset)
+        mtime = os.path.getmtime(csv_path)
+        key = (dataset.id, mtime, 'frame')
+        cached = self._lookup(key)
+        if cached is not None:
+            return cached
+
+        df = self._load_artifact(dataset, mtime)
+        if df is None:
+            df = self._parse(dataset, csv_path)
+            if df is None:
+                return None
+            self._write_artifact(dataset, df, mtime)
+
+        self._remember(key, df, int(df.memory_usage(deep=True).sum()))
+        return df
+
+    def get_prepared(self, dataset):
+        """PreparedDataset over the cleaned frame of a Dataset, validated once and cached."""
+        key = (dataset.id, os.path.getmtime(self.csv_path(dataset)), 'prepared')
+        cached = self._lookup(key)
+        if cached is not None:
+            return cached
+
+        df = self.get(dataset)
+        if df is None:
+            return None
+        prepared = self.processor.prepare(df, dataset.file_type)
+        # Counted with its frame: the entry keeps the frame alive even if the frame entry is evicted
+        self._remember(key, prepared, prepared.nbytes + int(df.memory_usage(deep=True).sum()))
+        return prepared
+
+    def get_index(self, dataset, providers_df=None):
+        """Persisted ProviderSpatialIndex for a providers Dataset, built on first use."""
+        csv_path = self.csv_path(dataset)
+        key = (dataset.id, os.path.getmtime(csv_path), 'index')
+        cached = self._lookup(key)
+        if cached is not None:
+            return cached
+
+        if providers_df is None:
+            providers_df = self.get(dataset)
+        index = ProviderSpatialIndex.load_or_build(csv_path, providers_df)
+        if index is not None:
+            self._remember(key, index, index.nbytes)
+        return index
+
+    def store(self, dataset, df):
+        """Cache a frame that was just cleaned (e.g. at upload) in memory and on disk."""
+        mtime = os.path.getmtime(self.csv_path(dataset))
+        self._write_artifact(dataset, df, mtime)
+        self._remember((dataset.id, mtime, 'frame'), df, int(df.memory_usage(deep=True).sum()))
+
+    def ingest_members(self, csv_path):
+        """Chunked members ingest written straight into the artifact for csv_path.
+
+        Returns (record_count, errors); no artifact is kept if there are errors.
+        """
+        path = csv_path + self.ARTIFACT_SUFFIX
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with FrameArchive(tmp_path) as archive:
+                record_count, errors = self.processor.ingest_members_data(csv_path, archive.write)
+                archive.finish(self._artifact_header(os.path.getmtime(csv_path)))
+            if not errors and archive.complete:
+                os.replace(tmp_path, path)
+            return record_count, errors
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def _parse(self, dataset, csv_path):
+        if getattr(dataset, 'base_dataset', None) is not None:
+            # Member delta: re-apply it to its (cached or re-parsed) base roster
+            base_df = self.get(dataset.base_dataset)
+            delta_df, errors = self.processor.process_member_delta(csv_path)
+            if base_df is None or errors:
+                return None
+            df, _ = self.processor.apply_member_delta(base_df, delta_df)
+        elif dataset.file_type == 'members':
+            df, _ = self.processor.process_members_data(csv_path)
+        else:
+            df, _ = self.processor.process_providers_data(csv_path)
+        return df
+
+    def _load_artifact(self, dataset, mtime):
+        path = self.artifact_path(dataset)
+        if not os.path.exists(path):
+            return None
+        try:
+            chunks = FrameArchive.read(path, self._artifact_header(mtime))
+            if chunks is None:
+                logger.info(f"Stale dataset artifact for dataset {dataset.id}, re-parsing CSV")
+                return None
+            if not chunks:
+                return None
+            return concat_frames(chunks)
+        except Exception as e:
+            logger.warning(f"Could not read dataset artifact {path}: {str(e)}")
+            return None
+
+    def _write_artifact(self, dataset, df, mtime):
+        path = self.artifact_path(dataset)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with FrameArchive(tmp_path) as archive:
+                archive.write(df)
+                archive.finish(self._artifact_header(mtime))
+            if archive.complete:
+                os.replace(tmp_path, path)
+            elif os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        except Exception as e:
+            logger.warning(f"Could not write dataset artifact {path}: {str(e)}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def _artifact_header(self, mtime):
+        return {'version': self.ARTIFACT_VERSION, 'source_mtime': mtime}
+
+    def _lookup(self, key):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key][0]
+        return None
+
+    def _remember(self, key, value, nbytes):
+        if nbytes > self.memory_budget:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._bytes -= self._entries.pop(key)[1]
+            self._entries[key] = (value, nbytes)
+            self._bytes += nbytes
+            while self._bytes > self.memory_budget:
+                _, (_, evicted_bytes) = self._entries.popitem(last=False)
+                self._bytes -= evicted_bytes
+
+class FrameArchive:
+    """Cleaned frame as an .npz archive of plain arrays, written chunk by chunk.
+
+    Every column (and the index) of every chunk is one .npy member: numbers
+    natively, categorical and string columns as codes (-1 = missing) plus a
+    categories array. A JSON header member, written last, lists each
+    chunk's columns and how they are encoded, so the archive is read with
+    allow_pickle=False. A chunk with a column that has no such encoding
+    (e.g. strings mixed with numbers) leaves the archive incomplete; the
+    caller then keeps no artifact and the CSV is parsed again when needed.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.complete = True
+        self._chunks = []
+        self._zip = zipfile.ZipFile(path, 'w', allowZip64=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._zip.close()
+        if exc_type is not None:
+            self.complete = False
+        return False
+
+    def write(self, df):
+        """Append one chunk."""
+        if not self.complete:
+            return
+        position = len(self._chunks)
+        columns = {'index': df.index.to_series()}
+        columns.update((str(i), df.iloc[:, i]) for i in range(df.shape[1]))
+        encoded = {}
+        for key, series in columns.items():
+            encoded[key] = _encode_column(series)
+            if encoded[key] is None:
+                label = 'the index' if key == 'index' else f"column {df.columns[int(key)]}"
+                logger.warning(f"Not keeping dataset artifact {self.path}: {label} ({series.dtype}) "
+                               f"has no plain array encoding")
+                self.complete = False
+                return
+        for key, (_, arrays) in encoded.items():
+            for suffix, array in arrays.items():
+                self._write_array(f'{position}.{key}{suffix}', array)
+        self._chunks.append({'columns': [str(name) for name in df.columns],
+                             'kinds': {key: kind for key, (kind, _) in encoded.items()}})
+
+    def finish(self, header):
+        """Write the header (with the chunk layout added) after the last chunk."""
+        if self.complete:
+            self._write_array('header', np.array(json.dumps(dict(header, chunks=self._chunks))))
+
+    def _write_array(self, name, array):
+        with self._zip.open(f'{name}.npy', 'w', force_zip64=True) as f:
+            np.lib.format.write_array(f, np.asanyarray(array), allow_pickle=False)
+
+    @staticmethod
+    def read(path, header):
+        """Chunk frames of an archive, or None if it was written with a different header."""
+        with np.load(path, allow_pickle=False) as archive:
+            stored = json.loads(archive['header'].item())
+            if any(stored.get(key) != value for key, value in header.items()):
+                return None
+            chunks = []
+            for position, chunk in enumerate(stored['chunks']):
+                def column(key):
+                    name = f'{position}.{key}'
+                    return _decode_column(chunk['kinds'][key], archive, name)
+                chunks.append(pd.DataFrame({name: column(str(i)) for i, name in enumerate(chunk['columns'])},
+                                           index=pd.Index(column('index'))))
+        return chunks
+
+def _plain_array(values):
+    """values as a numeric or fixed-width string array, or None if neither fits."""
+    kind = pd.api.types.infer_dtype(values, skipna=False)
+    if kind in ('string', 'empty'):
+        return np.asarray(values, dtype=str)
+    array = np.asarray(values)
+    return array if array.dtype.kind in 'biufcmM' else None
+
+def _encode_column(series):
+    """(kind, {member suffix: array}) for one column, or None if it needs pickle."""
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        categories = _plain_array(series.cat.categories)
+        if categories is None:
+            return None
+        kind = 'ordered' if series.cat.ordered else 'category'
+        return kind, {'': series.cat.codes.to_numpy(), '.categories': categories}
+    if series.dtype != object:
+        values = series.to_numpy()
+        return ('values', {'': values}) if values.dtype.kind in 'biufcmM' else None
+    codes, uniques = pd.factorize(series)
+    categories = _plain_array(uniques)
+    if categories is None:
+        return None
+    return 'object', {'': codes, '.categories': categories}
+
+def _decode_column(kind, archive, name):
+    data = archive[name]
+    if kind == 'values':
+        return data
+    categories = archive[f'{name}.categories']
+    if categories.dtype.kind == 'U':
+        categories = categories.astype(object)
+    if kind in ('category', 'ordered'):
+        return pd.Categorical.from_codes(data, categories=pd.Index(categories), ordered=kind == 'ordered')
+    values = np.full(len(data), np.nan, dtype=object)
+    present = data >= 0
+    values[present] = categories[data[present]]
+    return values
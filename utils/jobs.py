@@ -0,0 +1,86 @@
+import os
+import time
+import uuid
+import socket
+import logging
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+class JobProgress:
+    """Tracks the current stage of a job and how long each stage took."""
+
+    def __init__(self, stages, on_update=None):
+        self.stages = list(stages)
+        self.current = None
+        self.timings = {}
+        self.on_update = on_update
+
+    @property
+    def fraction(self):
+        """Share of stages finished, between 0 and 1."""
+        return len(self.timings) / len(self.stages) if self.stages else 1.0
+
+    @contextmanager
+    def stage(self, name):
+        self.current = name
+        self._notify()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[name] = round(time.perf_counter() - start, 4)
+            logger.info(f"Stage '{name}' finished in {self.timings[name]:.3f}s")
+        self._notify()
+
+    def _notify(self):
+        if self.on_update:
+            self.on_update(self)
+
+class JobRunner:
+    """Small worker pool that runs jobs in the background inside the Flask app context.
+
+    Jobs only live in the memory of the process that queued them. Each
+    runner has a runner_id (host:pid:token) to record on its jobs, so a
+    later process can tell which queued or running jobs nobody will finish.
+    """
+
+    def __init__(self, app, max_workers=2):
+        self.app = app
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='job-worker')
+        self.runner_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+    def is_orphaned(self, runner_id):
+        """Whether the runner a job was recorded with is gone.
+
+        Runners on other hosts cannot be checked and count as alive; a
+        missing runner_id (jobs from before it was recorded) counts as gone.
+        """
+        if not runner_id:
+            return True
+        host, pid, token = runner_id.rsplit(':', 2)
+        host_here, _, token_here = self.runner_id.rsplit(':', 2)
+        if host != host_here or os.name != 'posix':
+            return False
+        if int(pid) == os.getpid():
+            # Same pid, other token: an earlier process (e.g. pid 1 of a restarted container)
+            return token != token_here
+        try:
+            os.kill(int(pid), 0)
+        except ProcessLookupError:
+            return True
+        except PermissionError:
+            pass
+        return False
+
+    def submit(self, fn, *args, **kwargs):
+        return self.executor.submit(self._run, fn, *args, **kwargs)
+
+    def _run(self, fn, *args, **kwargs):
+        with self.app.app_context():
+            try:
+                return fn(*args, **kwargs)
+            except Exception as e:
+                logger.error(f"Background job {getattr(fn, '__name__', fn)} failed: {str(e)}")
+                raise
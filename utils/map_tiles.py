@@ -0,0 +1,336 @@
+import logging
+import threading
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+MAX_MERCATOR_LATITUDE = 85.05112878
+
+def _spread_bits(values):
+    """Insert a zero bit between each of the low 32 bits of values (uint64)."""
+    values = np.asarray(values, dtype=np.uint64) & np.uint64(0xFFFFFFFF)
+    for shift, mask in ((16, 0x0000FFFF0000FFFF), (8, 0x00FF00FF00FF00FF), (4, 0x0F0F0F0F0F0F0F0F),
+                        (2, 0x3333333333333333), (1, 0x5555555555555555)):
+        values = (values | (values << np.uint64(shift))) & np.uint64(mask)
+    return values
+
+def quadkeys(x, y):
+    """Interleaved (Morton) keys of integer tile coordinates: x bits even, y bits odd."""
+    return _spread_bits(x) | (_spread_bits(y) << np.uint64(1))
+
+def mercator(lat, lon):
+    """Web-mercator (x, y) in [0, 1) of float64 coordinates; y grows southwards."""
+    lat = np.radians(np.clip(lat, -MAX_MERCATOR_LATITUDE, MAX_MERCATOR_LATITUDE))
+    x = (np.asarray(lon, dtype=np.float64) + 180.0) / 360.0
+    y = (1.0 - np.log(np.tan(lat) + 1.0 / np.cos(lat)) / np.pi) / 2.0
+    return x, y
+
+class PointLayer:
+    """Points sorted by quadkey at LEVEL, so every tile (and every cell of a
+    tile) is one contiguous slice found by binary search."""
+
+    def __init__(self, lat, lon, flags, level):
+        lat = np.asarray(lat, dtype=np.float64)
+        lon = np.asarray(lon, dtype=np.float64)
+        located = np.flatnonzero(~(np.isnan(lat) | np.isnan(lon)))
+        x, y = mercator(lat[located], lon[located])
+        scale = float(1 << level)
+        keys = quadkeys(np.clip(x * scale, 0, scale - 1).astype(np.uint64),
+                        np.clip(y * scale, 0, scale - 1).astype(np.uint64))
+        order = np.argsort(keys, kind='stable')
+        self.level = level
+        self.keys = keys[order]
+        self.positions = located[order]  # row positions in the source frame
+        self.lat = lat[self.positions]
+        self.lon = lon[self.positions]
+        self.flags = np.asarray(flags, dtype=bool)[self.positions]
+
+    @classmethod
+    def from_arrays(cls, arrays, prefix, level):
+        """Layer restored from to_arrays() output."""
+        layer = cls.__new__(cls)
+        layer.level = level
+        for name in ('keys', 'positions', 'lat', 'lon', 'flags'):
+            setattr(layer, name, arrays[f'{prefix}.{name}'])
+        return layer
+
+    def to_arrays(self, prefix):
+        return {f'{prefix}.{name}': getattr(self, name) for name in ('keys', 'positions', 'lat', 'lon', 'flags')}
+
+    def __len__(self):
+        return len(self.keys)
+
+    def tile_range(self, z, x, y):
+        """[start, stop) of the points inside tile z/x/y."""
+        shift = np.uint64(2 * (self.level - z))
+        key = quadkeys(np.array([x]), np.array([y]))[0]
+        start, stop = np.searchsorted(self.keys, [key << shift, (key + np.uint64(1)) << shift])
+        return int(start), int(stop)
+
+    def clusters(self, z, x, y, cell_bits):
+        """Points of tile z/x/y grouped into 2**cell_bits x 2**cell_bits cells:
+        (first point of each cell, count, flagged count, mean lat, mean lon)."""
+        start, stop = self.tile_range(z, x, y)
+        if start == stop:
+            empty = np.empty(0)
+            return np.empty(0, dtype=np.int64), empty, empty, empty, empty
+        cell_level = min(z + cell_bits, self.level)
+        cells = self.keys[start:stop] >> np.uint64(2 * (self.level - cell_level))
+        starts = np.concatenate([[0], np.flatnonzero(cells[1:] != cells[:-1]) + 1])
+        counts = np.diff(np.append(starts, stop - start))
+        flagged = np.add.reduceat(self.flags[start:stop].astype(np.int64), starts)
+        lat = np.add.reduceat(self.lat[start:stop], starts) / counts
+        lon = np.add.reduceat(self.lon[start:stop], starts) / counts
+        return start + starts, counts, flagged, lat, lon
+
+    def bounds(self, z, x, y):
+        start, stop = self.tile_range(z, x, y)
+        if start == stop:
+            return None
+        lat, lon = self.lat[start:stop], self.lon[start:stop]
+        return [[round(float(lat.min()), 6), round(float(lon.min()), 6)],
+                [round(float(lat.max()), 6), round(float(lon.max()), 6)]]
+
+class MapTileEngine:
+    """Map data of one optimization result, aggregated into web-map tiles.
+
+    Assignments are joined to the member frame once, through a MemberID
+    index, and member and provider points are sorted by quadkey. A tile
+    request then costs two binary searches per layer plus one reduceat over
+    the tile's points: members come back as at most 8 x 8 clusters with
+    served counts, providers with used counts. Single-point clusters
+    carry the fields the map popups show.
+
+    The joined and sorted arrays can be saved at optimization time
+    (to_arrays) and restored later without touching the assignments.
+    """
+
+    LEVEL = 24  # quadkey depth (~2 m cells); deeper zooms see single points
+    CELL_BITS = 3  # 8 x 8 clusters per 256 px tile
+    MAX_ZOOM = LEVEL - CELL_BITS
+    COORDINATE_SCALE = 1e6  # compact() coordinates are integer microdegrees
+
+    def __init__(self, members_df, providers_df, assignment_columns):
+        self.members_df = members_df
+        self.providers_df = providers_df
+
+        # Per member row: its assignment's provider (None if unserved), distance and rating
+        n_members = len(members_df)
+        member_pos = pd.Index(members_df['MemberID']).get_indexer(pd.Index(assignment_columns['member_id']))
+        matched = member_pos >= 0
+        if not matched.all():
+            logger.warning(f"{int((~matched).sum())} assignments do not match a member")
+        self.member_provider = np.full(n_members, None, dtype=object)
+        self.member_distance = np.full(n_members, np.nan)
+        self.member_rating = np.full(n_members, np.nan)
+        self.member_provider[member_pos[matched]] = np.array(assignment_columns['provider_id'], dtype=object)[matched]
+        for target, field in ((self.member_distance, 'distance'), (self.member_rating, 'rating')):
+            values = pd.to_numeric(pd.Series(assignment_columns[field], dtype=object), errors='coerce')
+            target[member_pos[matched]] = values.to_numpy(dtype=np.float64)[matched]
+        self.member_served = np.not_equal(self.member_provider, None)
+
+        self.provider_used = providers_df['ProviderID'].isin(pd.unique(self.member_provider[self.member_served])).to_numpy()
+
+        self.members = PointLayer(members_df['Latitude'].to_numpy(dtype=np.float64),
+                                  members_df['Longitude'].to_numpy(dtype=np.float64),
+                                  self.member_served, self.LEVEL)
+        self.providers = PointLayer(pd.to_numeric(providers_df['Latitude'], errors='coerce').to_numpy(dtype=np.float64),
+                                    pd.to_numeric(providers_df['Longitude'], errors='coerce').to_numpy(dtype=np.float64),
+                                    self.provider_used, self.LEVEL)
+
+    @classmethod
+    def from_arrays(cls, arrays, members_df, providers_df):
+        """Engine restored from to_arrays() output; raises ValueError if the
+        arrays were saved for other datasets."""
+        codes = arrays['member_provider']
+        if len(codes) != len(members_df) or len(arrays['provider_used']) != len(providers_df):
+            raise ValueError('Map arrays do not match the member or provider dataset')
+
+        engine = cls.__new__(cls)
+        engine.members_df = members_df
+        engine.providers_df = providers_df
+        engine.member_served = codes >= 0
+        engine.member_provider = np.full(len(codes), None, dtype=object)
+        engine.member_provider[engine.member_served] = (
+            arrays['member_provider.categories'].astype(object)[codes[engine.member_served]])
+        engine.member_distance = arrays['member_distance']
+        engine.member_rating = arrays['member_rating']
+        engine.provider_used = arrays['provider_used']
+        engine.members = PointLayer.from_arrays(arrays, 'members', cls.LEVEL)
+        engine.providers = PointLayer.from_arrays(arrays, 'providers', cls.LEVEL)
+        return engine
+
+    def to_arrays(self):
+        """Typed arrays of the joined and sorted map state (provider IDs as codes)."""
+        codes, categories = pd.factorize(self.member_provider)
+        return {
+            'member_provider': codes.astype(np.int32),
+            'member_provider.categories': np.asarray(categories).astype(str),
+            'member_distance': self.member_distance,
+            'member_rating': self.member_rating,
+            'provider_used': self.provider_used,
+            **self.members.to_arrays('members'),
+            **self.providers.to_arrays('providers'),
+        }
+
+    def tile(self, z, x, y):
+        """JSON-ready clusters of tile z/x/y; raises ValueError for an invalid tile."""
+        if not 0 <= z <= self.MAX_ZOOM or not (0 <= x < (1 << z) and 0 <= y < (1 << z)):
+            raise ValueError(f"Invalid tile {z}/{x}/{y}")
+
+        members = []
+        first, counts, served, lat, lon = self.members.clusters(z, x, y, self.CELL_BITS)
+        for point, count, served_count, cluster_lat, cluster_lon in zip(
+                first.tolist(), counts.tolist(), served.tolist(), lat.tolist(), lon.tolist()):
+            cluster = {'lat': round(cluster_lat, 6), 'lng': round(cluster_lon, 6), 'count': count,
+                       'served': served_count, 'served_ratio': round(served_count / count, 4)}
+            if count == 1:
+                cluster.update(self._member_details(self.members.positions[point]))
+            members.append(cluster)
+
+        providers = []
+        first, counts, used, lat, lon = self.providers.clusters(z, x, y, self.CELL_BITS)
+        for point, count, used_count, cluster_lat, cluster_lon in zip(
+                first.tolist(), counts.tolist(), used.tolist(), lat.tolist(), lon.tolist()):
+            cluster = {'lat': round(cluster_lat, 6), 'lng': round(cluster_lon, 6), 'count': count, 'used': used_count}
+            if count == 1:
+                cluster.update(self._provider_details(self.providers.positions[point]))
+            providers.append(cluster)
+
+        return {
+            'z': z, 'x': x, 'y': y,
+            'members': members,
+            'providers': providers,
+            'totals': self.totals(z, x, y),
+            'bounds': self._merge_bounds(self.members.bounds(z, x, y), self.providers.bounds(z, x, y))
+        }
+
+    def compact(self):
+        """Every located member and provider as parallel arrays.
+
+        Points are in quadkey order, so neighbours follow each other and the
+        integer coordinates are sent as deltas from the previous point (the
+        first one absolute); a running sum decodes them. Members reference
+        their provider by position in the provider arrays (-1 if unserved),
+        and repeated strings are sent as codes into a category list.
+        """
+        members, providers = self.members, self.providers
+        members_df = self.members_df.iloc[members.positions]
+        providers_df = self.providers_df.iloc[providers.positions]
+        provider_ids = providers_df['ProviderID'].astype(str)
+
+        member_provider = self.member_provider[members.positions]
+        served = members.flags
+        provider_ref = np.full(len(members), -1, dtype=np.int64)
+        provider_ref[served] = pd.Index(provider_ids).get_indexer(member_provider[served].astype(str))
+        locations = providers_df['Location'].astype(str) if 'Location' in providers_df.columns else pd.Series('', index=providers_df.index)
+
+        return {
+            'scale': self.COORDINATE_SCALE,
+            'members': {
+                'id': members_df['MemberID'].astype(str).tolist(),
+                'lat': self._delta(members.lat),
+                'lng': self._delta(members.lon),
+                **self._categories('source_type', members_df['SourceType'].astype(str)),
+                'cost': members_df['cost'].astype(np.float64).tolist(),
+                'served': served.astype(np.int8).tolist(),
+                'provider': provider_ref.tolist(),
+                'distance': self._nullable(self.member_distance[members.positions]),
+                'provider_rating': self._nullable(self.member_rating[members.positions]),
+            },
+            'providers': {
+                'id': provider_ids.tolist(),
+                'lat': self._delta(providers.lat),
+                'lng': self._delta(providers.lon),
+                'name': [location.split(',', 1)[0] for location in locations.tolist()],
+                **self._categories('type', providers_df['Type'].astype(str) if 'Type' in providers_df.columns
+                                   else pd.Series('', index=providers_df.index)),
+                'rating': self._nullable(pd.to_numeric(providers_df['CMS Rating'], errors='coerce').to_numpy(dtype=np.float64)),
+                'cost': self._nullable(pd.to_numeric(providers_df['Cost'], errors='coerce').to_numpy(dtype=np.float64)),
+                'used': providers.flags.astype(np.int8).tolist(),
+            },
+        }
+
+    def _delta(self, degrees):
+        scaled = np.round(degrees * self.COORDINATE_SCALE).astype(np.int64)
+        return np.diff(scaled, prepend=0).tolist()
+
+    @staticmethod
+    def _categories(name, values):
+        codes, categories = pd.factorize(values)
+        return {name: codes.tolist(), f'{name}_categories': categories.tolist()}
+
+    @staticmethod
+    def _nullable(values, decimals=4):
+        values = np.round(values, decimals)
+        return np.where(np.isnan(values), None, values).tolist()
+
+    def totals(self, z, x, y):
+        """Member and provider counts inside tile z/x/y."""
+        m_start, m_stop = self.members.tile_range(z, x, y)
+        p_start, p_stop = self.providers.tile_range(z, x, y)
+        served = int(self.members.flags[m_start:m_stop].sum())
+        used = int(self.providers.flags[p_start:p_stop].sum())
+        return {
+            'served_members': served,
+            'unserved_members': int(m_stop - m_start) - served,
+            'used_providers': used,
+            'unused_providers': int(p_stop - p_start) - used
+        }
+
+    def _member_details(self, position):
+        row = self.members_df.iloc[position]
+        details = {'id': str(row['MemberID']), 'source_type': str(row['SourceType']), 'cost': float(row['cost'])}
+        if self.member_served[position]:
+            details.update({
+                'provider_id': str(self.member_provider[position]),
+                'distance': float(self.member_distance[position]),
+                'provider_rating': float(self.member_rating[position])
+            })
+        return details
+
+    def _provider_details(self, position):
+        row = self.providers_df.iloc[position]
+        location = str(row['Location']) if 'Location' in row.index else ''
+        return {
+            'id': str(row['ProviderID']),
+            'name': location.split(',')[0],
+            'type': str(row['Type']) if 'Type' in row.index else '',
+            'rating': float(row['CMS Rating']),
+            'cost': float(row['Cost'])
+        }
+
+    @staticmethod
+    def _merge_bounds(*bounds):
+        bounds = [b for b in bounds if b is not None]
+        if not bounds:
+            return None
+        return [[min(b[0][0] for b in bounds), min(b[0][1] for b in bounds)],
+                [max(b[1][0] for b in bounds), max(b[1][1] for b in bounds)]]
+
+class MapTileCache:
+    """MapTileEngines of the most recently viewed results."""
+
+    def __init__(self, max_entries=4):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def put(self, key, engine):
+        with self._lock:
+            self._entries[key] = engine
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get(self, key, build):
+        """Engine for key (e.g. result id and version), calling build() on a miss."""
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key]
+        engine = build()
+        self.put(key, engine)
+        return engine
@@ -0,0 +1,168 @@
+import logging
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Assignment dict fields the metrics read
+METRIC_COLUMNS = ['member_source_type', 'provider_id', 'distance', 'cost', 'rating']
+
+def assignment_table(assignments):
+    """Columnar form of a list of assignment dicts."""
+    return assignment_table_from_arrays(
+        [a['member_source_type'] for a in assignments],
+        np.array([a['provider_id'] for a in assignments], dtype=object),
+        np.array([a['distance'] for a in assignments], dtype=np.float64),
+        np.array([a['cost'] for a in assignments], dtype=np.float64),
+        np.array([a['rating'] for a in assignments], dtype=np.float64),
+    )
+
+def assignment_table_from_arrays(member_source_type, provider_id, distance, cost, rating):
+    """Columnar assignment table from per-member arrays: one column per metric
+    field plus a 'served' flag (unserved members have a None provider_id and
+    NaN distance, cost and rating)."""
+    table = pd.DataFrame({
+        'member_source_type': member_source_type,
+        'provider_id': provider_id,
+        'distance': distance,
+        'cost': cost,
+        'rating': rating,
+    }, columns=METRIC_COLUMNS)
+    table['served'] = table['provider_id'].notna()
+    return table
+
+class AssignmentMetrics:
+    """Access, cost, utilization, quality and per-source-type metrics of one run.
+
+    The assignments are turned into a columnar table once, and every metric
+    is derived from a single groupby over member source type (overall
+    figures are sums of the group rows) plus one distinct count of the used
+    providers. Missing costs and ratings are left out of sums and averages.
+    """
+
+    def __init__(self, assignments, members_df, providers_df=None, cost_reduction_bounds=(8, 12)):
+        self.members_df = members_df
+        self.providers_df = providers_df
+        self.cost_reduction_bounds = cost_reduction_bounds
+
+        table = assignments if isinstance(assignments, pd.DataFrame) else assignment_table(assignments)
+        self.groups = table.groupby('member_source_type', sort=False, dropna=False, observed=True).agg(
+            total_members=('served', 'size'),
+            served_members=('served', 'sum'),
+            distance_sum=('distance', 'sum'),
+            distance_count=('distance', 'count'),
+            distance_min=('distance', 'min'),
+            distance_max=('distance', 'max'),
+            cost_sum=('cost', 'sum'),
+            cost_count=('cost', 'count'),
+            rating_sum=('rating', 'sum'),
+            rating_count=('rating', 'count'),
+        )
+        self.used_providers = int(table['provider_id'].nunique())
+
+    @staticmethod
+    def _mean(total, count):
+        return float(total / count) if count > 0 else None
+
+    @staticmethod
+    def network_status(access_percentage, unserved_members):
+        """(status, recommendation) for a run's member access."""
+        if access_percentage == 100:
+            return "No need to change organization", "Current network provides complete coverage"
+        if access_percentage >= 95:
+            return ("Good in provider and member access",
+                    "Network is performing well with minor optimization opportunities")
+        return ("Organization must increase providers",
+                f"Network needs expansion - {unserved_members} members lack access")
+
+    def totals(self):
+        """Whole-run sums of the group rows."""
+        groups = self.groups
+        served_members = int(groups['served_members'].sum())
+        total_members = len(self.members_df)
+        original_cost = float(self.members_df['cost'].sum()) if 'cost' in self.members_df.columns else 0.0
+        optimized_cost = float(groups['cost_sum'].sum())
+        total_providers = len(self.providers_df) if self.providers_df is not None else 0
+        return {
+            'total_members': total_members,
+            'served_members': served_members,
+            'unserved_members': total_members - served_members,
+            'access_percentage': (served_members / total_members) * 100 if total_members > 0 else 0,
+            'original_cost': original_cost,
+            'optimized_cost': optimized_cost,
+            'profit_loss_percentage': ((original_cost - optimized_cost) / original_cost) * 100 if original_cost > 0 else 0,
+            'total_providers': total_providers,
+            'used_providers': self.used_providers,
+            'unused_providers': total_providers - self.used_providers,
+            'average_distance': self._mean(groups['distance_sum'].sum(), groups['distance_count'].sum()),
+            'average_rating': self._mean(groups['rating_sum'].sum(), groups['rating_count'].sum()),
+            'max_distance': float(groups['distance_max'].max()) if served_members else None,
+            'min_distance': float(groups['distance_min'].min()) if served_members else None,
+        }
+
+    def summary(self):
+        """OptimizationResult summary columns."""
+        totals = self.totals()
+        summary = {key: totals[key] for key in (
+            'access_percentage', 'original_cost', 'optimized_cost', 'profit_loss_percentage',
+            'total_members', 'served_members', 'unserved_members',
+            'total_providers', 'used_providers', 'unused_providers')}
+        summary['network_status'] = self.network_status(totals['access_percentage'], totals['unserved_members'])[0]
+        return summary
+
+    def by_source_type(self):
+        """Access and average distance/cost/rating per member source type."""
+        analysis = {}
+        for source_type, row in zip(self.groups.index.tolist(), self.groups.itertuples(index=False)):
+            total_members, served_members = int(row.total_members), int(row.served_members)
+            analysis[source_type] = {
+                'total_members': total_members,
+                'served_members': served_members,
+                'unserved_members': total_members - served_members,
+                'access_percentage': (served_members / total_members) * 100 if total_members > 0 else 0,
+                'average_distance': self._mean(row.distance_sum, row.distance_count),
+                'average_cost': self._mean(row.cost_sum, row.cost_count),
+                'average_rating': self._mean(row.rating_sum, row.rating_count)
+            }
+        return analysis
+
+    def optimization_metrics(self):
+        """Access, cost (against the target band), utilization, quality and network assessment."""
+        totals = self.totals()
+        min_bound, max_bound = self.cost_reduction_bounds
+        cost_savings = totals['original_cost'] - totals['optimized_cost']
+        status, recommendation = self.network_status(totals['access_percentage'], totals['unserved_members'])
+        total_providers = totals['total_providers']
+
+        return {
+            'access': {
+                'total_members': totals['total_members'],
+                'served_members': totals['served_members'],
+                'unserved_members': totals['unserved_members'],
+                'access_percentage': totals['access_percentage']
+            },
+            'cost': {
+                'original_total_cost': totals['original_cost'],
+                'optimized_total_cost': totals['optimized_cost'],
+                'cost_savings': cost_savings,
+                'cost_savings_percentage': totals['profit_loss_percentage'],
+                'within_target_range': min_bound <= totals['profit_loss_percentage'] <= max_bound,
+                'target_range': f"{min_bound}–{max_bound}%"
+            },
+            'provider_utilization': {
+                'total_providers': total_providers,
+                'used_providers': self.used_providers,
+                'unused_providers': totals['unused_providers'],
+                'utilization_percentage': (self.used_providers / total_providers) * 100 if total_providers > 0 else 0
+            },
+            'quality_metrics': {
+                'average_distance_km': totals['average_distance'] or 0,
+                'average_provider_rating': totals['average_rating'] or 0,
+                'max_distance_km': totals['max_distance'] or 0,
+                'min_distance_km': totals['min_distance'] or 0
+            },
+            'network_assessment': {
+                'status': status,
+                'recommendation': recommendation
+            }
+        }
@@ -1,14 +1,58 @@
 import pandas as pd
 import numpy as np
+import os
 import logging
-from collections import defaultdict
+import heapq
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from scipy.optimize import linprog
+from scipy.sparse import csr_matrix, vstack
 from sklearn.neighbors import BallTree
+from utils.candidate_graph import CandidateGraph
+from utils.spatial_index import ProviderSpatialIndex
+from utils.prepared_dataset import PreparedDataset
+from utils.provider_categories import CATEGORY_COLUMN
+from utils.metrics import AssignmentMetrics, assignment_table_from_arrays
 
 logger = logging.getLogger(__name__)
 
+def _shard_pool_context():
+    """Start method for shard worker processes.
+
+    Sharded runs start on JobRunner threads, and forking a multithreaded
+    process can copy a lock another thread holds. Workers are forked from
+    a single-threaded forkserver instead; it preloads only this module (not
+    the app entry point), so workers do not re-import numpy, pandas and
+    scikit-learn as spawned ones would. Platforms without a forkserver
+    (Windows) spawn the workers.
+    """
+    if 'forkserver' not in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context('spawn')
+    context = multiprocessing.get_context('forkserver')
+    context.set_forkserver_preload([__name__])
+    return context
+
+def _optimize_tile(task):
+    """ProcessPoolExecutor entry point: candidate search for one tile.
+
+    Returns the tile's edges in global member and provider positions.
+    """
+    member_pos, provider_pos, members_tile, providers_tile, max_distance = task
+    optimizer = NetworkOptimizer()
+    members = optimizer.prepare(members_tile, 'members')
+    providers = optimizer.prepare(providers_tile, 'providers')
+    member_idx, provider_idx, distances_km = optimizer.find_candidate_edges(members, providers, max_distance)
+    return member_pos[member_idx], provider_pos[provider_idx], distances_km
+
 class NetworkOptimizer:
     """Handles provider network optimization and assignment logic (BallTree-backed)."""
     
+    # Provider columns whose change can alter candidate edges or assignment rows
+    PROVIDER_DIFF_COLUMNS = ('Latitude', 'Longitude', 'Source', 'Type', 'Cost', 'CMS Rating', 'Availability',
+                             CATEGORY_COLUMN)
+    # Member columns whose change can alter that member's candidate edges
+    MEMBER_DIFF_COLUMNS = ('Latitude', 'Longitude', 'SourceType')
+    
     def __init__(self):
         # kept the same key terms / values as requested
         self.optimization_weights = {
@@ -22,6 +66,37 @@ class NetworkOptimizer:
         # cost reduction bounds (constraint)
         self.cost_reduction_bounds = (8.0, 12.0)  # percentage
 
+        # 'greedy' swaps members by rating-loss per dollar until the band is hit,
+        # 'legacy' runs the original wholesale adjustment passes
+        self.adjustment_solver = 'greedy'
+        self.last_adjustment = {}
+        # the last _build_assignments output and its columnar table, for assignment_metrics
+        self.last_assignments = None
+        self.last_assignment_table = None
+        # per provider row of that run: whether any member was assigned to it
+        self.last_used_providers = None
+
+        # capacitated mode: provider Availability caps how many members it can take
+        self.capacity_aware = False
+        self.capacity_candidates_per_member = 25  # best-scored edges kept per member for the flow LP
+        self.access_weight = 1000.0  # serving a member always outweighs any score difference
+
+        # sharded mode: spatial tiles (with a max_distance halo) searched in a process pool
+        self.sharded = False
+        self.shard_tile_degrees = 2.0
+        self.shard_workers = None  # defaults to os.cpu_count()
+
+        # members per BallTree query; bounds the per-edge temporaries of the candidate search
+        self.candidate_block_members = 65536
+        self.last_incremental = {}
+        self.affected_tile_degrees = 0.25  # prefilter tiles for incremental runs
+
+    def prepare(self, data, kind):
+        """PreparedDataset for data, wrapping (and coercing) a plain frame once."""
+        if isinstance(data, PreparedDataset):
+            return data
+        return PreparedDataset.coerce(data, kind)
+
     def calculate_provider_score(self, rating, cost, distance):
         """Calculate optimization score for a provider. Higher score is better."""
         try:
@@ -72,217 +147,802 @@ class NetworkOptimizer:
             logger.error(f"Error finding best provider: {str(e)}")
             return None
 
-    def find_candidate_connections(self, members_df, providers_df, geospatial=None, max_distance=15.0):
-        """Use BallTree to find providers within radius."""
-        candidate_connections = []
-
+    def _haversine_km(self, lat1, lon1, lat2, lon2):
+        """Element-wise great-circle distance in km between coordinate arrays (degrees)."""
+        lat1, lon1, lat2, lon2 = (np.radians(np.asarray(v, dtype=np.float64)) for v in (lat1, lon1, lat2, lon2))
+        dlat = lat2 - lat1
+        dlon = lon2 - lon1
+        a = np.sin(dlat / 2.0) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin(dlon / 2.0) ** 2
+        return 2 * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0))) * self._earth_radius_km
+
+    def _type_match_mask(self, members, providers, member_idx, provider_idx):
+        """Vectorized member/provider type matching for candidate edges.
+
+        Supply Directory members need a 'Supplier Directory' provider; Hospital,
+        Nursing Home and Scan Center members accept any provider with a Type.
+        Both sides are category bitmasks (see utils.provider_categories).
+        """
+        members = self.prepare(members, 'members')
+        providers = self.prepare(providers, 'providers')
+        return (members.accepts[member_idx] & providers.categories[provider_idx]) != 0
+
+    def select_best_providers(self, graph):
+        """Bulk version of find_best_provider over a CandidateGraph.
+
+        One lexsort by (member, -rating, cost, distance) and a first-per-member
+        pick; returns the chosen edge index per member, or -1 if unserved.
+        """
+        return graph.segment_lexmin((-graph.rating, graph.cost, graph.distance))
+
+    def edge_scores(self, graph):
+        """Vectorized calculate_provider_score for every candidate edge."""
+        rating_score = graph.rating / 5.0
+        cost_score = np.maximum(0, (1000 - graph.cost) / 1000)
+        distance_score = np.maximum(0, (15.0 - graph.distance) / 15.0)
+        scores = (rating_score * self.optimization_weights['rating'] +
+                  cost_score * self.optimization_weights['cost'] +
+                  distance_score * self.optimization_weights['distance'])
+        return np.nan_to_num(scores, nan=0.0)
+
+    def provider_capacities(self, providers, unlimited):
+        """Member capacity per provider from Availability; missing values mean unlimited."""
+        providers = self.prepare(providers, 'providers')
+        if providers.availability is None:
+            return np.full(len(providers), unlimited, dtype=np.int64)
+        availability = providers.availability
+        availability = np.where(np.isnan(availability), unlimited, np.clip(np.floor(availability), 0, unlimited))
+        return availability.astype(np.int64)
+
+    def solve_capacitated(self, graph, capacity, active=None):
+        """Capacitated member -> provider assignment as a min-cost flow LP.
+
+        Each member ships at most one unit, each provider receives at most its
+        capacity, and every served edge earns access_weight + its weighted score.
+        The constraint matrix is totally unimodular, so the dual simplex vertex
+        is integral. Edges are pruned to the best capacity_candidates_per_member
+        per member to keep the LP sparse. With an ``active`` member mask only
+        those members are assigned; the rest stay -1.
+        """
+        choice = np.full(graph.n_members, -1, dtype=np.int64)
+        if graph.n_edges == 0:
+            return choice
+
+        scores = self.edge_scores(graph)
+        keep = np.ones(graph.n_edges, dtype=bool)
+        k = self.capacity_candidates_per_member
+        if k and graph.degree.max() > k:
+            order = np.lexsort((-scores, graph.edge_member))
+            rank = np.arange(graph.n_edges) - graph.offsets[graph.edge_member[order]]
+            keep[order[rank >= k]] = False
+        keep &= capacity[graph.provider_idx] > 0
+        if active is not None:
+            keep &= active[graph.edge_member]
+        edges = np.flatnonzero(keep)
+        if len(edges) == 0:
+            return choice
+
+        # Only providers that appear in the pruned graph need a capacity row
+        providers, provider_rows = np.unique(graph.provider_idx[edges], return_inverse=True)
+        members, member_rows = np.unique(graph.edge_member[edges], return_inverse=True)
+        columns = np.arange(len(edges))
+        ones = np.ones(len(edges))
+        a_ub = vstack([
+            csr_matrix((ones, (member_rows, columns)), shape=(len(members), len(edges))),
+            csr_matrix((ones, (provider_rows, columns)), shape=(len(providers), len(edges)))
+        ]).tocsr()
+        b_ub = np.concatenate([np.ones(len(members)), capacity[providers].astype(np.float64)])
+
+        result = linprog(-(self.access_weight + scores[edges]), A_ub=a_ub, b_ub=b_ub,
+                         bounds=(0, 1), method='highs-ds')
+        if result.status != 0:
+            logger.warning(f"Capacitated assignment LP failed ({result.message}); falling back to uncapacitated selection")
+            return self.select_best_providers(graph)
+
+        chosen = edges[result.x > 0.5]
+        choice[graph.edge_member[chosen]] = chosen
+        logger.info(f"Capacitated assignment served {len(chosen)} members over {len(edges)} edges "
+                    f"and {len(providers)} providers")
+        return choice
+
+    def build_provider_index(self, providers_df):
+        """ProviderSpatialIndex over providers with valid coordinates (None if there are none)."""
+        return ProviderSpatialIndex.build(providers_df)
+
+    def find_candidate_edges(self, members, providers, max_distance=15.0, provider_index=None, member_positions=None):
+        """Columnar candidate search: BallTree queries over blocks of members.
+
+        members / providers are PreparedDatasets (plain frames are prepared
+        once here). Returns (member_idx, provider_idx, distance_km) as flat
+        NumPy arrays. Indices are positional (iloc) into the member / provider
+        frames, and edges are grouped by member in frame order. provider_index
+        is an optional prebuilt (or persisted) ProviderSpatialIndex for the
+        provider frame; member_positions (ascending) restricts the search to
+        those members.
+        """
+        empty = (np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64))
+
+        members = self.prepare(members, 'members')
+        providers = self.prepare(providers, 'providers')
+        if provider_index is None:
+            provider_index = self.build_provider_index(providers.frame)
+        if member_positions is None:
+            n_search, block_positions = members.n_located, members.positions
+        else:
+            member_positions = self._located(members, member_positions)
+            n_search = len(member_positions)
+            block_positions = lambda start, stop: member_positions[start:stop]
+        if provider_index is None or n_search == 0:
+            return empty
+
+        tree, provider_pos = provider_index.tree, provider_index.provider_pos
+        radius_radians = max_distance / self._earth_radius_km
+        parts = []
+        for start in range(0, n_search, self.candidate_block_members):
+            member_pos = block_positions(start, start + self.candidate_block_members)
+            member_coords_rad = np.empty((len(member_pos), 2))
+            member_coords_rad[:, 0], member_coords_rad[:, 1] = members.coordinates(member_pos)
+            np.radians(member_coords_rad, out=member_coords_rad)
+            neighbours = tree.query_radius(member_coords_rad, r=radius_radians, return_distance=False)
+
+            counts = np.fromiter((len(n) for n in neighbours), dtype=np.int64, count=len(neighbours))
+            if counts.sum() == 0:
+                continue
+
+            member_idx = np.repeat(member_pos, counts)
+            provider_idx = provider_pos[np.concatenate(neighbours).astype(np.int64, copy=False)]
+            del neighbours
+
+            # Type filter first, so distances are only computed for kept edges
+            mask = self._type_match_mask(members, providers, member_idx, provider_idx)
+            member_idx, provider_idx = member_idx[mask], provider_idx[mask]
+            distances_km = self._haversine_km(members.latitude[member_idx], members.longitude[member_idx],
+                                              providers.latitude[provider_idx], providers.longitude[provider_idx])
+            parts.append((member_idx, provider_idx, distances_km))
+
+        if not parts:
+            return empty
+        if len(parts) == 1:
+            return parts[0]
+        return tuple(np.concatenate(columns) for columns in zip(*parts))
+
+    def _located(self, dataset, positions):
+        """The given positions of dataset that have coordinates."""
+        positions = np.asarray(positions, dtype=np.int64)
+        lat, lon = dataset.coordinates(positions)
+        return positions[~(np.isnan(lat) | np.isnan(lon))]
+
+    def find_candidate_connections(self, members, providers, geospatial=None, max_distance=15.0):
+        """Use BallTree to find providers within radius, as one dict per candidate pair."""
         try:
+            members = self.prepare(members, 'members')
+            providers = self.prepare(providers, 'providers')
+            members_df, providers_df = members.frame, providers.frame
             logger.info(f"Processing {len(members_df)} members against {len(providers_df)} providers")
 
-            if 'Latitude' not in members_df.columns or 'Longitude' not in members_df.columns:
-                raise ValueError("members_df must contain 'Latitude' and 'Longitude'")
-            if 'Latitude' not in providers_df.columns or 'Longitude' not in providers_df.columns:
-                raise ValueError("providers_df must contain 'Latitude' and 'Longitude'")
-
-            providers_df = providers_df.copy()
-            providers_df['Latitude'] = pd.to_numeric(providers_df['Latitude'], errors='coerce')
-            providers_df['Longitude'] = pd.to_numeric(providers_df['Longitude'], errors='coerce')
+            member_idx, provider_idx, distances_km = self.find_candidate_edges(members, providers, max_distance)
+            if len(member_idx) == 0:
+                return []
 
-            valid_providers_mask = providers_df['Latitude'].notna() & providers_df['Longitude'].notna()
-            providers_valid = providers_df[valid_providers_mask].reset_index(drop=True)
+            def provider_column(name, default):
+                if name in providers_df.columns:
+                    return providers_df[name].to_numpy()[provider_idx].tolist()
+                return [default] * len(provider_idx)
 
-            if providers_valid.empty:
-                return []
+            member_ids = members_df['MemberID'].to_numpy()[member_idx].tolist() if 'MemberID' in members_df.columns else [None] * len(member_idx)
+            member_source_types = (members_df['SourceType'].to_numpy()[member_idx].tolist()
+                                   if 'SourceType' in members_df.columns else [''] * len(member_idx))
 
-            provider_coords_rad = np.radians(providers_valid[['Latitude', 'Longitude']].values)
-            tree = BallTree(provider_coords_rad, metric='haversine')
-
-            radius_radians = max_distance / self._earth_radius_km
-
-            batch_size = 100
-            members_df = members_df.copy()
-            members_df['Latitude'] = pd.to_numeric(members_df['Latitude'], errors='coerce')
-            members_df['Longitude'] = pd.to_numeric(members_df['Longitude'], errors='coerce')
-
-            for i in range(0, len(members_df), batch_size):
-                batch_end = min(i + batch_size, len(members_df))
-                members_batch = members_df.iloc[i:batch_end]
-
-                member_coords_list = []
-                member_indices = []
-                for idx, member in members_batch.iterrows():
-                    if pd.isna(member['Latitude']) or pd.isna(member['Longitude']):
-                        continue
-                    member_coords_list.append([member['Latitude'], member['Longitude']])
-                    member_indices.append(idx)
-
-                if not member_coords_list:
-                    continue
-
-                member_coords_rad = np.radians(np.array(member_coords_list))
-                indices_array = tree.query_radius(member_coords_rad, r=radius_radians, return_distance=False)
-
-                for list_idx, provider_idxs in enumerate(indices_array):
-                    member_idx = member_indices[list_idx]
-                    member = members_df.loc[member_idx]
-                    member_lat = member['Latitude']
-                    member_lon = member['Longitude']
-                    member_source_type = member.get('SourceType', '')
-                    member_id = member.get('MemberID')
-
-                    if len(provider_idxs) == 0:
-                        continue
-
-                    matched_providers = providers_valid.iloc[provider_idxs].copy().reset_index(drop=True)
-                    mem_rad = np.radians([member_lat, member_lon])
-                    prov_rad = np.radians(matched_providers[['Latitude', 'Longitude']].values)
-
-                    lat1 = mem_rad[0]
-                    lon1 = mem_rad[1]
-                    lat2 = prov_rad[:, 0]
-                    lon2 = prov_rad[:, 1]
-
-                    dlat = lat2 - lat1
-                    dlon = lon2 - lon1
-                    a = np.sin(dlat / 2.0) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin(dlon / 2.0) ** 2
-                    great_circle_radians = 2 * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
-                    distances_km = great_circle_radians * self._earth_radius_km
-
-                    matched_providers = matched_providers.assign(distance_km=distances_km)
-
-                    for _, provider in matched_providers.iterrows():
-                        provider_type = provider.get('Type', '')
-                        provider_source = provider.get('Source', '')
-
-                        type_match = False
-                        if member_source_type == 'Supply Directory' and 'Supplier Directory' in str(provider_source):
-                            type_match = True
-                        elif member_source_type in ['Hospital', 'Nursing Home', 'Scan Center']:
-                            type_match = len(str(provider_type)) > 0
-
-                        if type_match:
-                            candidate_connections.append({
-                                'member_id': member_id,
-                                'provider_id': provider['ProviderID'],
-                                'distance': float(provider['distance_km']),
-                                'cost': provider.get('Cost', np.nan),
-                                'rating': provider.get('CMS Rating', np.nan),
-                                'member_source_type': member_source_type,
-                                'provider_type': provider_type
-                            })
-
-            return candidate_connections
+            return [
+                {
+                    'member_id': member_id,
+                    'provider_id': provider_id,
+                    'distance': distance,
+                    'cost': cost,
+                    'rating': rating,
+                    'member_source_type': member_source_type,
+                    'provider_type': provider_type
+                }
+                for member_id, provider_id, distance, cost, rating, member_source_type, provider_type in zip(
+                    member_ids,
+                    providers_df['ProviderID'].to_numpy()[provider_idx].tolist(),
+                    distances_km.tolist(),
+                    provider_column('Cost', np.nan),
+                    provider_column('CMS Rating', np.nan),
+                    member_source_types,
+                    provider_column('Type', '')
+                )
+            ]
 
         except Exception as e:
             logger.error(f"Error finding candidate connections: {str(e)}")
             return []
 
-    def optimize_assignments(self, candidate_connections, members_df, providers_df):
-        """Optimize assignments per member and adjust until profit/loss ∈ [8%, 12%]."""
-        assignments = []
-        member_candidates = defaultdict(list)
+    def build_candidate_graph(self, members, providers, max_distance=15.0, provider_index=None):
+        """Find candidate edges and pack them into a CandidateGraph."""
+        members = self.prepare(members, 'members')
+        providers = self.prepare(providers, 'providers')
+        logger.info(f"Processing {len(members)} members against {len(providers)} providers")
+        if self.sharded:
+            return self.build_candidate_graph_sharded(members, providers, max_distance)
+        member_idx, provider_idx, distances_km = self.find_candidate_edges(members, providers, max_distance,
+                                                                           provider_index=provider_index)
+        return CandidateGraph.from_edges(
+            member_idx, provider_idx, distances_km, len(members), providers.cost, providers.rating
+        )
+
+    def _tile_ids(self, lat, lon, size):
+        """Id of the size-degree lat/lon tile containing each point.
+
+        Columns wrap at the antimeridian (180 and -180 share column 0).
+        """
+        n_cols = int(np.ceil(360.0 / size))
+        return (np.floor((lat + 90.0) / size).astype(np.int64) * n_cols +
+                np.floor((lon + 180.0) / size).astype(np.int64) % n_cols)
+
+    def _halo_tiles(self, lat, lon, max_distance, size):
+        """(owner, tile) for every tile a point's max_distance halo overlaps.
+
+        owner indexes the given points; tile ids match _tile_ids, so halos
+        crossing the antimeridian continue on the other side.
+        """
+        n_cols = int(np.ceil(360.0 / size))
+
+        # Halo in degrees; longitude degrees shrink with latitude, so widen toward the poles
+        halo_lat = np.degrees(max_distance / self._earth_radius_km)
+        halo_lon = halo_lat / np.cos(np.radians(np.minimum(np.abs(lat) + halo_lat, 89.0)))
+        row_lo = np.floor((lat - halo_lat + 90.0) / size).astype(np.int64)
+        row_hi = np.floor((lat + halo_lat + 90.0) / size).astype(np.int64)
+        col_lo = np.floor((lon - halo_lon + 180.0) / size).astype(np.int64)
+        col_hi = np.floor((lon + halo_lon + 180.0) / size).astype(np.int64)
+
+        # Expand every point onto each tile its halo overlaps
+        n_rows = row_hi - row_lo + 1
+        n_tile_cols = np.minimum(col_hi - col_lo + 1, n_cols)  # a halo can wrap all the way round
+        per_point = n_rows * n_tile_cols
+        owner = np.repeat(np.arange(len(lat)), per_point)
+        k = np.arange(per_point.sum()) - np.repeat(np.cumsum(per_point) - per_point, per_point)
+        rows = row_lo[owner] + k // n_tile_cols[owner]
+        cols = (col_lo[owner] + k % n_tile_cols[owner]) % n_cols
+        return owner, rows * n_cols + cols
+
+    def _shard_tasks(self, members, providers, max_distance, n_shards):
+        """Partition members into lat/lon tiles and attach providers within the halo.
+
+        Neighbouring tiles are packed into about n_shards tasks of similar
+        member counts to amortize per-task overhead.
+        """
+        members = self.prepare(members, 'members')
+        providers = self.prepare(providers, 'providers')
+        members_df, providers_df = members.frame, providers.frame
+        size = self.shard_tile_degrees
+
+        member_pos = members.positions()
+        provider_pos = providers.positions()
+        if len(member_pos) == 0 or len(provider_pos) == 0:
+            return []
 
+        member_tile = self._tile_ids(*members.coordinates(members.located), size)
+        owner, provider_tile = self._halo_tiles(*providers.coordinates(providers.located), max_distance, size)
+
+        provider_order = np.argsort(provider_tile, kind='stable')
+        provider_tile_sorted = provider_tile[provider_order]
+        member_columns = [c for c in ('Latitude', 'Longitude', 'SourceType') if c in members_df.columns]
+        provider_columns = [c for c in ('Latitude', 'Longitude', 'Source', 'Type', 'Cost', 'CMS Rating', CATEGORY_COLUMN) if c in providers_df.columns]
+
+        tiles, member_tile_inverse = np.unique(member_tile, return_inverse=True)
+        member_order = np.argsort(member_tile_inverse, kind='stable')
+        member_bounds = np.searchsorted(member_tile_inverse[member_order], np.arange(len(tiles) + 1))
+        provider_lo = np.searchsorted(provider_tile_sorted, tiles)
+        provider_hi = np.searchsorted(provider_tile_sorted, tiles + 1)
+
+        target = max(1, len(member_pos) // max(1, n_shards))
+        tasks = []
+        shard_members, shard_providers = [], []
+
+        def flush():
+            if shard_members:
+                task_members = np.concatenate(shard_members)
+                task_providers = np.unique(np.concatenate(shard_providers))
+                tasks.append((task_members, task_providers,
+                              members_df[member_columns].iloc[task_members].reset_index(drop=True),
+                              providers_df[provider_columns].iloc[task_providers].reset_index(drop=True),
+                              max_distance))
+            shard_members.clear()
+            shard_providers.clear()
+
+        for i in range(len(tiles)):
+            if provider_lo[i] == provider_hi[i]:
+                continue  # no provider within reach of this tile
+            shard_members.append(member_pos[member_order[member_bounds[i]:member_bounds[i + 1]]])
+            shard_providers.append(provider_pos[owner[provider_order[provider_lo[i]:provider_hi[i]]]])
+            if sum(len(s) for s in shard_members) >= target:
+                flush()
+        flush()
+        return tasks
+
+    def build_candidate_graph_sharded(self, members, providers, max_distance=15.0):
+        """Sharded build_candidate_graph: per-tile candidate search across CPU cores.
+
+        Tiles are merged deterministically: edges are ordered by (member,
+        provider position), independent of tile layout and worker count, and
+        the best pick runs over the merged graph.
+        """
+        members = self.prepare(members, 'members')
+        providers = self.prepare(providers, 'providers')
+        workers = self.shard_workers or os.cpu_count() or 1
+        tasks = self._shard_tasks(members, providers, max_distance, n_shards=workers * 4)
+        logger.info(f"Sharded candidate search: {len(tasks)} shards on {workers} workers")
+
+        if workers > 1 and len(tasks) > 1:
+            with ProcessPoolExecutor(max_workers=workers, mp_context=_shard_pool_context()) as executor:
+                results = list(executor.map(_optimize_tile, tasks))
+        else:
+            results = [_optimize_tile(task) for task in tasks]
+
+        n_members = len(members)
+        if not results:
+            return CandidateGraph.empty(n_members)
+
+        member_idx, provider_idx, distances_km = (np.concatenate(parts) for parts in zip(*results))
+        order = np.lexsort((provider_idx, member_idx))
+        return CandidateGraph.from_edges(member_idx[order], provider_idx[order], distances_km[order], n_members,
+                                         providers.cost, providers.rating)
+
+    def _build_assignments(self, choice, graph, members_df, providers_df):
+        """Expand per-member chosen edges (-1 = unserved) into assignment dicts
+        (and their columnar table, kept in last_assignment_table)."""
+        served = choice >= 0
+        edges = choice[served]
+        provider_idx = graph.provider_idx[edges]
+
+        def fill(values):
+            column = np.full(len(choice), None, dtype=object)
+            column[served] = values
+            return column
+
+        def numeric(values):
+            column = np.full(len(choice), np.nan)
+            column[served] = values
+            return column
+
+        provider_ids = fill(providers_df['ProviderID'].to_numpy()[provider_idx])
+        distances = graph.distance[edges]
+        costs = providers_df['Cost'].to_numpy()[provider_idx]
+        ratings = providers_df['CMS Rating'].to_numpy()[provider_idx]
+        provider_types = providers_df['Type'].to_numpy()[provider_idx] if 'Type' in providers_df.columns else None
+        assignments = [
+            {
+                'member_id': member_id,
+                'member_source_type': member_source_type,
+                'provider_id': provider_id,
+                'distance': distance,
+                'cost': cost,
+                'rating': rating,
+                'provider_type': provider_type
+            }
+            for member_id, member_source_type, provider_id, distance, cost, rating, provider_type in zip(
+                members_df['MemberID'].tolist(),
+                members_df['SourceType'].tolist(),
+                provider_ids.tolist(),
+                fill(distances).tolist(),
+                fill(costs).tolist(),
+                fill(ratings).tolist(),
+                fill(provider_types).tolist()
+            )
+        ]
+
+        self.last_assignments = assignments
+        self.last_assignment_table = assignment_table_from_arrays(
+            members_df['SourceType'].to_numpy(), provider_ids, numeric(distances), numeric(costs), numeric(ratings)
+        )
+        # matched by ID, so rows sharing a used provider's ID count as used too
+        provider_id_column = providers_df['ProviderID']
+        self.last_used_providers = provider_id_column.isin(provider_id_column.to_numpy()[provider_idx]).to_numpy()
+        return assignments
+
+    def assignment_metrics(self, assignments, members_df, providers_df=None):
+        """AssignmentMetrics of assignments, reusing the columnar table built
+        alongside them when they are the last _build_assignments output."""
+        table = self.last_assignment_table if assignments is self.last_assignments else assignments
+        return AssignmentMetrics(table, members_df, providers_df, self.cost_reduction_bounds)
+
+    def diff_providers(self, old_providers, new_providers):
+        """ProviderID diff of two provider datasets.
+
+        Returns (added, removed, edited_old, edited_new): positions of added
+        providers in the new frame, of removed ones in the old frame, and of
+        edited ones in the old and the new frame.
+        """
+        old_providers = self.prepare(old_providers, 'providers')
+        new_providers = self.prepare(new_providers, 'providers')
+        old_df, new_df = old_providers.frame, new_providers.frame
+        old_ids, new_ids = pd.Index(old_df['ProviderID']), pd.Index(new_df['ProviderID'])
+
+        old_pos = old_ids.get_indexer(new_ids)
+        added = np.flatnonzero(old_pos < 0)
+        removed = np.flatnonzero(new_ids.get_indexer(old_ids) < 0)
+        kept_new = np.flatnonzero(old_pos >= 0)
+        kept_old = old_pos[kept_new]
+
+        edited = self._edited_rows(old_df, new_df, kept_old, kept_new, self.PROVIDER_DIFF_COLUMNS)
+        return added, removed, kept_old[edited], kept_new[edited]
+
+    def diff_members(self, old_members, new_members):
+        """MemberID diff of two member datasets.
+
+        Returns (previous_pos, changed, n_removed): each new member's position
+        in the old frame (-1 if added), ascending positions in the new frame
+        of members that were added or whose coordinates or SourceType changed,
+        and how many old members are gone.
+        """
+        old_members = self.prepare(old_members, 'members')
+        new_members = self.prepare(new_members, 'members')
+        old_df, new_df = old_members.frame, new_members.frame
+
+        previous_pos = pd.Index(old_df['MemberID']).get_indexer(new_df['MemberID'])
+        kept_new = np.flatnonzero(previous_pos >= 0)
+        edited = self._edited_rows(old_df, new_df, previous_pos[kept_new], kept_new, self.MEMBER_DIFF_COLUMNS)
+        changed = np.union1d(np.flatnonzero(previous_pos < 0), kept_new[edited])
+        return previous_pos, changed, len(old_df) - len(kept_new)
+
+    def _edited_rows(self, old_df, new_df, old_pos, new_pos, columns):
+        """Mask over the matched (old_pos, new_pos) rows that differ in any of columns."""
+        edited = np.zeros(len(new_pos), dtype=bool)
+        for column in columns:
+            if (column in old_df.columns) != (column in new_df.columns):
+                edited[:] = True
+                break
+            if column not in old_df.columns:
+                continue
+            old_values = old_df[column].to_numpy()[old_pos]
+            new_values = new_df[column].to_numpy()[new_pos]
+            edited |= ~((old_values == new_values) | (pd.isna(old_values) & pd.isna(new_values)))
+        return edited
+
+    def affected_members(self, members, latitudes, longitudes, max_distance=15.0):
+        """Ascending positions of members within max_distance of any of the given points."""
+        members = self.prepare(members, 'members')
+        latitudes = np.asarray(latitudes, dtype=np.float64)
+        longitudes = np.asarray(longitudes, dtype=np.float64)
+        located = ~(np.isnan(latitudes) | np.isnan(longitudes))
+        if not located.any() or members.n_located == 0:
+            return np.empty(0, dtype=np.int64)
+
+        latitudes, longitudes = latitudes[located], longitudes[located]
+        tree = BallTree(np.radians(np.column_stack([latitudes, longitudes])), metric='haversine')
+        radius_radians = max_distance / self._earth_radius_km
+
+        # Only members in tiles that some point's halo overlaps need the exact test
+        # (halo padded so rounding can only add candidates)
+        size = self.affected_tile_degrees
+        _, point_tiles = self._halo_tiles(latitudes, longitudes, max_distance * (1 + 1e-9), size)
+        point_tiles = np.unique(point_tiles)
+        parts = []
+        for start in range(0, members.n_located, self.candidate_block_members):
+            member_pos = members.positions(start, start + self.candidate_block_members)
+            member_lat, member_lon = members.coordinates(member_pos)
+            near = np.isin(self._tile_ids(member_lat, member_lon, size), point_tiles)
+            if not near.any():
+                continue
+            member_pos = member_pos[near]
+            member_coords_rad = np.radians(np.column_stack([member_lat[near], member_lon[near]]))
+            counts = tree.query_radius(member_coords_rad, r=radius_radians, count_only=True)
+            parts.append(member_pos[counts > 0])
+        if not parts:
+            return np.empty(0, dtype=np.int64)
+        return np.concatenate(parts).astype(np.int64, copy=False)
+
+    def build_incremental_graph(self, previous_assignments, members, old_providers, new_providers,
+                                max_distance=15.0, provider_index=None, previous_members=None):
+        """CandidateGraph for re-optimizing after a provider or member roster change.
+
+        previous_assignments are the assignment dicts of the last run (in
+        member order) for previous_members (default: members) against
+        old_providers. Added members, members whose coordinates or SourceType
+        changed, and members within max_distance of an added, removed or
+        edited provider (at its old or new location) get fresh candidate
+        edges against new_providers; every other served member gets its
+        previous provider as its only edge, so later steps cannot move it.
+        Returns (graph, affected member positions) and records the diff in
+        last_incremental.
+        """
+        members = self.prepare(members, 'members')
+        previous_members = members if previous_members is None else self.prepare(previous_members, 'members')
+        old_providers = self.prepare(old_providers, 'providers')
+        new_providers = self.prepare(new_providers, 'providers')
+        if len(previous_assignments) != len(previous_members):
+            raise ValueError("Previous assignments do not match the members dataset")
+
+        previous_pos, changed_members, removed_members = None, np.empty(0, dtype=np.int64), 0
+        if previous_members is not members:
+            previous_pos, changed_members, removed_members = self.diff_members(previous_members, members)
+
+        added, removed, edited_old, edited_new = self.diff_providers(old_providers, new_providers)
+        changed_old = np.concatenate([removed, edited_old])
+        changed_new = np.concatenate([added, edited_new])
+        old_lat, old_lon = old_providers.coordinates(changed_old)
+        new_lat, new_lon = new_providers.coordinates(changed_new)
+        affected = self.affected_members(members, np.concatenate([old_lat, new_lat]),
+                                         np.concatenate([old_lon, new_lon]), max_distance)
+        affected = np.union1d(affected, changed_members)
+
+        # Previous provider of every unaffected served member, as a position in the new frame
+        previous_provider = np.array([a['provider_id'] for a in previous_assignments], dtype=object)
+        previous_distance = np.array([a['distance'] for a in previous_assignments], dtype=np.float64)
+        if previous_pos is not None:
+            previous_provider = np.where(previous_pos >= 0, previous_provider[previous_pos], None)
+            previous_distance = previous_distance[previous_pos]
+        unaffected = np.ones(len(members), dtype=bool)
+        unaffected[affected] = False
+        kept = np.flatnonzero(unaffected & (previous_provider != None))
+        kept_provider = pd.Index(new_providers.frame['ProviderID']).get_indexer(previous_provider[kept])
+        missing = kept_provider < 0
+        if missing.any():
+            # Should not happen (a vanished provider is a removed one); recompute those members too
+            logger.warning(f"{int(missing.sum())} previous providers not found; re-optimizing their members")
+            affected = np.union1d(affected, kept[missing])
+            kept, kept_provider = kept[~missing], kept_provider[~missing]
+        kept_distance = previous_distance[kept]
+
+        member_idx, provider_idx, distances_km = self.find_candidate_edges(
+            members, new_providers, max_distance, provider_index=provider_index, member_positions=affected)
+        self.last_incremental = {
+            'providers_added': int(len(added)),
+            'providers_removed': int(len(removed)),
+            'providers_edited': int(len(edited_new)),
+            'members_changed': int(len(changed_members)),
+            'members_removed': int(removed_members),
+            'affected_members': int(len(affected)),
+            'recomputed_edges': int(len(member_idx)),
+        }
+        logger.info(f"Incremental run: {len(added)} added, {len(removed)} removed, {len(edited_new)} edited providers; "
+                    f"{len(changed_members)} added or changed, {removed_members} removed members; "
+                    f"{len(affected)} of {len(members)} members re-optimized over {len(member_idx)} edges")
+
+        graph = CandidateGraph.from_edges(
+            np.concatenate([member_idx, kept]), np.concatenate([provider_idx, kept_provider]),
+            np.concatenate([distances_km, kept_distance]), len(members), new_providers.cost, new_providers.rating
+        )
+        return graph, affected
+
+    def optimize_incremental(self, graph, affected, members, providers):
+        """optimize_assignments over a build_incremental_graph graph.
+
+        Only affected members are assigned afresh (capacity-aware runs share
+        what the other members leave free); the cost-band pass can only move
+        affected members, since everyone else has a single edge.
+        """
+        members = self.prepare(members, 'members')
+        providers = self.prepare(providers, 'providers')
+        capacity = None
+        if self.capacity_aware:
+            capacity = self.provider_capacities(providers, graph.n_members)
+            active = np.zeros(graph.n_members, dtype=bool)
+            active[affected] = True
+            fixed = np.flatnonzero(~active & (graph.degree > 0))
+            fixed_edges = graph.offsets[fixed]
+            remaining = capacity - np.bincount(graph.provider_idx[fixed_edges], minlength=len(capacity))
+            choice = self.solve_capacitated(graph, np.maximum(remaining, 0), active=active)
+            choice[fixed] = fixed_edges
+        else:
+            choice = self.select_best_providers(graph)
+
+        original_cost = members.frame['cost'].sum()
+        choice = self.adjust_cost_band(choice, graph, original_cost, capacity=capacity)
+        return self._build_assignments(choice, graph, members.frame, providers.frame)
+
+    def optimize_assignments(self, candidate_connections, members, providers):
+        """Optimize assignments per member and adjust until profit/loss ∈ [8%, 12%].
+
+        candidate_connections is a CandidateGraph (legacy list-of-dicts input is
+        converted to one).
+        """
         try:
-            for connection in candidate_connections:
-                member_candidates[connection['member_id']].append(connection)
+            members = self.prepare(members, 'members')
+            providers = self.prepare(providers, 'providers')
+            members_df, providers_df = members.frame, providers.frame
+            if isinstance(candidate_connections, CandidateGraph):
+                graph = candidate_connections
+            else:
+                graph = CandidateGraph.from_connections(candidate_connections, members_df, providers_df)
 
-            for _, member in members_df.iterrows():
-                member_id = member['MemberID']
-                assignment = {
-                    'member_id': member_id,
-                    'member_source_type': member['SourceType'],
-                    'provider_id': None,
-                    'distance': None,
-                    'cost': None,
-                    'rating': None,
-                    'provider_type': None
-                }
+            # choice[i] is the edge index assigned to member i, or -1 if unserved
+            capacity = None
+            if self.capacity_aware:
+                capacity = self.provider_capacities(providers, graph.n_members)
+                choice = self.solve_capacitated(graph, capacity)
+            else:
+                choice = self.select_best_providers(graph)
 
-                if member_id in member_candidates:
-                    best_provider = self.find_best_provider(member_candidates[member_id])
-                    if best_provider:
-                        assignment.update({
-                            'provider_id': best_provider['provider_id'],
-                            'distance': best_provider['distance'],
-                            'cost': best_provider['cost'],
-                            'rating': best_provider['rating'],
-                            'provider_type': best_provider.get('provider_type')
-                        })
-
-                assignments.append(assignment)
-
-            # ===============================
-            # Adjustment loop for 8–12% band
-            # ===============================
             original_cost = members_df['cost'].sum()
-            min_bound, max_bound = self.cost_reduction_bounds
-
-            def current_percentage():
-                optimized_cost = sum(a['cost'] for a in assignments if a['cost'] is not None)
-                return ((original_cost - optimized_cost) / original_cost) * 100 if original_cost > 0 else 0
-
-            profit_loss_percentage = current_percentage()
-
-            max_iterations = 50
-            iteration = 0
-            while (profit_loss_percentage < min_bound or profit_loss_percentage > max_bound) and iteration < max_iterations:
-                iteration += 1
-
-                if profit_loss_percentage < min_bound:
-                    # Too low savings → pick cheaper alternatives
-                    for a in assignments:
-                        candidates = member_candidates.get(a['member_id'], [])
-                        if not candidates:
-                            continue
-                        cheaper = [c for c in candidates if c['cost'] < (a['cost'] or float('inf'))]
-                        if cheaper:
-                            best_cheaper = min(cheaper, key=lambda c: c['cost'])
-                            a.update(best_cheaper)
-
-                elif profit_loss_percentage > max_bound:
-                    # Too high savings → improve quality by choosing slightly costlier but better rated
-                    for a in assignments:
-                        candidates = member_candidates.get(a['member_id'], [])
-                        if not candidates:
-                            continue
-                        higher_quality = [c for c in candidates if c['cost'] > (a['cost'] or 0) and c['rating'] > (a['rating'] or 0)]
-                        if higher_quality:
-                            best_quality = max(higher_quality, key=lambda c: (c['rating'], -c['cost']))
-                            a.update(best_quality)
-
-                profit_loss_percentage = current_percentage()
-
-            logger.info(f"Final profit/loss after adjustment: {profit_loss_percentage:.2f}% (target {min_bound}-{max_bound}%)")
-            return assignments
+            choice = self.adjust_cost_band(choice, graph, original_cost, capacity=capacity)
+            return self._build_assignments(choice, graph, members_df, providers_df)
 
         except Exception as e:
             logger.error(f"Error in optimization assignments: {str(e)}")
             return []
 
+    def _chosen(self, values, choice):
+        """Per-member value of the chosen edge (NaN for unserved members)."""
+        chosen = np.full(len(choice), np.nan)
+        served = choice >= 0
+        chosen[served] = values[choice[served]]
+        return chosen
+
+    def _savings_percentage(self, choice, graph, original_cost):
+        optimized_cost = np.nansum(self._chosen(graph.cost, choice))
+        return ((original_cost - optimized_cost) / original_cost) * 100 if original_cost > 0 else 0
+
+    def adjust_cost_band(self, choice, graph, original_cost, capacity=None):
+        """Move assignments until profit/loss falls inside cost_reduction_bounds.
+
+        Dispatches on adjustment_solver and records solver stats (swaps,
+        before/after percentage) in last_adjustment. With a capacity array the
+        greedy solver is always used so swaps never overfill a provider.
+        """
+        initial_percentage = self._savings_percentage(choice, graph, original_cost)
+        if self.adjustment_solver == 'legacy' and capacity is None:
+            choice, stats = self._adjust_legacy(choice.copy(), graph, original_cost)
+        else:
+            choice, stats = self._adjust_greedy(choice.copy(), graph, original_cost, capacity)
+
+        min_bound, max_bound = self.cost_reduction_bounds
+        final_percentage = self._savings_percentage(choice, graph, original_cost)
+        stats.update({
+            'solver': 'legacy' if self.adjustment_solver == 'legacy' and capacity is None else 'greedy',
+            'initial_percentage': float(initial_percentage),
+            'final_percentage': float(final_percentage),
+            'within_band': bool(min_bound <= final_percentage <= max_bound)
+        })
+        self.last_adjustment = stats
+
+        logger.info(f"Final profit/loss after adjustment: {final_percentage:.2f}% (target {min_bound}-{max_bound}%), "
+                    f"{stats['swaps']} swaps via {stats['solver']} solver")
+        return choice
+
+    def _adjust_legacy(self, choice, graph, original_cost):
+        """Original adjustment loop: up to 50 passes swapping every member wholesale."""
+        min_bound, max_bound = self.cost_reduction_bounds
+        has_candidates = graph.degree > 0
+        swaps = 0
+
+        def current_cost():
+            return self._chosen(graph.cost, choice)
+
+        profit_loss_percentage = self._savings_percentage(choice, graph, original_cost)
+
+        max_iterations = 50
+        iteration = 0
+        while (profit_loss_percentage < min_bound or profit_loss_percentage > max_bound) and iteration < max_iterations:
+            iteration += 1
+
+            if profit_loss_percentage < min_bound:
+                # Too low savings → pick cheaper alternatives
+                cost_now = np.nan_to_num(current_cost(), nan=np.inf)
+                cheaper = graph.cost < graph.broadcast(cost_now)
+                target = graph.segment_argmin(graph.cost, mask=cheaper)
+            else:
+                # Too high savings → improve quality by choosing slightly costlier but better rated
+                cost_now = np.nan_to_num(current_cost(), nan=0.0)
+                rating_now = np.nan_to_num(self._chosen(graph.rating, choice), nan=0.0)
+                higher_quality = (graph.cost > graph.broadcast(cost_now)) & (graph.rating > graph.broadcast(rating_now))
+                target = graph.segment_lexmin((-graph.rating, graph.cost), mask=higher_quality)
+
+            update = has_candidates & (target >= 0) & (target != choice)
+            choice[update] = target[update]
+            swaps += int(update.sum())
+
+            profit_loss_percentage = self._savings_percentage(choice, graph, original_cost)
+
+        return choice, {'swaps': swaps, 'members_swapped': None, 'iterations': iteration}
+
+    def _adjust_greedy(self, choice, graph, original_cost, capacity=None):
+        """Greedy marginal-cost heap over the candidate graph.
+
+        Every served member offers at most one move: the alternative with the
+        lowest rating loss per dollar moved toward the band (ties: bigger move,
+        then shorter distance) that does not overshoot the far edge of the band.
+        Spending more (savings too high) only buys a better rating, as in the
+        legacy loop.
+        Moves are applied best-first from a heap until the band is reached;
+        a swapped member re-offers its next move, stale entries are skipped.
+        With capacity, moves only target providers that still have room.
+        """
+        min_bound, max_bound = self.cost_reduction_bounds
+        stats = {'swaps': 0, 'members_swapped': 0, 'iterations': 0}
+        if original_cost <= 0:
+            return choice, stats
+
+        total = float(np.nansum(self._chosen(graph.cost, choice)))
+        low_total = original_cost * (1 - max_bound / 100.0)
+        high_total = original_cost * (1 - min_bound / 100.0)
+        if low_total <= total <= high_total:
+            return choice, stats
+
+        # direction -1: spend less (savings too low), +1: spend more (savings too high)
+        direction = -1.0 if total > high_total else 1.0
+
+        # Dollars still needed to enter the band, and the most we may move without leaving it
+        def needed():
+            return total - high_total if direction < 0 else low_total - total
+
+        def headroom():
+            return total - low_total if direction < 0 else high_total - total
+
+        if capacity is not None:
+            load = np.bincount(graph.provider_idx[choice[choice >= 0]], minlength=len(capacity))
+
+        def has_room(provider_idx):
+            if capacity is None:
+                return np.ones(len(provider_idx), dtype=bool)
+            return load[provider_idx] < capacity[provider_idx]
+
+        def best_move(member_pos):
+            edges = graph.member_slice(member_pos)
+            current = choice[member_pos]
+            moved = direction * (graph.cost[edges] - graph.cost[current])
+            valid = (moved > 0) & (moved <= headroom()) & has_room(graph.provider_idx[edges])
+            if direction > 0:
+                valid &= graph.rating[edges] > graph.rating[current]
+            if not valid.any():
+                return None
+            candidates = np.flatnonzero(valid)
+            moved = moved[candidates]
+            ratio = (graph.rating[current] - graph.rating[edges][candidates]) / moved
+            best = np.lexsort((graph.distance[edges][candidates], -moved, ratio))[0]
+            return (float(ratio[best]), -float(moved[best]), edges.start + int(candidates[best]))
+
+        # Initial moves for every served member, computed in bulk
+        served = choice >= 0
+        current_edges = graph.broadcast(np.where(served, choice, 0))
+        moved = direction * (graph.cost - graph.cost[current_edges])
+        valid = graph.broadcast(served) & (moved > 0) & (moved <= headroom()) & has_room(graph.provider_idx)
+        if direction > 0:
+            valid &= graph.rating > graph.rating[current_edges]
+        ratio = np.full(graph.n_edges, np.inf)
+        ratio[valid] = (graph.rating[current_edges[valid]] - graph.rating[valid]) / moved[valid]
+        first_moves = graph.segment_lexmin((ratio, -moved, graph.distance), mask=valid)
+
+        version = np.zeros(graph.n_members, dtype=np.int64)
+        members = np.flatnonzero(first_moves >= 0)
+        heap = [(float(ratio[e]), -float(moved[e]), int(m), int(e), 0)
+                for m, e in zip(members.tolist(), first_moves[members].tolist())]
+        heapq.heapify(heap)
+
+        swapped = set()
+        while heap and needed() > 0:
+            stats['iterations'] += 1
+            ratio_value, neg_moved, member_pos, edge, stamp = heapq.heappop(heap)
+            if stamp != version[member_pos]:
+                continue
+            if -neg_moved > headroom() or not has_room(graph.provider_idx[edge:edge + 1])[0]:
+                # Band edge moved closer or the provider filled up since this entry was pushed
+                version[member_pos] += 1
+                move = best_move(member_pos)
+                if move:
+                    heapq.heappush(heap, move[:2] + (member_pos, move[2], int(version[member_pos])))
+                continue
+
+            total += direction * -neg_moved
+            if capacity is not None:
+                load[graph.provider_idx[choice[member_pos]]] -= 1
+                load[graph.provider_idx[edge]] += 1
+            choice[member_pos] = edge
+            version[member_pos] += 1
+            stats['swaps'] += 1
+            swapped.add(member_pos)
+
+            move = best_move(member_pos)
+            if move:
+                heapq.heappush(heap, move[:2] + (member_pos, move[2], int(version[member_pos])))
+
+        stats['members_swapped'] = len(swapped)
+        return choice, stats
+
     def analyze_by_source_type(self, assignments, members_df):
         """Analyze optimization results by member source type."""
         try:
-            analysis = {}
-            source_type_groups = defaultdict(list)
-            for assignment in assignments:
-                source_type = assignment['member_source_type']
-                source_type_groups[source_type].append(assignment)
-
-            for source_type, group_assignments in source_type_groups.items():
-                total_members = len(group_assignments)
-                served_members = len([a for a in group_assignments if a['provider_id'] is not None])
-
-                analysis[source_type] = {
-                    'total_members': total_members,
-                    'served_members': served_members,
-                    'unserved_members': total_members - served_members,
-                    'access_percentage': (served_members / total_members) * 100 if total_members > 0 else 0,
-                    'average_distance': np.mean([a['distance'] for a in group_assignments if a['distance'] is not None]) if any(a['distance'] is not None for a in group_assignments) else None,
-                    'average_cost': np.mean([a['cost'] for a in group_assignments if a['cost'] is not None]) if any(a['cost'] is not None for a in group_assignments) else None,
-                    'average_rating': np.mean([a['rating'] for a in group_assignments if a['rating'] is not None]) if any(a['rating'] is not None for a in group_assignments) else None
-                }
-
-            return analysis
+            return self.assignment_metrics(assignments, members_df).by_source_type()
 
         except Exception as e:
             logger.error(f"Error analyzing by source type: {str(e)}")
@@ -291,80 +951,7 @@ class NetworkOptimizer:
     def calculate_optimization_metrics(self, assignments, members_df, providers_df):
         """Calculate metrics including cost reduction constraint."""
         try:
-            metrics = {}
-
-            total_members = len(members_df)
-            served_members = len([a for a in assignments if a['provider_id'] is not None])
-            unserved_members = total_members - served_members
-            access_percentage = (served_members / total_members) * 100 if total_members > 0 else 0
-
-            original_total_cost = members_df['cost'].sum() if 'cost' in members_df.columns else 0
-            optimized_total_cost = sum(a['cost'] for a in assignments if a['cost'] is not None and not pd.isna(a['cost']))
-            cost_savings = original_total_cost - optimized_total_cost
-            cost_savings_percentage = (cost_savings / original_total_cost) * 100 if original_total_cost > 0 else 0
-
-            # check against constraint (8–12%)
-            min_bound, max_bound = self.cost_reduction_bounds
-            cost_constraint_satisfied = (min_bound <= cost_savings_percentage <= max_bound)
-
-            used_provider_ids = set(a['provider_id'] for a in assignments if a['provider_id'] is not None)
-            total_providers = len(providers_df)
-            used_providers = len(used_provider_ids)
-            provider_utilization = (used_providers / total_providers) * 100 if total_providers > 0 else 0
-
-            served_assignments = [a for a in assignments if a['provider_id'] is not None]
-            if served_assignments:
-                average_distance = np.mean([a['distance'] for a in served_assignments])
-                average_rating = np.mean([a['rating'] for a in served_assignments])
-                max_distance = max([a['distance'] for a in served_assignments])
-                min_distance = min([a['distance'] for a in served_assignments])
-            else:
-                average_distance = average_rating = max_distance = min_distance = 0
-
-            if access_percentage == 100:
-                network_status = "No need to change organization"
-                network_recommendation = "Current network provides complete coverage"
-            elif access_percentage >= 95:
-                network_status = "Good in provider and member access"
-                network_recommendation = "Network is performing well with minor optimization opportunities"
-            else:
-                network_status = "Organization must increase providers"
-                network_recommendation = f"Network needs expansion - {unserved_members} members lack access"
-
-            metrics = {
-                'access': {
-                    'total_members': total_members,
-                    'served_members': served_members,
-                    'unserved_members': unserved_members,
-                    'access_percentage': access_percentage
-                },
-                'cost': {
-                    'original_total_cost': original_total_cost,
-                    'optimized_total_cost': optimized_total_cost,
-                    'cost_savings': cost_savings,
-                    'cost_savings_percentage': cost_savings_percentage,
-                    'within_target_range': cost_constraint_satisfied,
-                    'target_range': f"{min_bound}–{max_bound}%"
-                },
-                'provider_utilization': {
-                    'total_providers': total_providers,
-                    'used_providers': used_providers,
-                    'unused_providers': total_providers - used_providers,
-                    'utilization_percentage': provider_utilization
-                },
-                'quality_metrics': {
-                    'average_distance_km': average_distance,
-                    'average_provider_rating': average_rating,
-                    'max_distance_km': max_distance,
-                    'min_distance_km': min_distance
-                },
-                'network_assessment': {
-                    'status': network_status,
-                    'recommendation': network_recommendation
-                }
-            }
-
-            return metrics
+            return self.assignment_metrics(assignments, members_df, providers_df).optimization_metrics()
 
         except Exception as e:
             logger.error(f"Error calculating optimization metrics: {str(e)}")
@@ -373,8 +960,9 @@ class NetworkOptimizer:
     def generate_optimization_report(self, assignments, members_df, providers_df):
         """Generate text report including cost reduction target."""
         try:
-            metrics = self.calculate_optimization_metrics(assignments, members_df, providers_df)
-            source_type_analysis = self.analyze_by_source_type(assignments, members_df)
+            assignment_metrics = self.assignment_metrics(assignments, members_df, providers_df)
+            metrics = assignment_metrics.optimization_metrics()
+            source_type_analysis = assignment_metrics.by_source_type()
 
             report_lines = []
             report_lines.append("=" * 80)
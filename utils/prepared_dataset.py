@@ -0,0 +1,142 @@
+import logging
+import numpy as np
+import pandas as pd
+from utils.provider_categories import CATEGORY_COLUMN, classify_providers, member_accepts
+
+logger = logging.getLogger(__name__)
+
+class PreparedDataset:
+    """A cleaned member or provider frame plus the arrays the optimizer reads.
+
+    Built once per frame, by DataProcessor.prepare (strict) or, for frames
+    that did not come from DataProcessor, by coerce. The arrays are read-only
+    views of the frame's columns wherever the dtype already fits, so
+    consumers index them directly instead of copying or re-coercing columns.
+    Coordinates keep the frame's dtype (float32 after cleaning); distance math
+    must upcast them to float64 via coordinates().
+    """
+
+    KINDS = ('members', 'providers')
+
+    def __init__(self, frame, kind):
+        if kind not in self.KINDS:
+            raise ValueError(f"Unknown dataset kind: {kind}")
+        self.frame = frame
+        self.kind = kind
+        self.nbytes = 0  # bytes held by arrays that are not views of the frame
+        self.latitude = None
+        self.longitude = None
+        self.located = None  # positions with coordinates; None when every row has them
+
+        # members
+        self.accepts = None
+        # providers
+        self.categories = None
+        self.cost = None
+        self.rating = None
+        self.availability = None
+
+    @classmethod
+    def from_frame(cls, frame, kind):
+        """Wrap a DataProcessor-cleaned frame; raises ValueError unless every
+        row has numeric coordinates."""
+        dataset = cls(frame, kind)
+        for column in ('Latitude', 'Longitude'):
+            if column not in frame.columns:
+                raise ValueError(f"{kind} frame must contain '{column}'")
+            if not pd.api.types.is_numeric_dtype(frame[column]) or pd.api.types.is_bool_dtype(frame[column]):
+                raise ValueError(f"{kind} frame has non-numeric '{column}' values")
+            if frame[column].isna().any():
+                raise ValueError(f"{kind} frame has rows without '{column}'")
+        dataset.latitude = dataset._array('Latitude')
+        dataset.longitude = dataset._array('Longitude')
+        dataset._prepare_columns()
+        return dataset
+
+    @classmethod
+    def coerce(cls, frame, kind):
+        """Wrap any frame, coercing coordinates to numbers; rows without them
+        are left out of ``located``."""
+        dataset = cls(frame, kind)
+        for column in ('Latitude', 'Longitude'):
+            if column not in frame.columns:
+                raise ValueError(f"{kind} frame must contain '{column}'")
+        dataset.latitude = dataset._array('Latitude', numeric=True)
+        dataset.longitude = dataset._array('Longitude', numeric=True)
+        missing = np.isnan(dataset.latitude) | np.isnan(dataset.longitude)
+        if missing.any():
+            dataset.located = np.flatnonzero(~missing)
+            dataset.nbytes += dataset.located.nbytes
+        dataset._prepare_columns()
+        return dataset
+
+    def __len__(self):
+        return len(self.frame)
+
+    @property
+    def n_located(self):
+        return len(self) if self.located is None else len(self.located)
+
+    def positions(self, start=0, stop=None):
+        """Located row positions [start:stop) (all located rows by default)."""
+        stop = self.n_located if stop is None else min(stop, self.n_located)
+        if self.located is None:
+            return np.arange(start, stop)
+        return self.located[start:stop]
+
+    def coordinates(self, positions=None):
+        """float64 (latitude, longitude) arrays of the given row positions."""
+        if positions is None:
+            return np.asarray(self.latitude, dtype=np.float64), np.asarray(self.longitude, dtype=np.float64)
+        return (np.asarray(self.latitude[positions], dtype=np.float64),
+                np.asarray(self.longitude[positions], dtype=np.float64))
+
+    def _array(self, column, dtype=None, numeric=False):
+        """Read-only values of a frame column; copies only when the dtype has to change."""
+        series = self.frame[column]
+        source = series.to_numpy()
+        if numeric and not pd.api.types.is_numeric_dtype(series):
+            series = pd.to_numeric(series, errors='coerce')
+        values = series.to_numpy(dtype=dtype)
+        if not np.may_share_memory(values, source):
+            self.nbytes += values.nbytes
+        return self._readonly(values)
+
+    def _readonly(self, values):
+        values = values.view()
+        values.flags.writeable = False
+        return values
+
+    def _prepare_columns(self):
+        frame = self.frame
+        if self.kind == 'members':
+            if 'SourceType' not in frame.columns:
+                accepts = np.zeros(len(frame), dtype=np.uint16)
+            elif isinstance(frame['SourceType'].dtype, pd.CategoricalDtype):
+                # One lookup per category; code -1 (missing) picks the trailing 0
+                source_types = frame['SourceType'].cat
+                per_category = np.append(member_accepts(source_types.categories.to_numpy()), np.uint16(0))
+                accepts = per_category[source_types.codes.to_numpy()]
+            else:
+                accepts = member_accepts(frame['SourceType'].to_numpy())
+            self.nbytes += accepts.nbytes
+            self.accepts = self._readonly(accepts)
+            return
+
+        if CATEGORY_COLUMN in frame.columns:
+            self.categories = self._array(CATEGORY_COLUMN, dtype=np.uint16)
+        else:
+            categories = classify_providers(frame)
+            self.nbytes += categories.nbytes
+            self.categories = self._readonly(categories)
+        self.cost = self._numeric_column('Cost')
+        self.rating = self._numeric_column('CMS Rating')
+        self.availability = self._numeric_column('Availability') if 'Availability' in frame.columns else None
+
+    def _numeric_column(self, column):
+        """float64 values of a numeric column (all NaN if the column is missing)."""
+        if column not in self.frame.columns:
+            values = np.full(len(self.frame), np.nan)
+            self.nbytes += values.nbytes
+            return self._readonly(values)
+        return self._array(column, dtype=np.float64, numeric=True)
@@ -0,0 +1,59 @@
+import logging
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Provider category bits; a provider listing several types (e.g.
+# 'Hospital|Imaging Center') gets every matching bit.
+HAS_TYPE = 1 << 0            # any non-empty Type
+SUPPLIER_DIRECTORY = 1 << 1  # Source contains 'Supplier Directory' (optimizer rule)
+SUPPLIER = 1 << 2            # Source mentions 'Supplier' (member search rule)
+HOSPITAL = 1 << 3
+NURSING = 1 << 4
+SCAN = 1 << 5
+
+CATEGORY_COLUMN = 'Category'
+
+# bit -> (column, pattern, case sensitive)
+CATEGORY_RULES = {
+    SUPPLIER_DIRECTORY: ('Source', 'Supplier Directory', True),
+    SUPPLIER: ('Source', 'Supplier', False),
+    HOSPITAL: ('Type', 'Hospital|GENERAL ACUTE CARE|CRITICAL ACCESS', False),
+    NURSING: ('Type', 'Nursing|LONG TERM CARE|REHABILITATION', False),
+    SCAN: ('Type', 'Scan|Imaging|Radiology', False),
+}
+
+# Category bits a member of each SourceType accepts (any one of them)
+MEMBER_ACCEPTS = {
+    'Supply Directory': SUPPLIER_DIRECTORY,
+    'Hospital': HAS_TYPE,
+    'Nursing Home': HAS_TYPE,
+    'Scan Center': HAS_TYPE,
+}
+
+def _column_bits(values, bit, pattern, case):
+    """Bit for every value, evaluating the regex once per distinct value."""
+    codes, uniques = pd.factorize(pd.Series(values).astype(str))
+    matches = pd.Series(uniques).str.contains(pattern, case=case, regex=True).to_numpy()
+    return np.where(matches[codes], bit, 0).astype(np.uint16)
+
+def classify_providers(providers_df):
+    """Category bitmask (uint16) for every provider row."""
+    categories = np.zeros(len(providers_df), dtype=np.uint16)
+    if len(providers_df) == 0:
+        return categories
+
+    if 'Type' in providers_df.columns:
+        # Same test as the original string matching: str(Type) is non-empty
+        categories |= np.where(providers_df['Type'].astype(str).str.len().to_numpy() > 0,
+                               HAS_TYPE, 0).astype(np.uint16)
+
+    for bit, (column, pattern, case) in CATEGORY_RULES.items():
+        if column in providers_df.columns:
+            categories |= _column_bits(providers_df[column].to_numpy(), bit, pattern, case)
+    return categories
+
+def member_accepts(source_types):
+    """Accepted category bits for every member SourceType (0 accepts nothing)."""
+    return pd.Series(source_types).map(MEMBER_ACCEPTS).fillna(0).to_numpy(dtype=np.uint16)
@@ -0,0 +1,48 @@
+import logging
+import threading
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+class ResponseCache:
+    """Bodies and headers of rendered responses, LRU bounded by total bytes.
+
+    Callers key entries by what the response is derived from (e.g. an
+    OptimizationResult id and version plus the request variant), so an
+    entry never goes stale and is only dropped to stay within
+    ``max_bytes``. Bodies larger than ``max_entry_bytes`` are not kept,
+    so one large export cannot flush every small entry.
+    """
+
+    def __init__(self, max_bytes=64 * 1024 * 1024, max_entry_bytes=None):
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = max_entry_bytes if max_entry_bytes is not None else max_bytes // 4
+        self._entries = OrderedDict()  # key -> (body, headers)
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """(body, headers) for key, or None."""
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key]
+        return None
+
+    def put(self, key, body, headers):
+        """Remember body (bytes) and headers (list of pairs); returns whether it was kept."""
+        if len(body) > self.max_entry_bytes:
+            return False
+        with self._lock:
+            if key in self._entries:
+                self._bytes -= len(self._entries.pop(key)[0])
+            self._entries[key] = (body, headers)
+            self._bytes += len(body)
+            while self._bytes > self.max_bytes:
+                _, (evicted_body, _) = self._entries.popitem(last=False)
+                self._bytes -= len(evicted_body)
+        return True
+
+    @property
+    def nbytes(self):
+        return self._bytes
@@ -0,0 +1,209 @@
+import os
+import logging
+import threading
+from datetime import timezone
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Fields of an assignment dict, in the order they are rebuilt
+ASSIGNMENT_FIELDS = ['member_id', 'member_source_type', 'provider_id', 'distance', 'cost', 'rating', 'provider_type']
+
+# Provider columns of the unused-provider export, and their headers
+UNUSED_PROVIDER_COLUMNS = {
+    'ProviderID': 'Provider ID',
+    'Location': 'Provider Name & Address',
+    'Type': 'Type',
+    'CMS Rating': 'Rating',
+    'Cost': 'Cost',
+    'Contact Number': 'Contact Number',
+}
+
+class PendingFiles:
+    """Files written beside their destinations and moved into place together.
+
+    Used as a context manager around a database transaction: files written
+    inside the block are published when it exits without an error (so
+    after the commit) and discarded if it raises, so a failed commit
+    neither leaves orphans nor overwrites the artifacts of the committed row.
+    """
+
+    def __init__(self):
+        self._moves = []  # (temporary path, destination)
+
+    def write(self, path, write):
+        """Write path's pending contents through write(file); returns path."""
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.{len(self._moves)}.tmp"
+        try:
+            with open(tmp_path, 'wb') as f:
+                write(f)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        self._moves.append((tmp_path, path))
+        return path
+
+    def publish(self):
+        for tmp_path, path in self._moves:
+            os.replace(tmp_path, path)
+        self._moves = []
+
+    def discard(self):
+        for tmp_path, _ in self._moves:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        self._moves = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.publish()
+        else:
+            self.discard()
+        return False
+
+class ResultStore:
+    """Assignments of an OptimizationResult in a columnar .npz artifact.
+
+    Each assignment field is stored as one typed array: numbers natively,
+    strings as int32 codes plus a categories array, and None values as a
+    separate mask. The row only keeps the artifact's file name
+    (OptimizationResult.assignments_file) and the small JSON summary;
+    assignments are read on demand, optionally only some fields, since
+    np.load reads each array lazily. Results from before the artifact keep
+    their assignments in the JSON blob and are read from there.
+
+    The artifact can also hold the run's used-provider bitmap (one bit
+    per provider row). A result may also have precomputed map arrays (see
+    MapTileEngine.to_arrays) and its unused-provider CSV export next to it.
+
+    The save methods replace files atomically; given a PendingFiles they
+    only stage the write, to be published after the row is committed.
+    """
+
+    ARTIFACT_SUFFIX = '.assignments.npz'
+    MAP_SUFFIX = '.map.npz'
+
+    def __init__(self, folder):
+        self.folder = folder
+
+    def artifact_path(self, result):
+        return os.path.join(self.folder, result.assignments_file)
+
+    def map_path(self, result):
+        return os.path.join(self.folder, f"optimization_{result.id}{self.MAP_SUFFIX}")
+
+    def unused_providers_path(self, result):
+        return os.path.join(self.folder, f"unused_providers_{result.id}.csv")
+
+    def save(self, result, assignments, used_providers=None, pending=None):
+        """Write the artifact for a flushed result (replacing any previous one),
+        with the used-provider mask if given."""
+        result.assignments_file = f"optimization_{result.id}{self.ARTIFACT_SUFFIX}"
+        arrays = {}
+        for field in ASSIGNMENT_FIELDS:
+            self._encode(field, [a.get(field) for a in assignments], arrays)
+        if used_providers is not None:
+            arrays['used_providers'] = np.packbits(used_providers)
+            arrays['used_providers.length'] = np.array(len(used_providers))
+        return self._write(self.artifact_path(result), lambda f: np.savez(f, **arrays), pending)
+
+    def load_used_providers(self, result):
+        """Boolean mask of the providers a result assigns members to, or None
+        if its artifact has no bitmap."""
+        if not result.assignments_file:
+            return None
+        with np.load(self.artifact_path(result), allow_pickle=False) as artifact:
+            if 'used_providers' not in artifact.files:
+                return None
+            length = int(artifact['used_providers.length'])
+            return np.unpackbits(artifact['used_providers'], count=length).astype(bool)
+
+    def save_map(self, result, arrays, pending=None):
+        """Write a result's precomputed map arrays (replacing any previous ones)."""
+        return self._write(self.map_path(result), lambda f: np.savez(f, **arrays), pending)
+
+    def save_unused_providers(self, result, providers_df, used_providers, pending=None):
+        """Write a result's unused-provider CSV export (replacing any previous one)."""
+        export = providers_df.loc[~used_providers].reindex(columns=list(UNUSED_PROVIDER_COLUMNS))
+        export.columns = list(UNUSED_PROVIDER_COLUMNS.values())
+        return self._write(self.unused_providers_path(result), lambda f: export.to_csv(f, index=False), pending)
+
+    def unused_providers_file(self, result):
+        """Path of a result's unused-provider export, or None if there is none
+        written since the result was last patched."""
+        path = self.unused_providers_path(result)
+        if not os.path.exists(path):
+            return None
+        if os.path.getmtime(path) < result.last_updated.replace(tzinfo=timezone.utc).timestamp():
+            return None
+        return path
+
+    def load_map(self, result):
+        """A result's precomputed map arrays, or None if it has none."""
+        path = self.map_path(result)
+        if not os.path.exists(path):
+            return None
+        with np.load(path, allow_pickle=False) as artifact:
+            return {name: artifact[name] for name in artifact.files}
+
+    @staticmethod
+    def _write(path, write, pending=None):
+        """Write path through write(file), staged in pending or swapped in right away."""
+        if pending is not None:
+            return pending.write(path, write)
+        with PendingFiles() as files:
+            files.write(path, write)
+        return path
+
+    def load(self, result, fields=None):
+        """Assignment dicts of a result (with only the given fields, if any)."""
+        columns = self.load_columns(result, fields)
+        names = list(columns)
+        return [dict(zip(names, row)) for row in zip(*columns.values())]
+
+    def load_columns(self, result, fields=None):
+        """{field: list of values} of a result's assignments."""
+        fields = list(fields or ASSIGNMENT_FIELDS)
+        if not result.assignments_file:
+            assignments = result.get_optimization_data().get('assignments', [])
+            return {field: [a.get(field) for a in assignments] for field in fields}
+
+        with np.load(self.artifact_path(result), allow_pickle=False) as artifact:
+            return {field: self._decode(field, artifact) for field in fields}
+
+    def _encode(self, name, values, arrays):
+        values = np.array(values, dtype=object)
+        missing = np.equal(values, None)
+        present = values[~missing]
+        kind = pd.api.types.infer_dtype(present, skipna=False)
+        if kind == 'integer':
+            data = np.zeros(len(values), dtype=np.int64)
+        elif kind in ('floating', 'mixed-integer-float', 'empty'):
+            data = np.zeros(len(values), dtype=np.float64)
+        elif kind == 'boolean':
+            data = np.zeros(len(values), dtype=bool)
+        else:
+            codes, categories = pd.factorize(present)
+            data = np.full(len(values), -1, dtype=np.int32)
+            arrays[f'{name}.categories'] = np.asarray(categories).astype(str)
+            present = codes
+        data[~missing] = present
+        arrays[name] = data
+        if missing.any():
+            arrays[f'{name}.missing'] = missing
+
+    def _decode(self, name, artifact):
+        data = artifact[name]
+        if f'{name}.categories' in artifact.files:
+            values = artifact[f'{name}.categories'].astype(object)[data].tolist()
+        else:
+            values = data.tolist()
+        if f'{name}.missing' in artifact.files:
+            for position in np.flatnonzero(artifact[f'{name}.missing']).tolist():
+                values[position] = None
+        return values
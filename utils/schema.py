@@ -0,0 +1,77 @@
+import logging
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Compact column types applied by DataProcessor after cleaning:
+#   'id'         -> int32 when every value fits (left alone otherwise)
+#   'category'   -> pandas categorical
+#   'coordinate' -> float32 (~1 m precision; distance math upcasts to float64)
+#   'small_int'  -> uint8 when every value is a whole number in 0..255
+#   'count'      -> int32 when every value is a whole number that fits
+# Costs stay float64: they are summed across whole rosters.
+MEMBER_SCHEMA = {
+    'MemberID': 'id',
+    'SourceType': 'category',
+    'Latitude': 'coordinate',
+    'Longitude': 'coordinate',
+}
+
+PROVIDER_SCHEMA = {
+    'ProviderID': 'id',
+    'Source': 'category',
+    'Type': 'category',
+    'Latitude': 'coordinate',
+    'Longitude': 'coordinate',
+    'CMS Rating': 'small_int',
+    'Availability': 'count',
+}
+
+def _whole_numbers_within(series, low, high):
+    if not pd.api.types.is_numeric_dtype(series) or series.isna().any():
+        return False
+    values = series.to_numpy()
+    return bool(len(values) == 0 or ((values == np.round(values)).all() and values.min() >= low and values.max() <= high))
+
+def _convert(series, kind):
+    if kind == 'category':
+        return series if isinstance(series.dtype, pd.CategoricalDtype) else series.astype('category')
+    if kind == 'coordinate':
+        return series.astype(np.float32) if pd.api.types.is_float_dtype(series) else series
+    if kind == 'small_int':
+        return series.astype(np.uint8) if _whole_numbers_within(series, 0, 255) else series
+    if kind in ('id', 'count'):
+        info = np.iinfo(np.int32)
+        return series.astype(np.int32) if _whole_numbers_within(series, info.min, info.max) else series
+    raise ValueError(f"Unknown column kind: {kind}")
+
+def apply_schema(df, schema):
+    """Downcast the schema's columns of df in place; other columns are untouched."""
+    for column, kind in schema.items():
+        if column in df.columns:
+            df[column] = _convert(df[column], kind)
+    return df
+
+def concat_frames(frames):
+    """Concatenate cleaned chunks, keeping categorical columns categorical.
+
+    pd.concat falls back to object when chunks have different categories,
+    so the categories are unioned first.
+    """
+    if len(frames) == 1:
+        return frames[0]
+
+    categorical = [c for c, dtype in frames[0].dtypes.items() if isinstance(dtype, pd.CategoricalDtype)]
+    for column in categorical:
+        categories = pd.Index([])
+        for frame in frames:
+            if isinstance(frame[column].dtype, pd.CategoricalDtype):
+                categories = categories.union(frame[column].cat.categories, sort=False)
+        frames = [frame.assign(**{column: pd.Categorical(frame[column], categories=categories)}) for frame in frames]
+    return pd.concat(frames)
+
+def memory_report(df):
+    """Deep memory usage per column and in total, in bytes."""
+    usage = df.memory_usage(deep=True, index=True)
+    return {'columns': {str(k): int(v) for k, v in usage.items()}, 'total': int(usage.sum())}
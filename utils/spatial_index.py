@@ -0,0 +1,118 @@
+import os
+import pickle
+import logging
+import threading
+import numpy as np
+import pandas as pd
+from sklearn.neighbors import BallTree
+
+logger = logging.getLogger(__name__)
+
+EARTH_RADIUS_KM = 6371.0
+
+class ProviderSpatialIndex:
+    """Haversine BallTree over providers with valid coordinates.
+
+    Tree rows map to ``provider_pos``, positions (iloc) in the provider frame
+    the index was built from. The index is serialized next to the providers
+    CSV so it is built once per dataset.
+    """
+
+    ARTIFACT_SUFFIX = '.balltree.pkl'
+    ARTIFACT_VERSION = 1
+
+    def __init__(self, tree, provider_pos, n_rows):
+        self.tree = tree
+        self.provider_pos = provider_pos
+        self.n_rows = n_rows  # rows in the source frame, including ones without coordinates
+
+    @classmethod
+    def build(cls, providers_df):
+        """Index providers_df, or return None if no provider has coordinates."""
+        if 'Latitude' not in providers_df.columns or 'Longitude' not in providers_df.columns:
+            raise ValueError("providers_df must contain 'Latitude' and 'Longitude'")
+
+        latitudes, longitudes = cls._coordinates(providers_df)
+        provider_pos = np.flatnonzero(~np.isnan(latitudes) & ~np.isnan(longitudes))
+        if len(provider_pos) == 0:
+            return None
+
+        tree = BallTree(np.radians(np.column_stack([latitudes[provider_pos], longitudes[provider_pos]])),
+                        metric='haversine')
+        return cls(tree, provider_pos, len(providers_df))
+
+    @staticmethod
+    def _coordinates(df):
+        latitudes = pd.to_numeric(df['Latitude'], errors='coerce').to_numpy(dtype=np.float64)
+        longitudes = pd.to_numeric(df['Longitude'], errors='coerce').to_numpy(dtype=np.float64)
+        return latitudes, longitudes
+
+    def matches(self, providers_df):
+        """True if the index was built from these providers (same rows and coordinates)."""
+        if len(providers_df) != self.n_rows:
+            return False
+        latitudes, longitudes = self._coordinates(providers_df)
+        indexed = np.radians(np.column_stack([latitudes[self.provider_pos], longitudes[self.provider_pos]]))
+        return np.array_equal(np.asarray(self.tree.data), indexed)
+
+    def query_radius(self, latitudes, longitudes, radius_km, return_distance=False):
+        """Providers within radius_km of each point, as provider_pos positions.
+
+        Returns a list of position arrays (and a list of distance arrays in km
+        when return_distance is set), one per query point.
+        """
+        points = np.radians(np.column_stack([np.atleast_1d(latitudes), np.atleast_1d(longitudes)]).astype(np.float64))
+        radius = radius_km / EARTH_RADIUS_KM
+        if return_distance:
+            rows, distances = self.tree.query_radius(points, r=radius, return_distance=True)
+            return ([self.provider_pos[r] for r in rows],
+                    [d * EARTH_RADIUS_KM for d in distances])
+        rows = self.tree.query_radius(points, r=radius, return_distance=False)
+        return [self.provider_pos[r] for r in rows]
+
+    @property
+    def nbytes(self):
+        return sum(np.asarray(a).nbytes for a in self.tree.get_arrays()) + self.provider_pos.nbytes
+
+    def save(self, path, source_mtime):
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            pickle.dump({'version': self.ARTIFACT_VERSION, 'source_mtime': source_mtime, 'index': self},
+                        f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path, source_mtime):
+        """Load a saved index, or None if missing or built from another CSV version."""
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, 'rb') as f:
+                artifact = pickle.load(f)
+            if artifact.get('version') != cls.ARTIFACT_VERSION or artifact.get('source_mtime') != source_mtime:
+                return None
+            return artifact['index']
+        except Exception as e:
+            logger.warning(f"Could not read spatial index {path}: {str(e)}")
+            return None
+
+    @classmethod
+    def load_or_build(cls, csv_path, providers_df, name=None):
+        """Index for the providers CSV at csv_path, reusing its saved artifact when current.
+
+        ``name`` distinguishes several indexes over subsets of the same CSV.
+        """
+        path = csv_path + (f'.{name}' if name else '') + cls.ARTIFACT_SUFFIX
+        mtime = os.path.getmtime(csv_path)
+        index = cls.load(path, mtime)
+        if index is not None and index.matches(providers_df):
+            return index
+
+        logger.info(f"Building spatial index for {csv_path}")
+        index = cls.build(providers_df)
+        if index is not None:
+            try:
+                index.save(path, mtime)
+            except Exception as e:
+                logger.warning(f"Could not write spatial index {path}: {str(e)}")
+        return index
@@ -0,0 +1,99 @@
+import json
+import zlib
+import logging
+
+logger = logging.getLogger(__name__)
+
+JSON_MIMETYPE = 'application/json'
+COLUMNAR_MIMETYPE = 'application/vnd.networkopt.columnar+json'
+NDJSON_MIMETYPE = 'application/x-ndjson'
+MIMETYPES = [JSON_MIMETYPE, COLUMNAR_MIMETYPE, NDJSON_MIMETYPE]
+NDJSON_BATCH_ROWS = 1000  # rows per chunk handed to the server
+FILE_CHUNK_BYTES = 1024 * 1024
+
+class Records:
+    """A list-of-objects section of an API payload, kept as parallel columns.
+
+    Plain JSON sends it as one object per row, as before. The columnar
+    format sends the columns themselves ({"$length": n, "$columns":
+    {name: [values]}}), so field names appear once instead of once per
+    row. NDJSON sends one line per row. Rows missing a field get null
+    in that column; null values come back as null, as in plain JSON.
+    """
+
+    def __init__(self, columns, rows=None):
+        self.columns = columns
+        self._rows = rows
+
+    @classmethod
+    def from_rows(cls, rows):
+        rows = list(rows)
+        names = list(dict.fromkeys(name for row in rows for name in row))
+        return cls({name: [row.get(name) for row in rows] for name in names}, rows)
+
+    def __len__(self):
+        return len(next(iter(self.columns.values()), ()))
+
+    def rows(self):
+        if self._rows is not None:
+            return iter(self._rows)
+        names = list(self.columns)
+        return (dict(zip(names, values)) for values in zip(*self.columns.values()))
+
+def negotiate(accept_mimetypes):
+    """Best wire format of a request's Accept header; JSON unless another is asked for."""
+    # "*/*" (any browser fetch) matches the first offer, so JSON stays the default
+    return accept_mimetypes.best_match(MIMETYPES, default=JSON_MIMETYPE)
+
+def plain(payload):
+    """payload with its Records sections as lists of row dicts (for jsonify)."""
+    return {key: list(value.rows()) if isinstance(value, Records) else value for key, value in payload.items()}
+
+def stream(payload, mimetype):
+    """Generator of the payload in a streamed format, a column (or a batch of rows) at a time."""
+    if mimetype == COLUMNAR_MIMETYPE:
+        return _iter_columnar(payload)
+    if mimetype == NDJSON_MIMETYPE:
+        return _iter_ndjson(payload)
+    raise ValueError(f"{mimetype} is not a streamed format")
+
+def _iter_columnar(payload):
+    yield '{'
+    for position, (key, value) in enumerate(payload.items()):
+        yield f"{',' if position else ''}{json.dumps(key)}:"
+        if isinstance(value, Records):
+            yield f'{{"$length":{len(value)},"$columns":{{'
+            for column_position, (name, column) in enumerate(value.columns.items()):
+                yield f"{',' if column_position else ''}{json.dumps(name)}:{json.dumps(column, separators=(',', ':'))}"
+            yield '}}'
+        else:
+            yield json.dumps(value, separators=(',', ':'))
+    yield '}'
+
+def _iter_ndjson(payload):
+    """First line: the payload's other fields plus each section's row count
+    ("$sections"); then one [section, row] line per row."""
+    header = {key: value for key, value in payload.items() if not isinstance(value, Records)}
+    header['$sections'] = {key: len(value) for key, value in payload.items() if isinstance(value, Records)}
+    yield json.dumps(header, separators=(',', ':')) + '\n'
+    for key, value in payload.items():
+        if isinstance(value, Records):
+            section = json.dumps(key)
+            lines = []
+            for row in value.rows():
+                lines.append(f"[{section},{json.dumps(row, separators=(',', ':'))}]\n")
+                if len(lines) == NDJSON_BATCH_ROWS:
+                    yield ''.join(lines)
+                    lines = []
+            if lines:
+                yield ''.join(lines)
+
+def iter_gzip_file(path, level=6):
+    """Generator of a file's gzip encoding, compressed chunk by chunk as it is sent."""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(FILE_CHUNK_BYTES), b''):
+            compressed = compressor.compress(chunk)
+            if compressed:
+                yield compressed
+    yield compressor.flush()